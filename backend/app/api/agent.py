@@ -1,10 +1,25 @@
-from fastapi import APIRouter, Header, HTTPException, status
+import asyncio
+import logging
+from fastapi import APIRouter, Header, HTTPException, Query, status
 from pydantic import BaseModel
 from typing import List, Optional
 
 from ..api.chat.chatkit import run_workflow, WorkflowInput
+from ..api.chat.chat_memory import chat_memory
+from ..api.chat.message_writer import message_writer
+from ..api.responses import etag_headers, etag_matches, not_modified, rows_response, weak_etag
 from ..database.querys.auth_query import check_token
-from ..database.querys.chat_query import create_chat, create_message, get_idea_by_chat_id, get_all_chats, get_last_ai_message
+from ..database.querys.chat_query import (
+    create_chat,
+    get_all_chats,
+    get_chat_messages,
+    get_chat_summaries,
+    get_chats_version,
+    get_idea_by_chat_id,
+    get_last_ai_message,
+)
+
+logger = logging.getLogger(__name__)
 
 
 router = APIRouter()
@@ -33,6 +48,26 @@ class ChatResponseItem(BaseModel):
     messages: List[MessageItem] = []
 
 
+class ChatMessageItem(MessageItem):
+    created_at: str
+
+
+class ChatMessagesResponse(BaseModel):
+    chat_id: str
+    idea_id: Optional[str] = None
+    messages: List[ChatMessageItem] = []
+    next_before: Optional[str] = None
+
+
+class ChatSummaryItem(BaseModel):
+    chat_id: str
+    idea_id: Optional[str] = None
+    started_at: Optional[str] = None
+    message_count: int = 0
+    first_message: Optional[str] = None
+    last_message: Optional[ChatMessageItem] = None
+
+
 @router.post("/idea/{idea_id}", status_code=200, response_model=ChatCreateResponse, tags=["Chat"])
 def idea(idea_id: str, authorization: str = Header(...)):
     token = authorization.replace("Bearer ", "").strip()
@@ -44,42 +79,65 @@ def idea(idea_id: str, authorization: str = Header(...)):
         chat_id = create_chat(chat)
         return {"chat_id": chat_id}
     except Exception as e:
-        print(f"Erro ao criar chat: {e}")
+        logger.error("Erro ao criar chat: %s", e)
         raise
 
 
+async def _commit_turn(turn) -> None:
+    try:
+        if not await turn.commit():
+            logger.error("Erro ao criar mensagens do turno")
+    except Exception as e:
+        logger.error("Erro ao criar mensagens do turno: %s", e)
+
+
+async def _finish_turn(turn) -> None:
+    """Write the rest of the turn and hand what was persisted to the chat memory."""
+    await _commit_turn(turn)
+    chat_memory.record_turn(turn.chat_id, turn.messages)
+
+
 # Accept optional `sender` query param. If sender == 'AI', persist the message as AI and return it
 @router.post("/{chat_id}", status_code=200, response_model=MessageResponse, tags=["Chat"])
-async def chat_message(chat_id: str, message: str, sender: Optional[str] = None):
+async def chat_message(chat_id: str, message: str, sender: Optional[str] = None, no_cache: bool = False):
+    # A mensagem do usuário é gravada antes do workflow; as respostas da AI, juntas no fim
+    # (ou, com write-behind, em segundo plano)
+    turn = message_writer.turn(chat_id)
+
     # If caller explicitly sends sender=AI, save the message directly as coming from the AI and skip workflow
     try:
         if sender and str(sender).upper() == "AI":
-            try:
-                create_message(chat_id, message, "AI")
-            except Exception as e:
-                print(f"Erro ao criar mensagem AI via sender param: {e}")
+            turn.add(message, "AI")
+            await _finish_turn(turn)
             return {"message": message}
     except Exception:
         # proceed to normal flow if any unexpected error
         pass
 
+    # Memória do chat (resumo + últimas mensagens) carregada antes de gravar a mensagem atual
     try:
-        create_message(chat_id, message, "USER")
+        memory = await chat_memory.load(chat_id)
     except Exception as e:
-        print(f"Erro ao criar mensagem: {e}")
+        logger.error("Erro ao carregar memoria do chat: %s", e)
+        memory = None
+
+    # gravada já: se a requisição for cancelada durante o workflow (30-90 s) a pergunta não se perde
+    # e aparece em GET /{chat_id}/messages enquanto a resposta é gerada
+    turn.add(message, "USER")
+    await _commit_turn(turn)
 
     try:
-        idea_id = get_idea_by_chat_id(chat_id)
+        idea_id = await asyncio.to_thread(get_idea_by_chat_id, chat_id)
     except Exception as e:
-        print(f"Erro ao obter ideia pelo chat_id: {e}")
+        logger.error("Erro ao obter ideia pelo chat_id: %s", e)
         idea_id = None
 
     try:
         inp = WorkflowInput(input_as_text=message)
-        result = await run_workflow(inp, idea_id=idea_id)
+        result = await run_workflow(inp, idea_id=idea_id, memory=memory, use_cache=not no_cache)
 
     except Exception as e:
-        print(f"Erro ao executar workflow: {e}")
+        logger.error("Erro ao executar workflow: %s", e)
         result = "Desculpe, ocorreu um erro ao processar sua mensagem."
 
     # Normalizar o resultado para sempre retornar um objeto com chave 'message'
@@ -116,44 +174,92 @@ async def chat_message(chat_id: str, message: str, sender: Optional[str] = None)
 
     try:
         if is_classification_like:
-            fallback = get_last_ai_message(chat_id)
+            fallback = await asyncio.to_thread(get_last_ai_message, chat_id)
             if fallback:
                 # salva o fallback (última mensagem AI) novamente como AI e retorna
-                try:
-                    create_message(chat_id, fallback, "AI")
-                except Exception as e:
-                    print(f"Erro ao salvar fallback AI message: {e}")
+                turn.add(fallback, "AI")
+                await _finish_turn(turn)
                 return {"message": fallback}
 
         # Caso normal (não classificação), salva a mensagem retornada pelo workflow
-        try:
-            create_message(chat_id, final_message, "AI")
-        except Exception as e:
-            print(f"Erro ao criar mensagem: {e}")
-
+        turn.add(final_message, "AI")
+        await _finish_turn(turn)
         return {"message": final_message}
 
     except Exception as e:
-        print(f"Erro ao processar/fallback da mensagem: {e}")
+        logger.error("Erro ao processar/fallback da mensagem: %s", e)
+        await _finish_turn(turn)
         # último recurso: tenta retornar o resultado original
         return response_obj
 
 
 @router.get("/", status_code=200, response_model=List[ChatResponseItem], tags=["Chat"])
-def list_chats(authorization: str = Header(...)):
+def list_chats(authorization: str = Header(...), if_none_match: Optional[str] = Header(None)):
     token = authorization.replace("Bearer ", "").strip()
     user_id = check_token(token)
 
+    version = get_chats_version(user_id)
+    etag = weak_etag("chats", user_id, *version) if version is not None else None
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
     try:
         chats = get_all_chats(user_id)
         if chats is None:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao obter chats")
-        return chats
+        return rows_response(chats, ChatResponseItem, headers=etag_headers(etag))
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao pegar chats: {e}")
+        logger.error("Erro ao pegar chats: %s", e)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao obter chats")
+
+
+@router.get("/summary", status_code=200, response_model=List[ChatSummaryItem], tags=["Chat"])
+def list_chat_summaries(authorization: str = Header(...), if_none_match: Optional[str] = Header(None)):
+    """
+    Lista os chats do usuário só com a contagem de mensagens e a última mensagem de cada um
+    (para a barra lateral). O histórico completo fica em /{chat_id}/messages.
+    Responde 304 se o `If-None-Match` ainda corresponde à versão atual da lista.
+    """
+    token = authorization.replace("Bearer ", "").strip()
+    user_id = check_token(token)
+
+    version = get_chats_version(user_id)
+    etag = weak_etag("chat_summaries", user_id, *version) if version is not None else None
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
+    chats = get_chat_summaries(user_id)
+    if chats is None:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao obter chats")
+    return rows_response(chats, ChatSummaryItem, headers=etag_headers(etag))
+
+
+@router.get("/{chat_id}/messages", status_code=200, response_model=ChatMessagesResponse, tags=["Chat"])
+def list_chat_messages(
+    chat_id: str,
+    before: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    authorization: str = Header(...),
+):
+    """
+    Retorna uma página de mensagens do chat (as mais recentes primeiro).
+    Use `next_before` da resposta como `before` para carregar as anteriores.
+    """
+    token = authorization.replace("Bearer ", "").strip()
+    user_id = check_token(token)
+
+    try:
+        page = get_chat_messages(chat_id, user_id, before=before, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except LookupError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat não encontrado")
+
+    if page is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao obter mensagens")
+    return rows_response(page, ChatMessagesResponse)
 
 
 @router.get("/{chat_id}", status_code=200, tags=["Chat"])
@@ -164,11 +270,11 @@ def get_chat_by_id(chat_id: str):
         chat_data = get_chat_from_db(chat_id)
         if chat_data is None:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat não encontrado")
-        return chat_data
+        return rows_response(chat_data)
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao pegar chat: {e}")
+        logger.error("Erro ao pegar chat: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao obter chat")
 
 
@@ -187,5 +293,5 @@ def delete_chat(chat_id: str, authorization: str = Header(...)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao deletar chat: {e}")
+        logger.error("Erro ao deletar chat: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao deletar chat")
@@ -0,0 +1,61 @@
+import hashlib
+import os
+from typing import Any, Optional
+
+from .llm_cache import response_cache
+
+CHAT_CACHE_ENABLED = os.getenv("CHAT_CACHE_ENABLED", "1").lower() in ("1", "true", "yes")
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", str(24 * 3600)))
+
+# Mudou prompt/agentes/ordem das etapas do fluxo tirar_duvida? Incremente para não reaproveitar respostas antigas
+WORKFLOW_VERSION = 1
+
+NAMESPACE = "chat_answer"
+
+
+def idea_content_hash(idea: dict) -> str:
+    """Hash of everything about the idea that the answer depends on."""
+    parts = [idea.get("title") or "", idea.get("ai_classification") or "", idea.get("raw_content") or ""]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def _scope(idea_id: str, content_hash: str) -> str:
+    # idea_id + parte do hash: cada versão da ideia tem seu próprio espaço (e índice semântico)
+    return f"{idea_id}:{content_hash[:16]}"
+
+
+def _params(content_hash: str) -> dict:
+    return {"content_hash": content_hash, "workflow_version": WORKFLOW_VERSION}
+
+
+async def get_cached_answer(idea_id: str, idea: dict, message: str) -> tuple[Optional[str], Any]:
+    """Answer previously given to the same (normalised) question about the same idea version.
+
+    Returns (answer or None, lookup token); pass the token to `store_answer` so
+    the semantic layer can reuse the embedding computed during the lookup.
+    """
+    if not CHAT_CACHE_ENABLED or not idea_id or not idea:
+        return None, None
+    content_hash = idea_content_hash(idea)
+    value, vector = await response_cache.lookup(NAMESPACE, message, _params(content_hash), scope=_scope(idea_id, content_hash))
+    return (value if isinstance(value, str) and value else None), vector
+
+
+async def store_answer(idea_id: str, idea: dict, message: str, answer: str, token: Any = None) -> None:
+    if not CHAT_CACHE_ENABLED or not idea_id or not idea or not answer:
+        return
+    content_hash = idea_content_hash(idea)
+    await response_cache.store(
+        NAMESPACE,
+        message,
+        _params(content_hash),
+        answer,
+        vector=token,
+        scope=_scope(idea_id, content_hash),
+        ttl=CHAT_CACHE_TTL,
+    )
+
+
+async def invalidate_idea(idea_id: str) -> int:
+    """Drop every cached answer of an idea (all versions)."""
+    return await response_cache.invalidate(NAMESPACE, scope=idea_id)
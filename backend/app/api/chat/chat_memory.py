@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+
+from .context_window import truncate_to_tokens
+from .llm_gateway import get_client
+from ...observability.metrics import attributed_to
+from ...database.querys.chat_query import get_chat_memory, get_recent_messages, save_chat_memory
+
+logger = logging.getLogger(__name__)
+
+# Quantas mensagens (usuário + AI) ficam literais na memória do chat
+CHAT_MEMORY_MESSAGES = int(os.getenv("CHAT_MEMORY_MESSAGES", "6"))
+CHAT_MEMORY_SUMMARY_TOKENS = int(os.getenv("CHAT_MEMORY_SUMMARY_TOKENS", "400"))
+
+SUMMARY_MODEL = "gpt-4o-mini"
+
+
+@dataclass
+class ChatMemoryState:
+    summary: str = ""
+    recent: list[dict] = field(default_factory=list)
+    summarized_count: int = 0
+
+
+class ChatMemory:
+    """Rolling memory of a chat: a running summary plus the last K messages.
+
+    The state lives in one `chat_memory` row per chat, so loading it is a single
+    primary-key lookup no matter how long the chat is. After each persisted turn
+    its messages are appended (by message id, so a message already in the window
+    is not added twice); messages that fall out of the window are folded into the
+    summary with a cheap model (or truncated if that call fails).
+    """
+
+    def __init__(self, max_messages: int = CHAT_MEMORY_MESSAGES):
+        self.max_messages = max_messages
+        self._locks: dict[str, asyncio.Lock] = {}
+        # tarefas usando ou esperando o lock de cada chat
+        self._lock_users: dict[str, int] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    async def load(self, chat_id: str) -> ChatMemoryState:
+        row = await asyncio.to_thread(get_chat_memory, chat_id)
+        if row is not None:
+            return ChatMemoryState(row["summary"], list(row["recent"]), row["summarized_count"])
+        # chats anteriores à memória: parte das últimas mensagens gravadas
+        recent = await asyncio.to_thread(get_recent_messages, chat_id, self.max_messages)
+        return ChatMemoryState(recent=recent)
+
+    def record_turn(self, chat_id: str, messages: list[dict]) -> None:
+        """Append the turn's messages ({"id", "sender", "message"}) in the background so the reply is not delayed."""
+        if not messages:
+            return
+        task = asyncio.create_task(self._record_turn(chat_id, list(messages)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _record_turn(self, chat_id: str, messages: list[dict]) -> None:
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        self._lock_users[chat_id] = self._lock_users.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                state = await self.load(chat_id)
+                # a carga inicial a partir de ai_messages já pode conter este turno
+                known = {m.get("id") for m in state.recent if m.get("id")}
+                added = [m for m in messages if m["id"] not in known]
+                if not added:
+                    return
+                state.recent.extend(added)
+
+                overflow = state.recent[:-self.max_messages] if len(state.recent) > self.max_messages else []
+                if overflow:
+                    state.recent = state.recent[-self.max_messages:]
+                    state.summary = await _fold_into_summary(state.summary, overflow)
+                    state.summarized_count += len(overflow)
+
+                await asyncio.to_thread(save_chat_memory, chat_id, state.summary, state.recent, state.summarized_count)
+        except Exception as e:
+            logger.error("erro ao atualizar memoria do chat %s: %s", chat_id, e)
+        finally:
+            # ninguém mais esperando: o lock sai do dicionário (senão cresce um por chat, para sempre)
+            self._lock_users[chat_id] -= 1
+            if not self._lock_users[chat_id]:
+                del self._lock_users[chat_id]
+                del self._locks[chat_id]
+
+    async def stop(self) -> None:
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def _format_messages(messages: list[dict]) -> str:
+    return "\n".join(f"{'Usuário' if m.get('sender') == 'USER' else 'Assistente'}: {m.get('message', '')}" for m in messages)
+
+
+@attributed_to("chat_memory_summary")
+async def _fold_into_summary(summary: str, messages: list[dict]) -> str:
+    new_text = _format_messages(messages)
+    try:
+        response = await get_client().chat.completions.create(
+            model=SUMMARY_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Atualize o resumo de uma conversa entre um usuário e um assistente sobre a ideia do usuário. "
+                               "Mantenha decisões, perguntas em aberto, fatos e preferências; descarte cumprimentos. "
+                               "Responda apenas com o resumo atualizado, em tópicos curtos.",
+                },
+                {"role": "user", "content": f"Resumo atual:\n{summary or '(vazio)'}\n\nNovas mensagens:\n{new_text}"},
+            ],
+            temperature=0.2,
+            max_tokens=CHAT_MEMORY_SUMMARY_TOKENS,
+        )
+        updated = (response.choices[0].message.content or "").strip()
+        if updated:
+            return updated
+    except Exception as e:
+        logger.error("erro ao resumir conversa: %s", e)
+    # sem resumo do modelo: mantém início e fim do texto acumulado dentro do limite
+    return truncate_to_tokens(f"{summary}\n{new_text}".strip(), CHAT_MEMORY_SUMMARY_TOKENS)
+
+
+chat_memory = ChatMemory()
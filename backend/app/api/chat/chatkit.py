@@ -1,26 +1,26 @@
-from openai import AsyncOpenAI
+import asyncio
 from types import SimpleNamespace
 from guardrails.runtime import load_config_bundle, instantiate_guardrails, run_guardrails
 from pydantic import BaseModel
-from agents import RunContextWrapper, Agent, ModelSettings, Runner, RunConfig, trace
+from agents import RunContextWrapper, Agent, ModelSettings, RunConfig, trace
 from openai.types.shared.reasoning import Reasoning
 import logging
-from typing import List, cast
 
 from ..idea import get_idea_by_id
+from .llm_gateway import get_client, run_agent
+from ...observability.metrics import llm_caller
+from .context_window import ConversationWindow, idea_digests
+from .intent_router import intent_router
+from .answer_cache import get_cached_answer, store_answer
 
-# Shared client for guardrails and file search
-client = AsyncOpenAI()
-ctx = SimpleNamespace(guardrail_llm=client)
 # Guardrails definitions
 guardrails_config = {
   "guardrails": [
   ]
 }
-# Instantiate guardrails once at module load to avoid repeated work
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+# Instantiate guardrails once at module load to avoid repeated work
 _guardrails_bundle = load_config_bundle(guardrails_config)
 guardrails_instance = instantiate_guardrails(_guardrails_bundle)
 
@@ -324,7 +324,8 @@ class CriarContextoContext:
     self.context = context
 def criar_contexto_instructions(run_context: RunContextWrapper[CriarContextoContext], _agent: Agent[CriarContextoContext]):
   idea = getattr(run_context.context, "idea", "") or ""
-  context = getattr(run_context.context, "context", "") or ""
+  # as anotações chegam pelo input (ConversationWindow), dentro do orçamento da etapa
+  context = getattr(run_context.context, "context", "") or "enviadas na mensagem \"Anotações do usuário sobre a ideia\""
   logger.debug("Funcao criar contexto com o content %s", context)
   return f"""Função: compreender profundamente a ideia: {idea}, analisando as anotacoes do usuario: {context} e gerar um contexto estruturado e completo para servir como base aos demais agentes.
 Instrução aprimorada:
@@ -359,7 +360,10 @@ class WorkflowInput(BaseModel):
 
 
 # Main code entrypoint
-async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
+async def run_workflow(workflow_input: WorkflowInput, idea_id: str, memory=None, use_cache: bool = True):
+  # Cliente compartilhado resolvido a cada chamada (não no import): depois de close_client
+  # o gateway cria outro, e o Runner do agents SDK passa a usá-lo
+  guardrails_ctx = SimpleNamespace(guardrail_llm=get_client())
   with trace("New workflow"):
     state = {
 
@@ -368,7 +372,7 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
     idea_dict = None
     try:
         if idea_id:
-            idea_dict = get_idea_by_id(idea_id)
+            idea_dict = await asyncio.to_thread(get_idea_by_id, idea_id)
     except Exception as e:
         logger.exception("Erro ao buscar idea_id %s: %s", idea_id, e)
         return {"error": str(e)}
@@ -389,105 +393,104 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
 
 
     workflow = workflow_input.model_dump()
-    # iniciar conversation_history com estrutura compatível em runtime; removi a anotação de tipo estrita para evitar warnings
-    conversation_history = [
-      {
-        "role": "user",
-        "content": [
-          {
-            "type": "input_text",
-            "text": workflow["input_as_text"]
-          }
-        ]
-      }
-    ]
-    # If there is idea_context, inject it as a system/context message so agents see it up front
-    try:
-        if idea_context and str(idea_context).strip():
-            conversation_history.insert(0, {
-                "role": "system",
-                "content": [
-                    {
-                        "type": "input_text",
-                        "text": str(idea_context)
-                    }
-                ]
-            })
-    except NameError:
-        # idea_context may not be defined in some paths; ignore if missing
-        logger.debug("idea_context not available to inject into conversation_history")
+    # Cada agente recebe só o que precisa (mensagem, resumo das anotações e
+    # saídas relevantes), dentro do orçamento de tokens da etapa
+    idea_digest = await idea_digests.get(str(idea_context)) if idea_context else ""
+    window = ConversationWindow(workflow["input_as_text"], idea_digest, memory)
 
     # Log conversation for debugging to verify context is being passed
     try:
-        logger.debug("Conversation history being sent to Runner: %s", conversation_history)
+        logger.debug("Input do entender: %d tokens (anotacoes originais: %d caracteres)", window.input_tokens("entender"), len(str(idea_context or "")))
     except Exception:
         pass
     guardrails_inputtext = workflow["input_as_text"]
     # use the pre-instantiated guardrails instance
-    guardrails_result = await run_guardrails(ctx, guardrails_inputtext, "text/plain", guardrails_instance, suppress_tripwire=True)
+    with llm_caller("guardrails"):
+        guardrails_result = await run_guardrails(guardrails_ctx, guardrails_inputtext, "text/plain", guardrails_instance, suppress_tripwire=True)
     guardrails_hastripwire = guardrails_has_tripwire(guardrails_result)
     guardrails_anonymizedtext = get_guardrail_checked_text(guardrails_result, guardrails_inputtext)
     guardrails_output = (guardrails_hastripwire and build_guardrail_fail_output(guardrails_result or [])) or (guardrails_anonymizedtext or guardrails_inputtext)
     if guardrails_hastripwire:
       return guardrails_output
     else:
-      # Pass context into EntenderContext so the classification agent can use it explicitly
-      entender_result_temp = await Runner.run(
-        entender,
-        input=[
-          *conversation_history
-        ],
-        run_config=RunConfig(trace_metadata={
-          "__trace_source__": "agent-builder",
-          "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
-        }),
-        context=EntenderContext(workflow_input_as_text=workflow["input_as_text"], idea_context=str(idea_context) if idea_context else "")
-      )
-
-      # conversation_history.extend([item.to_input_item() for item in entender_result_temp.new_items])
-
-      entender_result = {
-        "output_text": entender_result_temp.final_output.json(),
-        "output_parsed": entender_result_temp.final_output.model_dump()
-      }
-
-      # --- DEBUG / normalization for classification ---
-      try:
-          raw_name = None
-          if isinstance(entender_result.get("output_parsed"), dict):
-              raw_name = entender_result["output_parsed"].get("name")
-          if not raw_name:
-              # fallback to output_text which might be a json string or plain text
-              raw_text = entender_result.get("output_text")
-              if isinstance(raw_text, str):
-                  # remove surrounding quotes if any (final_output.json() may include them)
-                  raw_text_stripped = raw_text.strip().strip('"')
-                  raw_name = raw_text_stripped
-
-          normalized_name = ""
-          if isinstance(raw_name, str):
-              normalized_name = raw_name.strip().lower().replace(" ", "_").replace("-", "_")
-          else:
-              normalized_name = ""
+      # Mesma pergunta sobre a mesma versão da ideia: reaproveita a resposta do fluxo tirar_duvida.
+      # Com histórico no chat a resposta depende da conversa (não só da pergunta), então o cache
+      # vale só para mensagens sem memória anterior
+      if memory is not None and (memory.recent or memory.summary):
+          use_cache = False
+      cache_token = None
+      if use_cache and isinstance(idea_dict, dict):
+          try:
+              cached_answer, cache_token = await get_cached_answer(idea_id, idea_dict, workflow["input_as_text"])
+              if cached_answer:
+                  logger.debug("DEBUG: resposta do chat servida do cache (idea_id=%s)", idea_id)
+                  return {"message": cached_answer}
+          except Exception as e:
+              logger.exception("DEBUG: erro ao consultar cache de respostas: %s", e)
+
+      # Mensagens fáceis de classificar são roteadas localmente, sem chamar o agente
+      route = intent_router.route(workflow["input_as_text"])
+      if route is not None:
+          logger.debug("DEBUG: intent router (%s) -> %s (%.3f)", route.source, route.label, route.confidence)
+          raw_name = route.label
+          normalized_name = route.label
+          entender_result = {"output_text": route.label, "output_parsed": {"name": route.label}}
+      else:
+          # As anotações (resumo) já vão no input do ConversationWindow; repetir nas instruções
+          # mandaria o maior bloco duas vezes, fora do orçamento da etapa
+          entender_result_temp = await run_agent(
+            "entender",
+            entender,
+            input=window.build("entender"),
+            run_config=RunConfig(trace_metadata={
+              "__trace_source__": "agent-builder",
+              "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
+            }),
+            context=EntenderContext(workflow_input_as_text=workflow["input_as_text"])
+          )
+
+          entender_result = {
+            "output_text": entender_result_temp.final_output.json(),
+            "output_parsed": entender_result_temp.final_output.model_dump()
+          }
 
-          logger.debug("DEBUG: entender raw_name=%r, normalized_name=%r", raw_name, normalized_name)
-      except Exception as e:
-          logger.exception("DEBUG: erro ao normalizar entender result: %s", e)
-          normalized_name = ""
-      # --- end debug ---
+          # --- DEBUG / normalization for classification ---
+          try:
+              raw_name = None
+              if isinstance(entender_result.get("output_parsed"), dict):
+                  raw_name = entender_result["output_parsed"].get("name")
+              if not raw_name:
+                  # fallback to output_text which might be a json string or plain text
+                  raw_text = entender_result.get("output_text")
+                  if isinstance(raw_text, str):
+                      # remove surrounding quotes if any (final_output.json() may include them)
+                      raw_text_stripped = raw_text.strip().strip('"')
+                      raw_name = raw_text_stripped
+
+              normalized_name = ""
+              if isinstance(raw_name, str):
+                  normalized_name = raw_name.strip().lower().replace(" ", "_").replace("-", "_")
+              else:
+                  normalized_name = ""
+
+              logger.debug("DEBUG: entender raw_name=%r, normalized_name=%r", raw_name, normalized_name)
+          except Exception as e:
+              logger.exception("DEBUG: erro ao normalizar entender result: %s", e)
+              normalized_name = ""
+          # --- end debug ---
+          intent_router.record(workflow["input_as_text"], normalized_name)
 
       # Use the normalized classification for branching
       if normalized_name == "tirar_duvida" or normalized_name == "tirar_duvidas":
-        criar_contexto_result_temp = await Runner.run(
+        criar_contexto_result_temp = await run_agent(
+          "criar_contexto",
           criar_contexto,
-          input=[
-            *conversation_history
-          ],
+          input=window.build("criar_contexto"),
           run_config=RunConfig(trace_metadata={
             "__trace_source__": "agent-builder",
             "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
           }),
-          context=CriarContextoContext(input_output_parsed_name=entender_result["output_parsed"].get("name") if isinstance(entender_result.get("output_parsed"), dict) else entender_result.get("output_text"), idea=idea_text, context=idea_context)
+          context=CriarContextoContext(input_output_parsed_name=entender_result["output_parsed"].get("name") if isinstance(entender_result.get("output_parsed"), dict) else entender_result.get("output_text"), idea=idea_text)
         )
         logger.debug("DEBUG: criar_contexto final_output_as=%s", getattr(criar_contexto_result_temp, 'final_output_as', lambda t: None)(str))
         try:
@@ -495,16 +498,15 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
         except Exception:
             pass
 
-        conversation_history.extend(cast(List[dict], cast(object, [item.to_input_item() for item in criar_contexto_result_temp.new_items])))
+        window.add("criar_contexto", criar_contexto_result_temp.final_output_as(str))
 
         criar_contexto_result = {
           "output_text": criar_contexto_result_temp.final_output_as(str)
         }
-        verificar_contexto_result_temp = await Runner.run(
+        verificar_contexto_result_temp = await run_agent(
+          "verificar_contexto",
           verificar_contexto,
-          input=[
-            *conversation_history
-          ],
+          input=window.build("verificar_contexto"),
           run_config=RunConfig(trace_metadata={
             "__trace_source__": "agent-builder",
             "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
@@ -517,16 +519,15 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
         except Exception:
             pass
 
-        conversation_history.extend(cast(List[dict], cast(object, [item.to_input_item() for item in verificar_contexto_result_temp.new_items])))
+        window.add("verificar_contexto", verificar_contexto_result_temp.final_output_as(str))
 
         verificar_contexto_result = {
           "output_text": verificar_contexto_result_temp.final_output_as(str)
         }
-        solucionar_duvida_result_temp = await Runner.run(
+        solucionar_duvida_result_temp = await run_agent(
+          "solucionar_duvida",
           solucionar_duvida,
-          input=[
-            *conversation_history
-          ],
+          input=window.build("solucionar_duvida"),
           run_config=RunConfig(trace_metadata={
             "__trace_source__": "agent-builder",
             "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
@@ -534,16 +535,15 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
           context=SolucionarDuvidaContext(input_output_text=verificar_contexto_result["output_text"])
         )
 
-        conversation_history.extend(cast(List[dict], cast(object, [item.to_input_item() for item in solucionar_duvida_result_temp.new_items])))
+        window.add("solucionar_duvida", solucionar_duvida_result_temp.final_output_as(str))
 
         solucionar_duvida_result = {
           "output_text": solucionar_duvida_result_temp.final_output_as(str)
         }
-        avaliar_clareza_result_temp = await Runner.run(
+        avaliar_clareza_result_temp = await run_agent(
+          "avaliar_clareza",
           avaliar_clareza,
-          input=[
-            *conversation_history
-          ],
+          input=window.build("avaliar_clareza"),
           run_config=RunConfig(trace_metadata={
             "__trace_source__": "agent-builder",
             "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
@@ -551,7 +551,7 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
           context=AvaliarClarezaContext(input_output_text=solucionar_duvida_result["output_text"])
         )
 
-        conversation_history.extend(cast(List[dict], cast(object, [item.to_input_item() for item in avaliar_clareza_result_temp.new_items])))
+        window.add("avaliar_clareza", avaliar_clareza_result_temp.final_output_as(str))
 
         avaliar_clareza_result = {
           "output_text": avaliar_clareza_result_temp.final_output_as(str)
@@ -573,13 +573,17 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
                 return {"message": "Desculpe, não foi possível gerar a resposta completa agora."}
         except Exception as e:
             logger.exception("DEBUG: error checking final message vs classification: %s", e)
+        if use_cache and isinstance(idea_dict, dict):
+            try:
+                await store_answer(idea_id, idea_dict, workflow["input_as_text"], end_result["message"], cache_token)
+            except Exception as e:
+                logger.exception("DEBUG: erro ao gravar cache de respostas: %s", e)
         return end_result
       elif normalized_name == "criar_ideia" or normalized_name == "criar_idea" or normalized_name == "criarideia":
-        criar_contexto_result_temp = await Runner.run(
+        criar_contexto_result_temp = await run_agent(
+          "criar_contexto1",
           criar_contexto1,
-          input=[
-            *conversation_history
-          ],
+          input=window.build("criar_contexto"),
           run_config=RunConfig(trace_metadata={
             "__trace_source__": "agent-builder",
             "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
@@ -592,16 +596,15 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
         except Exception:
             pass
 
-        conversation_history.extend(cast(List[dict], cast(object, [item.to_input_item() for item in criar_contexto_result_temp.new_items])))
+        window.add("criar_contexto", criar_contexto_result_temp.final_output_as(str))
 
         criar_contexto_result = {
           "output_text": criar_contexto_result_temp.final_output_as(str)
         }
-        verificar_contexto_result_temp = await Runner.run(
+        verificar_contexto_result_temp = await run_agent(
+          "verificar_contexto",
           verificar_contexto,
-          input=[
-            *conversation_history
-          ],
+          input=window.build("verificar_contexto"),
           run_config=RunConfig(trace_metadata={
             "__trace_source__": "agent-builder",
             "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
@@ -614,16 +617,15 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
         except Exception:
             pass
 
-        conversation_history.extend(cast(List[dict], cast(object, [item.to_input_item() for item in verificar_contexto_result_temp.new_items])))
+        window.add("verificar_contexto", verificar_contexto_result_temp.final_output_as(str))
 
         verificar_contexto_result = {
           "output_text": verificar_contexto_result_temp.final_output_as(str)
         }
-        criar_func_result_temp = await Runner.run(
+        criar_func_result_temp = await run_agent(
+          "criar_func",
           criar_func,
-          input=[
-            *conversation_history
-          ],
+          input=window.build("criar_func"),
           run_config=RunConfig(trace_metadata={
             "__trace_source__": "agent-builder",
             "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
@@ -636,16 +638,15 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
         except Exception:
             pass
 
-        conversation_history.extend(cast(List[dict], cast(object, [item.to_input_item() for item in criar_func_result_temp.new_items])))
+        window.add("criar_func", criar_func_result_temp.final_output_as(str))
 
         criar_func_result = {
           "output_text": criar_func_result_temp.final_output_as(str)
         }
-        analizar_viabilidade_result_temp = await Runner.run(
+        analizar_viabilidade_result_temp = await run_agent(
+          "analizar_viabilidade",
           analizar_viabilidade,
-          input=[
-            *conversation_history
-          ],
+          input=window.build("analizar_viabilidade"),
           run_config=RunConfig(trace_metadata={
             "__trace_source__": "agent-builder",
             "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
@@ -663,14 +664,13 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
           "output_text": analizar_viabilidade_result_temp.final_output_as(str)
         }
 
-        conversation_history.extend(cast(List[dict], cast(object, [item.to_input_item() for item in analizar_viabilidade_result_temp.new_items])))
+        window.add("analizar_viabilidade", analizar_viabilidade_result_temp.final_output_as(str))
 
         # Run selecionar_melhores agent (was missing) and append its items
-        selecionar_melhores_result_temp = await Runner.run(
+        selecionar_melhores_result_temp = await run_agent(
+          "selecionar_melhores",
           selecionar_melhores,
-          input=[
-            *conversation_history
-          ],
+          input=window.build("selecionar_melhores"),
           run_config=RunConfig(trace_metadata={
             "__trace_source__": "agent-builder",
             "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
@@ -683,16 +683,15 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
         except Exception:
             pass
 
-        conversation_history.extend(cast(List[dict], cast(object, [item.to_input_item() for item in selecionar_melhores_result_temp.new_items])))
+        window.add("selecionar_melhores", selecionar_melhores_result_temp.final_output_as(str))
 
         selecionar_melhores_result = {
           "output_text": selecionar_melhores_result_temp.final_output_as(str)
         }
-        avaliar_clareza_result_temp = await Runner.run(
+        avaliar_clareza_result_temp = await run_agent(
+          "avaliar_clareza1",
           avaliar_clareza1,
-          input=[
-            *conversation_history
-          ],
+          input=window.build("avaliar_clareza"),
           run_config=RunConfig(trace_metadata={
             "__trace_source__": "agent-builder",
             "workflow_id": "wf_68f27b81b4d08190923b1ee19c2c5ccb0812928a7e7e468e"
@@ -705,7 +704,7 @@ async def run_workflow(workflow_input: WorkflowInput, idea_id: str):
         except Exception:
             pass
 
-        conversation_history.extend(cast(List[dict], cast(object, [item.to_input_item() for item in avaliar_clareza_result_temp.new_items])))
+        window.add("avaliar_clareza", avaliar_clareza_result_temp.final_output_as(str))
 
         avaliar_clareza_result = {
           "output_text": avaliar_clareza_result_temp.final_output_as(str)
@@ -0,0 +1,231 @@
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional
+
+from .llm_cache import response_cache
+from .llm_gateway import get_client
+from ...observability.metrics import attributed_to
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:  # tiktoken é opcional: sem ele usamos a estimativa de ~4 caracteres por token
+    _ENCODING = None
+
+# Orçamento padrão (tokens de entrada, sem contar as instruções) de cada agente do chat
+CHAT_CONTEXT_BUDGET = int(os.getenv("CHAT_CONTEXT_BUDGET", "3000"))
+# Anotações maiores que isso são resumidas antes de ir para os agentes
+IDEA_DIGEST_MAX_TOKENS = int(os.getenv("IDEA_DIGEST_MAX_TOKENS", "1200"))
+
+DIGEST_PARAMS = {"model": "gpt-4o-mini", "temperature": 0.2, "max_tokens": IDEA_DIGEST_MAX_TOKENS, "prompt_version": 1}
+
+# Quais saídas de etapas anteriores cada agente realmente usa. A saída da etapa
+# imediatamente anterior já chega pelas instruções (input_output_text), então
+# não precisa ser repetida no input.
+STAGE_INPUTS: dict[str, tuple[str, ...]] = {
+    "entender": (),
+    "criar_contexto": (),
+    "verificar_contexto": (),
+    "solucionar_duvida": ("criar_contexto",),
+    "avaliar_clareza": (),
+    "criar_func": ("criar_contexto",),
+    "analizar_viabilidade": ("criar_contexto",),
+    "selecionar_melhores": ("criar_func",),
+}
+
+# Etapas que recebem as anotações da ideia (as demais trabalham sobre saídas anteriores)
+STAGES_WITH_IDEA = {"entender", "criar_contexto", "verificar_contexto", "solucionar_duvida"}
+
+# Etapas que recebem o histórico do chat (resumo + últimas mensagens)
+STAGES_WITH_HISTORY = {"entender", "criar_contexto", "solucionar_duvida", "criar_func"}
+# Parte do orçamento da etapa reservada ao histórico do chat
+CHAT_HISTORY_BUDGET = int(os.getenv("CHAT_HISTORY_BUDGET", "1200"))
+
+# Orçamentos específicos por etapa: "solucionar_duvida=4000,avaliar_clareza=1500"
+STAGE_BUDGETS = {
+    key.strip(): int(value)
+    for key, _, value in (part.partition("=") for part in os.getenv("CHAT_STAGE_BUDGETS", "").split(","))
+    if key.strip() and value.strip().isdigit()
+}
+
+_TRUNCATION_MARK = "\n[...]\n"
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Keep the beginning and the end of `text` within `max_tokens`."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    head = max_tokens * 2 // 3
+    tail = max_tokens - head
+    if _ENCODING is not None:
+        tokens = _ENCODING.encode(text, disallowed_special=())
+        return _ENCODING.decode(tokens[:head]) + _TRUNCATION_MARK + _ENCODING.decode(tokens[-tail:])
+    return text[:head * 4] + _TRUNCATION_MARK + text[-tail * 4:]
+
+
+class IdeaDigestCache:
+    """Condensed version of an idea's notes, computed once per content.
+
+    Notes within `IDEA_DIGEST_MAX_TOKENS` are used verbatim. Longer notes are
+    summarised with a cheap model; the summary is keyed by the content hash, so
+    a new version of the idea produces a new digest and unchanged notes reuse
+    the previous one (in memory, then through the shared response cache).
+    If summarisation fails the notes are truncated instead.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._digests: "OrderedDict[str, str]" = OrderedDict()
+
+    async def get(self, raw_content: str) -> str:
+        raw_content = (raw_content or "").strip()
+        if count_tokens(raw_content) <= IDEA_DIGEST_MAX_TOKENS:
+            return raw_content
+
+        key = hashlib.sha256(raw_content.encode("utf-8")).hexdigest()
+        digest = self._digests.get(key)
+        if digest is not None:
+            self._digests.move_to_end(key)
+            return digest
+
+        try:
+            digest = await response_cache.get_or_create(
+                "idea_digest",
+                raw_content,
+                DIGEST_PARAMS,
+                lambda: _summarize(raw_content),
+            )
+        except Exception as e:
+            logger.error("erro ao resumir anotacoes: %s", e)
+            digest = None
+        if not digest:
+            digest = truncate_to_tokens(raw_content, IDEA_DIGEST_MAX_TOKENS)
+
+        self._digests[key] = digest
+        while len(self._digests) > self.maxsize:
+            self._digests.popitem(last=False)
+        return digest
+
+
+@attributed_to("idea_digest")
+async def _summarize(raw_content: str) -> str:
+    # A entrada do resumo também é limitada para não estourar o contexto do modelo
+    source = truncate_to_tokens(raw_content, 12000)
+    response = await get_client().chat.completions.create(
+        model=DIGEST_PARAMS["model"],
+        messages=[
+            {
+                "role": "system",
+                "content": "Resuma as anotações do usuário sobre a ideia dele preservando fatos, números, nomes, "
+                           "tecnologias, requisitos e decisões. Não invente nada. Use tópicos curtos.",
+            },
+            {"role": "user", "content": source},
+        ],
+        temperature=DIGEST_PARAMS["temperature"],
+        max_tokens=DIGEST_PARAMS["max_tokens"],
+    )
+    return (response.choices[0].message.content or "").strip()
+
+
+idea_digests = IdeaDigestCache()
+
+
+class ConversationWindow:
+    """Builds the input of each chat agent within a token budget.
+
+    Instead of re-sending the whole history to every stage, each agent gets the
+    user message, the idea digest (only for stages that need it) and the prior
+    stage outputs listed in `STAGE_INPUTS`. Stages in `STAGES_WITH_HISTORY`
+    also get the chat memory (summary and last messages, oldest dropped first,
+    at most `CHAT_HISTORY_BUDGET` tokens). When the budget is exceeded the
+    older stage outputs are trimmed first, then the digest.
+    """
+
+    def __init__(self, user_message: str, idea_digest: str = "", memory=None):
+        self.user_message = user_message
+        self.idea_digest = idea_digest
+        self.memory = memory
+        self.outputs: dict[str, str] = {}
+
+    def add(self, stage: str, output_text: Optional[str]) -> None:
+        self.outputs[stage] = output_text or ""
+
+    def budget(self, stage: str) -> int:
+        return STAGE_BUDGETS.get(stage, CHAT_CONTEXT_BUDGET)
+
+    def _history(self, budget: int) -> list[dict]:
+        if self.memory is None:
+            return []
+        items: list[dict] = []
+        for message in reversed(self.memory.recent):
+            text = message.get("message") or ""
+            cost = count_tokens(text)
+            if cost > budget:
+                break
+            budget -= cost
+            role = "user" if message.get("sender") == "USER" else "assistant"
+            items.insert(0, {"role": role, "content": text})
+        summary = truncate_to_tokens(self.memory.summary or "", budget)
+        if summary:
+            items.insert(0, {"role": "system", "content": f"Resumo da conversa até aqui:\n{summary}"})
+        return items
+
+    def build(self, stage: str) -> list[dict]:
+        remaining = self.budget(stage) - count_tokens(self.user_message)
+
+        history: list[dict] = []
+        if stage in STAGES_WITH_HISTORY:
+            history = self._history(min(CHAT_HISTORY_BUDGET, max(remaining, 0)))
+            remaining -= sum(count_tokens(item["content"]) for item in history)
+
+        digest = self.idea_digest if stage in STAGES_WITH_IDEA else ""
+        priors = [(name, self.outputs[name]) for name in STAGE_INPUTS.get(stage, ()) if self.outputs.get(name)]
+
+        # as saídas mais recentes têm prioridade; as anotações ficam com o que sobrar
+        reserved = min(count_tokens(digest), IDEA_DIGEST_MAX_TOKENS // 2)
+        kept: list[tuple[str, str]] = []
+        for name, text in reversed(priors):
+            text = truncate_to_tokens(text, max(remaining - reserved, 0))
+            if text:
+                kept.insert(0, (name, text))
+                remaining -= count_tokens(text)
+        digest = truncate_to_tokens(digest, remaining) if digest else ""
+
+        items: list[dict] = []
+        if digest:
+            items.append({
+                "role": "system",
+                "content": [{"type": "input_text", "text": f"Anotações do usuário sobre a ideia:\n{digest}"}],
+            })
+        items.extend(history)
+        for _name, text in kept:
+            items.append({"role": "assistant", "content": text})
+        items.append({
+            "role": "user",
+            "content": [{"type": "input_text", "text": self.user_message}],
+        })
+        return items
+
+    def input_tokens(self, stage: str) -> int:
+        total = 0
+        for item in self.build(stage):
+            content = item["content"]
+            if isinstance(content, str):
+                total += count_tokens(content)
+            else:
+                total += sum(count_tokens(part.get("text", "")) for part in content)
+        return total
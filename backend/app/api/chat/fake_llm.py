@@ -0,0 +1,303 @@
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import struct
+import time
+from typing import Any, Optional
+
+import httpx
+
+# Latência até o primeiro token: "fixed:200", "uniform:100:400", "normal:300:80", "lognormal:300:0.5" (mediana em ms, sigma)
+LLM_FAKE_LATENCY = os.getenv("LLM_FAKE_LATENCY", "lognormal:300:0.4")
+# Tempo por token de saída (também aplicado às respostas sem streaming)
+LLM_FAKE_TOKEN_MS = float(os.getenv("LLM_FAKE_TOKEN_MS", "2"))
+LLM_FAKE_OUTPUT_TOKENS = int(os.getenv("LLM_FAKE_OUTPUT_TOKENS", "120"))
+LLM_FAKE_SEED = int(os.getenv("LLM_FAKE_SEED", "42"))
+# Resposta do classificador de intenção (EntenderSchema.name) no modo fake
+LLM_FAKE_INTENT = os.getenv("LLM_FAKE_INTENT", "tirar_duvida")
+
+_WORDS = (
+    "ideia projeto usuario aplicativo plataforma mercado cliente funcionalidade dados valor "
+    "solucao problema equipe custo receita etapa tarefa prototipo teste validacao pesquisa "
+    "entrega integracao seguranca desempenho escala publico canal parceria modelo negocio "
+    "interface api banco servidor nuvem automacao relatorio metrica objetivo risco prazo"
+).split()
+
+_UUID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+def _parse_latency(spec: str):
+    kind, _, rest = spec.partition(":")
+    args = [float(a) for a in rest.split(":") if a]
+    if kind == "fixed":
+        return lambda rng: args[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(math.log(args[0]), args[1])
+    raise ValueError(f"LLM_FAKE_LATENCY invalido: {spec}")
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class SchemaFaker:
+    """Builds a value that validates against a (strict) JSON schema."""
+
+    def __init__(self, rng: random.Random, ids: list[str]):
+        self.rng = rng
+        self.ids = ids
+
+    def text(self, words: int) -> str:
+        return " ".join(self.rng.choice(_WORDS) for _ in range(max(1, words))).capitalize() + "."
+
+    def value(self, schema: dict, defs: dict, field: str = "") -> Any:
+        if "$ref" in schema:
+            return self.value(defs[schema["$ref"].split("/")[-1]], defs, field)
+        for key in ("anyOf", "oneOf", "allOf"):
+            if key in schema:
+                options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+                return self.value(options[0], defs, field)
+        if "enum" in schema:
+            return self.rng.choice(schema["enum"])
+        if "const" in schema:
+            return schema["const"]
+
+        kind = schema.get("type", "string")
+        if isinstance(kind, list):
+            kind = next((k for k in kind if k != "null"), "null")
+
+        if kind == "object":
+            properties = schema.get("properties", {})
+            if list(properties) == ["name"]:
+                # formato do EntenderSchema: devolve a intenção configurada
+                return {"name": LLM_FAKE_INTENT}
+            return {name: self.value(prop, defs, name) for name, prop in properties.items()}
+        if kind == "array":
+            count = self.rng.randint(max(1, schema.get("minItems", 1)), max(1, min(schema.get("maxItems", 4), 4)))
+            return [self._array_item(schema.get("items", {}), defs, field, i) for i in range(count)]
+        if kind == "integer":
+            return self.rng.randint(1, 10)
+        if kind == "number":
+            return float(self.rng.randint(1, 10))
+        if kind == "boolean":
+            return self.rng.random() < 0.5
+        if kind == "null":
+            return None
+        if field.endswith("_id") or field == "id":
+            return self.rng.choice(self.ids) if self.ids else "00000000-0000-0000-0000-000000000000"
+        if field in ("name", "title"):
+            return self.text(2).rstrip(".")
+        return self.text(self.rng.randint(6, 18))
+
+    def _array_item(self, schema: dict, defs: dict, field: str, index: int) -> Any:
+        item = self.value(schema, defs, field)
+        # campos de ordem (step_order, task_order) seguem a posição na lista
+        if isinstance(item, dict):
+            for key in item:
+                if key.endswith("_order"):
+                    item[key] = index + 1
+        return item
+
+
+class FakeOpenAITransport(httpx.AsyncBaseTransport):
+    """In-process stand-in for the OpenAI HTTP API (LLM_PROVIDER=fake).
+
+    Answers /chat/completions, /responses (used by the agents SDK) and
+    /embeddings with deterministic, schema-valid payloads after a latency drawn
+    from `LLM_FAKE_LATENCY` plus `LLM_FAKE_TOKEN_MS` per output token. Both
+    endpoints support `stream=true` (SSE). Structured outputs follow the JSON
+    schema sent in the request, so pydantic output types such as
+    `CriandoPassosDoRoadmapSchema` parse normally; `*_id` fields reuse ids found
+    in the prompt (e.g. the step ids given to the tasks agent).
+    """
+
+    def __init__(self):
+        self._latency = _parse_latency(LLM_FAKE_LATENCY)
+        self.requests = 0
+
+    def _rng(self, body: bytes) -> random.Random:
+        digest = hashlib.sha256(body).digest()
+        return random.Random(LLM_FAKE_SEED ^ int.from_bytes(digest[:8], "little"))
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        payload = json.loads(body or b"{}")
+        rng = self._rng(body)
+        self.requests += 1
+        path = request.url.path
+
+        if path.endswith("/embeddings"):
+            await asyncio.sleep(self._latency(rng) / 1000)
+            return self._json(request, self._embeddings(payload))
+
+        output_tokens = min(int(payload.get("max_tokens") or payload.get("max_output_tokens")
+                                or payload.get("max_completion_tokens") or LLM_FAKE_OUTPUT_TOKENS), LLM_FAKE_OUTPUT_TOKENS)
+        text = self._output_text(payload, body, rng, output_tokens)
+        prompt_tokens = _estimate_tokens(body.decode("utf-8", "ignore"))
+        completion_tokens = _estimate_tokens(text)
+
+        if path.endswith("/chat/completions"):
+            if payload.get("stream"):
+                return self._stream(request, rng, self._chat_chunks(payload, text, prompt_tokens, completion_tokens))
+            await self._sleep(rng, completion_tokens)
+            return self._json(request, self._chat_completion(payload, text, prompt_tokens, completion_tokens))
+
+        if path.endswith("/responses"):
+            response = self._response(payload, text, prompt_tokens, completion_tokens)
+            if payload.get("stream"):
+                return self._stream(request, rng, self._response_events(response, text))
+            await self._sleep(rng, completion_tokens)
+            return self._json(request, response)
+
+        return httpx.Response(404, json={"error": {"message": f"fake: rota nao suportada {path}"}}, request=request)
+
+    async def _sleep(self, rng: random.Random, output_tokens: int) -> None:
+        await asyncio.sleep((self._latency(rng) + output_tokens * LLM_FAKE_TOKEN_MS) / 1000)
+
+    def _json(self, request: httpx.Request, data: dict) -> httpx.Response:
+        return httpx.Response(200, json=data, request=request, headers={"x-request-id": f"fake-{self.requests}"})
+
+    def _output_text(self, payload: dict, body: bytes, rng: random.Random, output_tokens: int) -> str:
+        schema = None
+        response_format = payload.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            schema = response_format.get("json_schema", {}).get("schema")
+        text_format = (payload.get("text") or {}).get("format") or {}
+        if text_format.get("type") == "json_schema":
+            schema = text_format.get("schema")
+
+        faker = SchemaFaker(rng, _UUID_RE.findall(body.decode("utf-8", "ignore")))
+        if schema is not None:
+            return json.dumps(faker.value(schema, schema.get("$defs", {})), ensure_ascii=False)
+        return faker.text(max(1, int(output_tokens * 0.75)))
+
+    def _embeddings(self, payload: dict) -> dict:
+        inputs = payload.get("input")
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs or [])
+        dim = int(payload.get("dimensions") or 256)
+        data = []
+        for i, text in enumerate(inputs):
+            rng = random.Random(hashlib.sha256(str(text).encode("utf-8")).digest())
+            vector = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            vector = [v / norm for v in vector]
+            if payload.get("encoding_format") == "base64":
+                embedding: Any = base64.b64encode(struct.pack(f"<{dim}f", *vector)).decode("ascii")
+            else:
+                embedding = vector
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(_estimate_tokens(str(t)) for t in inputs)
+        return {"object": "list", "data": data, "model": payload.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    def _chat_completion(self, payload: dict, text: str, prompt_tokens: int, completion_tokens: int) -> dict:
+        return {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text, "refusal": None},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def _chat_chunks(self, payload: dict, text: str, prompt_tokens: int, completion_tokens: int):
+        base = {"id": f"chatcmpl-fake-{self.requests}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": payload.get("model", "fake")}
+        for piece in _pieces(text):
+            yield {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+               "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}}
+
+    def _response(self, payload: dict, text: str, prompt_tokens: int, completion_tokens: int) -> dict:
+        return {
+            "id": f"resp_fake_{self.requests}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "status": "completed",
+            "output": [{
+                "type": "message",
+                "id": f"msg_fake_{self.requests}",
+                "status": "completed",
+                "role": "assistant",
+                "content": [{"type": "output_text", "text": text, "annotations": []}],
+            }],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens_details": {"reasoning_tokens": 0},
+            },
+        }
+
+    def _response_events(self, response: dict, text: str):
+        item = response["output"][0]
+        in_progress = {**response, "status": "in_progress", "output": []}
+        yield {"type": "response.created", "response": in_progress}
+        yield {"type": "response.output_item.added", "output_index": 0,
+               "item": {**item, "status": "in_progress", "content": []}}
+        yield {"type": "response.content_part.added", "item_id": item["id"], "output_index": 0, "content_index": 0,
+               "part": {"type": "output_text", "text": "", "annotations": []}}
+        for piece in _pieces(text):
+            yield {"type": "response.output_text.delta", "item_id": item["id"], "output_index": 0,
+                   "content_index": 0, "delta": piece, "logprobs": []}
+        yield {"type": "response.output_text.done", "item_id": item["id"], "output_index": 0,
+               "content_index": 0, "text": text, "logprobs": []}
+        yield {"type": "response.content_part.done", "item_id": item["id"], "output_index": 0, "content_index": 0,
+               "part": item["content"][0]}
+        yield {"type": "response.output_item.done", "output_index": 0, "item": item}
+        yield {"type": "response.completed", "response": response}
+
+    def _stream(self, request: httpx.Request, rng: random.Random, events) -> httpx.Response:
+        first_token_ms = self._latency(rng)
+        is_chat = request.url.path.endswith("/chat/completions")
+
+        async def body():
+            await asyncio.sleep(first_token_ms / 1000)
+            for sequence, event in enumerate(events):
+                if not is_chat:
+                    event = {**event, "sequence_number": sequence}
+                    yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8")
+                else:
+                    yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8")
+                if LLM_FAKE_TOKEN_MS > 0:
+                    await asyncio.sleep(LLM_FAKE_TOKEN_MS / 1000)
+            if is_chat:
+                yield b"data: [DONE]\n\n"
+
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body(), request=request)
+
+
+def _pieces(text: str) -> list[str]:
+    # ~1 token por pedaço: palavras com o espaço que as precede
+    return re.findall(r"\s*\S+", text) or [text]
+
+
+_transport: Optional[FakeOpenAITransport] = None
+
+
+def get_fake_transport() -> FakeOpenAITransport:
+    global _transport
+    if _transport is None:
+        _transport = FakeOpenAITransport()
+    return _transport
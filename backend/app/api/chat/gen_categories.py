@@ -1,273 +1,238 @@
-from openai import AsyncOpenAI
-import os
 import json
+import logging
 import re
 from typing import List, Dict, Optional, Any
 
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from .llm_cache import response_cache
+from .llm_gateway import get_client
+from ...observability.metrics import attributed_to
+
+logger = logging.getLogger(__name__)
+
+
+CATEGORIES_PARAMS = {"model": "gpt-4o-mini", "temperature": 0.2, "max_tokens": 600, "prompt_version": 2}
+
+# Número máximo de tags aceitas por ideia
+MAX_TAGS = 8
+
+# Saída estruturada: o modelo devolve nomes e descrições em uma única chamada
+TAGS_RESPONSE_FORMAT: Any = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "idea_tags",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "tags": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "description": {"type": "string"},
+                        },
+                        "required": ["name", "description"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["tags"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+DESCRIPTIONS_RESPONSE_FORMAT: Any = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "tag_descriptions",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "descriptions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "description": {"type": "string"},
+                        },
+                        "required": ["name", "description"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["descriptions"],
+            "additionalProperties": False,
+        },
+    },
+}
 
 
 async def create_categories(inp: str, idea: str) -> Optional[List[Dict[str, str]]]:
     """
-    Generate a list of tag objects ({"name": str, "description": str}) in a single model call.
+    Cached front for `_create_categories`: identical (or, with the semantic layer
+    enabled, near-identical) idea/context pairs reuse the stored tags.
+    """
+    return await response_cache.get_or_create(
+        "categories",
+        f"{idea}\n{inp}",
+        CATEGORIES_PARAMS,
+        lambda: _create_categories(inp, idea),
+    )
+
+
+def _clean_tag_name(name: str) -> str:
+    name = re.sub(r"^\s*\d+[.)]\s+", "", name or "")
+    name = re.sub(r"^[#\s\-•·]+|[\s#]+$", "", name)
+    name = re.sub(r"\s+", " ", name).strip().strip('"\'')
+    if len(name.split()) > 3:
+        # limita a 3 palavras (tamanho razoável de tag)
+        name = " ".join(name.split()[:3])
+    return name
+
+
+def _normalize_tags(items: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Clean names, drop empty/duplicate tags and enforce `MAX_TAGS`."""
+    normalized: List[Dict[str, str]] = []
+    seen = set()
+    for item in items:
+        name = _clean_tag_name(item.get("name") or "")
+        if not name:
+            continue
+        key = name.lower()
+        if key in seen:
+            continue
+        seen.add(key)
+        normalized.append({"name": name, "description": (item.get("description") or "").strip()})
+        if len(normalized) >= MAX_TAGS:
+            break
+    return normalized
+
+
+def _parse_free_text_tags(text: str) -> List[Dict[str, str]]:
+    """Last-resort parsing when the model did not honour the schema."""
+    if "[" in text and "]" in text:
+        try:
+            parsed = json.loads(text[text.index("["):text.rindex("]") + 1])
+            if isinstance(parsed, list):
+                return [
+                    item if isinstance(item, dict) else {"name": str(item), "description": ""}
+                    for item in parsed
+                ]
+        except Exception:
+            pass
+
+    cleaned = re.sub(r"(?i)aqui estão[^\n]*|aqui vai|sugestões de tags para a ideia[^\n]*:|sugestões de tags|sugestões", "", text)
+    cleaned = re.sub(r"[#\-•·]", "", cleaned)
+    parts = [p.strip() for p in re.split(r"[,;|\n\r]+", cleaned) if p.strip()]
+    return [{"name": re.sub(r"^\d+\.?\s*", "", p), "description": ""} for p in parts]
 
-    Preferred output from the model: a JSON array of objects like
-    [{"name": "Delivery", "description": "Entrega rápida para universitários"}, ...]
 
-    Fallbacks:
-    - If model returns a JSON array of strings, we will generate descriptions for each tag.
-    - If model returns free text, we parse it to extract tag names and then generate descriptions.
+@attributed_to("categories")
+async def _create_categories(inp: str, idea: str) -> Optional[List[Dict[str, str]]]:
+    """
+    Generate a list of tag objects ({"name": str, "description": str}).
+
+    Uses structured output (JSON schema), so names and descriptions normally
+    come back from a single model call. Tags that still lack a description are
+    completed with one batched call (`create_categories_descriptions`), so the
+    worst case is two LLM calls regardless of the number of tags.
 
     Returns: list of objects with name & description, or None on error.
     """
     try:
-        # Ask the model to return a JSON array of objects with name and description in Portuguese
         messages: Any = [
             {
                 "role": "system",
                 "content": (
                     "Você é um assistente que precisa gerar TAGS para uma ideia. "
-                    "RETORNE SOMENTE um JSON válido: uma lista de objetos com os campos 'name' e 'description'. "
-                    "Cada 'name' deve ser uma tag curta (1-3 palavras) e 'description' deve ser uma frase curta em Português. "
-                    "Exemplo: [{\"name\": \"Delivery Saudável\", \"description\": \"Entrega de refeições saudáveis para universitários\"}]"
+                    f"Gere de 3 a {MAX_TAGS} tags. Cada 'name' deve ser uma tag curta (1-3 palavras) e "
+                    "'description' deve ser uma frase curta em Português explicando a tag no contexto da ideia."
                 )
             },
             {
                 "role": "user",
-                "content": f"Idea: {idea}\nContext/Input: {inp}\nRetorne SOMENTE um JSON array de objetos {{name, description}} em Português."
+                "content": f"Idea: {idea}\nContext/Input: {inp}"
             }
         ]
 
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.2,
-            max_tokens=400,
-            top_p=1
+            max_tokens=600,
+            top_p=1,
+            response_format=TAGS_RESPONSE_FORMAT,
         )
 
-        text = response.choices[0].message.content.strip()
-        # Log raw model response to help debugging when parsing fails
-        print(f"RAW_TAGS_RESPONSE: {text}")
-
-        # If the model returned text with extra commentary plus a JSON blob,
-        # try to extract the first JSON array found between the first '[' and the last ']'.
-        if '[' in text and ']' in text:
-            try:
-                first = text.index('[')
-                last = text.rindex(']')
-                possible_json = text[first:last+1]
-                parsed = json.loads(possible_json)
-                # if parsed successfully, overwrite text variable so the normal JSON branch handles it
-                text = possible_json
-            except Exception:
-                # ignore and proceed to normal parsing/fallbacks
-                pass
-
-        # 1) Try parse as JSON
+        text = (response.choices[0].message.content or "").strip()
         try:
-            parsed = json.loads(text)
-            # If it's a list of objects with name/description, normalize and return
-            if isinstance(parsed, list) and parsed:
-                normalized: List[Dict[str, str]] = []
-                seen = set()
-                for item in parsed:
-                    if isinstance(item, dict):
-                        name = (item.get("name") or "").strip()
-                        desc = (item.get("description") or "").strip()
-                        if not name:
-                            continue
-                        # clean name
-                        name = re.sub(r"^[#\s]+|[\s#]+$", "", name)
-                        name = re.sub(r"\s+", " ", name)
-                        key = name.lower()
-                        if key in seen:
-                            continue
-                        seen.add(key)
-                        # if no description, generate one
-                        if not desc:
-                            desc = await create_categories_description(inp, idea, name)
-                        normalized.append({"name": name, "description": desc})
-                if normalized:
-                    return normalized
-            # If parsed is list of strings, generate descriptions
-            if isinstance(parsed, list) and all(isinstance(x, (str,)) for x in parsed):
-                tags = [str(x).strip().lstrip('#') for x in parsed if str(x).strip()]
-                tags = list(dict.fromkeys(tags))
-                result = []
-                for tag in tags:
-                    desc = await create_categories_description(inp, idea, tag)
-                    result.append({"name": tag, "description": desc})
-                if result:
-                    return result
+            items = json.loads(text).get("tags") or []
         except Exception:
-            # fallthrough to free-text parsing
-            pass
-
-        # If initial parse failed, try one retry with a stricter instruction and lower temperature
-        try:
-            retry_messages: Any = [
-                {
-                    "role": "system",
-                    "content": (
-                        "Você é um assistente estritamente formatado. RETORNE APENAS UM JSON VÁLIDO: uma lista de objetos com 'name' e 'description' em Português. "
-                        "Não inclua texto extra, explicações, bullets ou números. Exemplo: [{\"name\":\"Delivery Saudável\",\"description\":\"Entrega de refeições saudáveis para universitários\"}]"
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": f"Idea: {idea}\nContext/Input: {inp}\nRetorne apenas o JSON pedido, nada mais."
-                }
-            ]
-
-            retry_resp = await client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=retry_messages,
-                temperature=0.2,
-                max_tokens=400,
-                top_p=1
-            )
-            text_retry = retry_resp.choices[0].message.content.strip()
-            print(f"RAW_TAGS_RESPONSE_RETRY: {text_retry}")
+            items = _parse_free_text_tags(text)
 
-            # try to extract JSON between brackets if present
-            if '[' in text_retry and ']' in text_retry:
-                try:
-                    f = text_retry.index('[')
-                    l = text_retry.rindex(']')
-                    possible_json2 = text_retry[f:l+1]
-                    parsed2 = json.loads(possible_json2)
-                    if isinstance(parsed2, list) and parsed2:
-                        # handle objects list
-                        normalized2: List[Dict[str, str]] = []
-                        seen2 = set()
-                        for item in parsed2:
-                            if isinstance(item, dict):
-                                name = (item.get("name") or "").strip()
-                                desc = (item.get("description") or "").strip()
-                                if not name:
-                                    continue
-                                name = re.sub(r"^[#\s]+|[\s#]+$", "", name)
-                                name = re.sub(r"\s+", " ", name)
-                                key = name.lower()
-                                if key in seen2:
-                                    continue
-                                seen2.add(key)
-                                if not desc:
-                                    desc = await create_categories_description(inp, idea, name)
-                                normalized2.append({"name": name, "description": desc})
-                        if normalized2:
-                            return normalized2
-                    # if list of strings
-                    if isinstance(parsed2, list) and all(isinstance(x, str) for x in parsed2):
-                        tags2 = [s.strip().lstrip('#') for s in parsed2 if s.strip()]
-                        tags2 = list(dict.fromkeys(tags2))
-                        res2 = []
-                        for tag in tags2:
-                            desc = await create_categories_description(inp, idea, tag)
-                            res2.append({"name": tag, "description": desc})
-                        if res2:
-                            return res2
-                except Exception:
-                    pass
-        except Exception as e:
-            print(f"Retry request failed: {e}")
-            # proceed to free-text fallback
-
-        # Enforce a maximum number of tags (avoid runaway lists) and validate tag length
-        def validate_and_limit(items: List[Dict[str, str]]) -> List[Dict[str, str]]:
-            valid: List[Dict[str, str]] = []
-            seen_local = set()
-            for it in items:
-                name = it.get('name','').strip()
-                desc = it.get('description','').strip()
-                # limit words to 1-3 (reasonable tag length)
-                if not name:
-                    continue
-                if len(name.split()) > 3:
-                    # shorten by taking first three words
-                    name = ' '.join(name.split()[:3])
-                key = name.lower()
-                if key in seen_local:
-                    continue
-                seen_local.add(key)
-                valid.append({'name': name, 'description': desc})
-                if len(valid) >= 8:
-                    break
-            return valid
-
-        # 2) Fallback: free text parsing to extract probable tags
-        # Remove common lead phrases and bullets
-        cleaned = re.sub(r"(?i)aqui estão[^\n]*|aqui vai|sugestões de tags para a ideia[^\n]*:|sugestões de tags|sugestões", "", text)
-        cleaned = re.sub(r"[\n\r]+", ",", cleaned)
-        cleaned = re.sub(r"[#\-•·]", "", cleaned)
-        parts = [p.strip() for p in re.split(r"[,;|\n]+", cleaned) if p.strip()]
-        parts = [re.sub(r"^\d+\.?\s*", "", p) for p in parts]
-
-        # Normalize and dedupe
-        normalized_names: List[str] = []
-        seen = set()
-        for p in parts:
-            name = p.strip().strip('"\'')
-            name = re.sub(r"\s+", " ", name)
-            if not name:
-                continue
-            key = name.lower()
-            if key in seen:
-                continue
-            seen.add(key)
-            normalized_names.append(name)
-
-        if not normalized_names:
+        tags = _normalize_tags([it for it in items if isinstance(it, dict)])
+        if not tags:
             return None
 
-        # Generate descriptions for each tag
-        result: List[Dict[str, str]] = []
-        for tag in normalized_names:
-            desc = await create_categories_description(inp, idea, tag)
-            if desc is None:
-                desc = ""
-            result.append({"name": tag, "description": desc})
+        missing = [t["name"] for t in tags if not t["description"]]
+        if missing:
+            descriptions = await create_categories_descriptions(inp, idea, missing)
+            for t in tags:
+                if not t["description"]:
+                    t["description"] = descriptions.get(t["name"].lower(), "")
 
-        return validate_and_limit(result)
+        return tags
 
     except Exception as e:
-        print(f"Erro ao classificar (create_categories combined): {e}")
+        logger.error("Erro ao classificar (create_categories combined): %s", e)
         return None
 
 
-async def create_categories_description(inp: str, idea: str, tag: str) -> str:
+@attributed_to("category_descriptions")
+async def create_categories_descriptions(inp: str, idea: str, tags: List[str]) -> Dict[str, str]:
     """
-    Generate a short (1-2 sentence) description for the given tag. Return plain text only in Portuguese.
+    Generate short (1-2 sentence) Portuguese descriptions for several tags in one call.
+
+    Returns a mapping of lower-cased tag name -> description (missing tags are omitted).
     """
+    if not tags:
+        return {}
     try:
         messages: Any = [
             {
                 "role": "system",
                 "content": (
-                    "Você é um assistente que deve gerar UMA breve descrição (1-2 frases) para uma TAG relacionada à ideia. "
-                    "Retorne SOMENTE o texto da descrição em Português. Não adicione numeração ou o nome da tag."
+                    "Você é um assistente que deve gerar UMA breve descrição (1-2 frases) em Português "
+                    "para cada TAG relacionada à ideia. Não adicione numeração nem repita o nome da tag na descrição."
                 )
             },
             {
                 "role": "user",
-                "content": f"Idea: {idea}\nContext/Input: {inp}\nTag: {tag}\nRetorne 1-2 frases em Português descrevendo esta tag."
+                "content": f"Idea: {idea}\nContext/Input: {inp}\nTags: {json.dumps(tags, ensure_ascii=False)}"
             }
         ]
 
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=messages,
             temperature=0.7,
-            max_tokens=80,
-            top_p=1
+            max_tokens=80 * len(tags),
+            top_p=1,
+            response_format=DESCRIPTIONS_RESPONSE_FORMAT,
         )
 
-        text = response.choices[0].message.content.strip()
-        # Cleanup numeric bullets or leading punctuation
-        text = re.sub(r"^\s*\d+\.?\s*", "", text)
-        text = re.sub(r"^[#\-•·]\s*", "", text)
-        return text
+        parsed = json.loads(response.choices[0].message.content or "{}")
+        result: Dict[str, str] = {}
+        for item in parsed.get("descriptions") or []:
+            name = (item.get("name") or "").strip().lower()
+            desc = re.sub(r"^\s*\d+\.?\s*|^[#\-•·]\s*", "", (item.get("description") or "").strip())
+            if name and desc:
+                result[name] = desc
+        return result
     except Exception as e:
-        print(f"Erro ao gerar descricao da tag: {e}")
-        return ""
+        logger.error("Erro ao gerar descricoes das tags: %s", e)
+        return {}
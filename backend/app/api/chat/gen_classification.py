@@ -1,20 +1,39 @@
-from openai import AsyncOpenAI
-import os
+import logging
+from .llm_cache import response_cache
+from .llm_gateway import get_client
+from ...observability.metrics import attributed_to
+
+logger = logging.getLogger(__name__)
+
+CLASSIFICATION_PARAMS = {"model": "gpt-4o-mini", "temperature": 1, "max_tokens": 50, "top_p": 1, "prompt_version": 1}
 
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 async def run_classification(inp: str) -> str:
     """
     Extrai a ideia principal do input do usuário em poucas palavras.
 
+    Respostas são reaproveitadas pelo cache de respostas (títulos iguais ou,
+    com a camada semântica ligada, muito parecidos não chamam a API de novo).
+
     Args:
         inp: O texto do usuário para classificar
 
     Returns:
         A ideia principal em 2-8 palavras
     """
+    return await response_cache.get_or_create(
+        "classification",
+        inp,
+        CLASSIFICATION_PARAMS,
+        lambda: _run_classification(inp),
+        is_cacheable=lambda value: bool(value) and value != "Erro na classificação",
+    )
+
+
+@attributed_to("classification")
+async def _run_classification(inp: str) -> str:
     try:
-        response = await client.chat.completions.create(
+        response = await get_client().chat.completions.create(
             model="gpt-4o-mini",
             messages=[
                 {
@@ -36,5 +55,5 @@ async def run_classification(inp: str) -> str:
         return classification
 
     except Exception as e:
-        print(f"Erro ao classificar: {e}")
+        logger.error("Erro ao classificar: %s", e)
         return "Erro na classificação"
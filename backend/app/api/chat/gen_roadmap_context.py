@@ -1,12 +1,18 @@
+import asyncio
 import json
+import logging
 
 from pydantic import BaseModel
-from agents import Agent, ModelSettings, RunContextWrapper, TResponseInputItem, Runner, RunConfig, trace
+from agents import Agent, ModelSettings, RunContextWrapper, TResponseInputItem, RunConfig, trace
 from openai.types.shared.reasoning import Reasoning
 
+from .llm_gateway import get_client, run_agent
+
 from app.database.querys.roadmap_query import create_roadmap_steps, RoadmapTasks, create_roadmap_tasks, \
     RoadmapSteps
 
+logger = logging.getLogger(__name__)
+
 
 class CriandoTaksDoRoadmapSchema__TarefasItem(BaseModel):
   description: str
@@ -363,6 +369,8 @@ class WorkflowInput(BaseModel):
 
 # Main code entrypoint
 async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
+  # garante que o Runner use o cliente compartilhado (pool, limites e retries)
+  get_client()
   with trace("New workflow"):
     workflow = workflow_input.model_dump()
     conversation_history: list[TResponseInputItem] = [
@@ -376,7 +384,8 @@ async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
         ]
       }
     ]
-    criando_contexto_result_temp = await Runner.run(
+    criando_contexto_result_temp = await run_agent(
+      "criando_contexto",
       criando_contexto,
       input=[
         *conversation_history
@@ -392,7 +401,8 @@ async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
     criando_contexto_result = {
       "output_text": criando_contexto_result_temp.final_output_as(str)
     }
-    melhorando_contexto_result_temp = await Runner.run(
+    melhorando_contexto_result_temp = await run_agent(
+      "melhorando_contexto",
       melhorando_contexto,
       input=[
         *conversation_history
@@ -409,7 +419,8 @@ async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
     melhorando_contexto_result = {
       "output_text": melhorando_contexto_result_temp.final_output_as(str)
     }
-    criando_passos_do_roadmap_result_temp = await Runner.run(
+    criando_passos_do_roadmap_result_temp = await run_agent(
+      "criando_passos_do_roadmap",
       criando_passos_do_roadmap,
       input=[
         *conversation_history
@@ -431,7 +442,7 @@ async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
     steps: list[dict[str, str | int]] = []
     try:
         roadmap_steps_data = json.loads(criando_passos_do_roadmap_result["output_text"])
-        print(f"roadmap_steps_data: {roadmap_steps_data}")
+        logger.debug("roadmap_steps_data: %s", roadmap_steps_data)
 
         # O output_type retorna {'steps': [...]}
         if isinstance(roadmap_steps_data, dict) and 'steps' in roadmap_steps_data:
@@ -439,7 +450,7 @@ async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
         else:
             roadmap_steps = roadmap_steps_data
 
-        print(f"roadmap_steps: {roadmap_steps}")
+        logger.debug("roadmap_steps: %s", roadmap_steps)
 
         for step in roadmap_steps:
             roadmap_steps_parsed = RoadmapSteps(
@@ -449,7 +460,7 @@ async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
                 description=step["description"]
             )
 
-            step_id = create_roadmap_steps(roadmap_steps_parsed)
+            step_id = await asyncio.to_thread(create_roadmap_steps, roadmap_steps_parsed)
 
             steps.append({
                 "id": step_id,
@@ -458,11 +469,9 @@ async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
                 "description": step["description"]
             })
 
-        print(f"steps criados: {steps}")
+        logger.debug("steps criados: %s", steps)
     except Exception as e:
-        print(f"Erro ao criar roadmap steps no banco de dados: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Erro ao criar roadmap steps no banco de dados: %s", e)
         return  # Não continua se falhou ao criar steps
 
     # Só executa tasks se os steps foram criados com sucesso
@@ -470,7 +479,8 @@ async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
         # Prepara o JSON com os steps e seus IDs para o agente de tasks
         steps_with_ids = json.dumps(steps)
 
-        criando_taks_do_roadmap_result_temp = await Runner.run(
+        criando_taks_do_roadmap_result_temp = await run_agent(
+          "criando_taks_do_roadmap",
           criando_taks_do_roadmap,
           input=[
             *conversation_history
@@ -491,14 +501,14 @@ async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
 
         try:
             roadmap_tasks_data = json.loads(criando_taks_do_roadmap_result["output_text"])
-            print(f"roadmap_tasks_data: {roadmap_tasks_data}")
+            logger.debug("roadmap_tasks_data: %s", roadmap_tasks_data)
 
             if isinstance(roadmap_tasks_data, dict) and 'tarefas' in roadmap_tasks_data:
                 roadmap_tasks = roadmap_tasks_data['tarefas']
             else:
                 roadmap_tasks = roadmap_tasks_data
 
-            print(f"roadmap_tasks: {roadmap_tasks}")
+            logger.debug("roadmap_tasks: %s", roadmap_tasks)
 
             for task in roadmap_tasks:
                 roadmap_tasks_parsed = RoadmapTasks(
@@ -508,13 +518,11 @@ async def run_workflow(workflow_input: WorkflowInput, roadmap_id: str):
                     suggested_tools=task["suggested_tools"]
                 )
 
-                task_id = create_roadmap_tasks(roadmap_tasks_parsed)
+                task_id = await asyncio.to_thread(create_roadmap_tasks, roadmap_tasks_parsed)
                 if not task_id:
-                    print(f"Erro ao criar roadmap tasks no banco de dados: {task}")
-            print(f"tasks criadas: {len(roadmap_tasks)}")
+                    logger.error("Erro ao criar roadmap tasks no banco de dados: %s", task)
+            logger.debug("tasks criadas: %s", len(roadmap_tasks))
         except Exception as e:
-            print(f"Erro ao criar roadmap tasks no banco de dados: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Erro ao criar roadmap tasks no banco de dados: %s", e)
     else:
-        print("Nenhum step foi criado, pulando criação de tasks")
+        logger.debug("Nenhum step foi criado, pulando criação de tasks")
@@ -0,0 +1,211 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import time
+import unicodedata
+import zlib
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INTENT_ROUTER_ENABLED = os.getenv("INTENT_ROUTER_ENABLED", "1").lower() in ("1", "true", "yes")
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.97"))
+# Regra de palavras-chave só decide se o modelo concordar com pelo menos esta confiança
+INTENT_ROUTER_RULE_THRESHOLD = float(os.getenv("INTENT_ROUTER_RULE_THRESHOLD", "0.8"))
+# Mínimo de decisões do agente (por intenção) antes de o modelo local ser usado
+INTENT_ROUTER_MIN_SAMPLES = int(os.getenv("INTENT_ROUTER_MIN_SAMPLES", "30"))
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "..", ".intent_log.jsonl"))
+# O log guarda texto do usuário: arquivo rotacionado (tamanho x quantidade) e mensagens cortadas
+INTENT_LOG_MAX_BYTES = int(os.getenv("INTENT_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+INTENT_LOG_BACKUPS = int(os.getenv("INTENT_LOG_BACKUPS", "3"))
+INTENT_LOG_TEXT_CHARS = int(os.getenv("INTENT_LOG_TEXT_CHARS", "500"))
+
+LABELS = ("criar_ideia", "tirar_duvida", "nao_relacionado")
+
+# Variações que o agente às vezes devolve
+LABEL_ALIASES = {"tirar_duvidas": "tirar_duvida", "criar_idea": "criar_ideia", "criarideia": "criar_ideia"}
+
+_FEATURE_DIM = 1 << 16
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Palavras que indicam que a mensagem fala do projeto/ideia do usuário
+_PROJECT_RE = re.compile(
+    r"\b(projeto|ideia|ideias|app|aplicativo|sistema|plataforma|produto|startup|mvp|funcionalidade|funcionalidades|"
+    r"feature|features|usuario|usuarios|cliente|clientes|mercado|concorrente|concorrentes|tecnologia|stack|"
+    r"backend|frontend|banco de dados|roadmap|monetizar|monetizacao|publico|negocio)\b"
+)
+_QUESTION_RE = re.compile(
+    r"(\?\s*$|^(como|qual|quais|o que|oque|por que|porque|quando|onde|quanto|quantos|devo|posso|seria|"
+    r"vale a pena|e possivel|tem como|existe)\b)"
+)
+_CREATE_RE = re.compile(
+    r"\b(crie|criar|cria|gere|gerar|gera|sugira|sugerir|desenvolva|desenvolver|monte|montar|liste|listar|"
+    r"proponha|elabore|elaborar|me de ideias|me ajude a criar|novas funcionalidades|brainstorm)\b"
+)
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(c for c in text if not unicodedata.combining(c)).strip()
+
+
+def _features(text: str) -> np.ndarray:
+    words = _TOKEN_RE.findall(text)
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) % _FEATURE_DIM for g in grams), dtype=np.int64, count=len(grams))
+
+
+@dataclass
+class IntentDecision:
+    label: str
+    confidence: float
+    source: str  # rules | model
+
+
+class NaiveBayesIntentModel:
+    """Multinomial naive Bayes over hashed word unigrams/bigrams.
+
+    Trained online from the decisions of the `entender` agent, so it needs no
+    extra dependency and learns from production traffic.
+    """
+
+    def __init__(self, alpha: float = 0.5):
+        self.alpha = alpha
+        self.feature_counts = np.zeros((len(LABELS), _FEATURE_DIM), dtype=np.float32)
+        self.class_counts = np.zeros(len(LABELS), dtype=np.float64)
+        self.token_totals = np.zeros(len(LABELS), dtype=np.float64)
+
+    def learn(self, text: str, label: str) -> None:
+        idx = _features(_normalize(text))
+        k = LABELS.index(label)
+        np.add.at(self.feature_counts[k], idx, 1.0)
+        self.class_counts[k] += 1
+        self.token_totals[k] += len(idx)
+
+    def ready(self) -> bool:
+        return bool(self.class_counts.min() >= INTENT_ROUTER_MIN_SAMPLES)
+
+    def predict(self, text: str) -> tuple[str, float]:
+        idx = _features(_normalize(text))
+        totals = self.token_totals + self.alpha * _FEATURE_DIM
+        log_prior = np.log(self.class_counts / self.class_counts.sum())
+        log_likelihood = np.log(self.feature_counts[:, idx] + self.alpha).sum(axis=1) - len(idx) * np.log(totals)
+        scores = log_prior + log_likelihood
+        probs = np.exp(scores - scores.max())
+        probs /= probs.sum()
+        k = int(probs.argmax())
+        return LABELS[k], float(probs[k])
+
+
+class IntentRouter:
+    """Local fast path for the `entender` classification.
+
+    Nothing is routed locally until the naive Bayes model, trained on logged
+    agent decisions, is ready. Keyword rules then answer when the model agrees
+    with at least `INTENT_ROUTER_RULE_THRESHOLD`; otherwise the model answers
+    alone when its confidence is at least `INTENT_ROUTER_THRESHOLD`. `route`
+    returns None when the agent should decide. Every decision is appended to
+    `INTENT_LOG_PATH` (rotated, written by a background thread); only the
+    agent's decisions are used for training, so the router never learns from
+    itself.
+    """
+
+    def __init__(self, log_path: str = INTENT_LOG_PATH):
+        self.log_path = os.path.abspath(log_path)
+        self.model = NaiveBayesIntentModel()
+        self.stats = {"rules": 0, "model": 0, "agent": 0}
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    def load(self) -> int:
+        """Train the model from the decision log (rotated files included). Returns the number of samples used."""
+        paths = [f"{self.log_path}.{n}" for n in range(INTENT_LOG_BACKUPS, 0, -1)] + [self.log_path]
+        loaded = 0
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get("source") == "agent" and entry.get("label") in LABELS:
+                        self.model.learn(entry.get("text", ""), entry["label"])
+                        loaded += 1
+        return loaded
+
+    def start(self) -> None:
+        """Start the thread that appends decisions to the log file."""
+        if self._listener is not None:
+            return
+        handler = logging.handlers.RotatingFileHandler(
+            self.log_path, maxBytes=INTENT_LOG_MAX_BYTES, backupCount=INTENT_LOG_BACKUPS, encoding="utf-8", delay=True,
+        )
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Write what is still queued and stop the log thread."""
+        if self._listener is None:
+            return
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        self._listener = None
+
+    def _rules(self, normalized: str) -> Optional[str]:
+        about_project = bool(_PROJECT_RE.search(normalized))
+        is_question = bool(_QUESTION_RE.search(normalized))
+        wants_creation = bool(_CREATE_RE.search(normalized))
+        # sem menção ao projeto a mensagem pode ser um pedido qualquer: fica com o agente
+        if wants_creation and about_project and not is_question:
+            return "criar_ideia"
+        if is_question and about_project and not wants_creation:
+            return "tirar_duvida"
+        return None
+
+    def route(self, text: str) -> Optional[IntentDecision]:
+        if not INTENT_ROUTER_ENABLED:
+            return None
+        # sem o modelo treinado as regras não têm contraprova: tudo vai para o agente
+        if not self.model.ready():
+            return None
+        rule_label = self._rules(_normalize(text))
+        label, confidence = self.model.predict(text)
+        if rule_label is not None and label == rule_label and confidence >= INTENT_ROUTER_RULE_THRESHOLD:
+            decision = IntentDecision(label, confidence, "rules")
+        elif confidence >= INTENT_ROUTER_THRESHOLD:
+            decision = IntentDecision(label, confidence, "model")
+        else:
+            return None
+        self.stats[decision.source] += 1
+        self._log(text, decision.label, decision.source, decision.confidence)
+        return decision
+
+    def record(self, text: str, label: str) -> None:
+        """Store a decision made by the `entender` agent and learn from it."""
+        label = LABEL_ALIASES.get(label, label)
+        if label not in LABELS:
+            return
+        self.stats["agent"] += 1
+        self.model.learn(text, label)
+        self._log(text, label, "agent", None)
+
+    def _log(self, text: str, label: str, source: str, confidence: Optional[float]) -> None:
+        # só enfileira: abrir/gravar/rotacionar o arquivo fica com a thread do QueueListener
+        if self._listener is None:
+            self.start()
+        entry = {
+            "ts": time.time(), "text": text[:INTENT_LOG_TEXT_CHARS], "label": label, "source": source, "confidence": confidence,
+        }
+        self._queue.put_nowait(logging.makeLogRecord({"msg": json.dumps(entry, ensure_ascii=False)}))
+
+
+intent_router = IntentRouter()
@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Awaitable, Callable, Optional
+
+import numpy as np
+
+from ..similar.embedder import get_embedder
+from ..similar.vector_store import VectorStore
+from ...database.utils.connect_db import get_db_conn
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "disk").lower()  # disk | postgres | off
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), "..", "..", "..", ".llm_cache.sqlite3"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "20000"))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "0").lower() in ("1", "true", "yes")
+LLM_CACHE_SIMILARITY = float(os.getenv("LLM_CACHE_SIMILARITY", "0.95"))
+
+db_name = os.getenv("POSTGRES_DB", "idea_hub_db")
+
+# A limpeza de expirados/excedentes roda a cada N escritas para amortizar o custo
+_EVICT_EVERY = 100
+
+
+def normalize_prompt(text: str) -> str:
+    """Case/accent/whitespace-insensitive form of a prompt, used for the exact-match key."""
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.strip(" .!?;:")
+
+
+def cache_key(namespace: str, prompt: str, params: dict) -> str:
+    payload = json.dumps({"ns": namespace, "prompt": normalize_prompt(prompt), "params": params}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLiteCacheBackend:
+    """Local-disk backend (one SQLite file per worker host)."""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                namespace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                embedding BLOB,
+                expires_at REAL NOT NULL,
+                last_access_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access_at)")
+
+    def get(self, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key: str, namespace: str, value: Any, embedding: Optional[bytes], ttl: float = LLM_CACHE_TTL) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, namespace, value, embedding, expires_at, last_access_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, json.dumps(value), embedding, now + ttl, now),
+            )
+
+    def delete_namespace(self, prefix: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM llm_cache WHERE namespace = ? OR namespace LIKE ?", (prefix, f"{prefix}:%")
+            ).rowcount
+
+    def evict(self) -> int:
+        now = time.time()
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,)).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "  SELECT key FROM llm_cache ORDER BY last_access_at DESC LIMIT -1 OFFSET ?"
+                ")",
+                (LLM_CACHE_MAX_ENTRIES,),
+            ).rowcount
+        return removed
+
+    def embeddings(self, namespace: str, limit: int) -> list[tuple[str, bytes]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT key, embedding FROM llm_cache WHERE namespace = ? AND embedding IS NOT NULL AND expires_at > ? "
+                "ORDER BY last_access_at DESC LIMIT ?",
+                (namespace, time.time(), limit),
+            ).fetchall()
+
+
+class PostgresCacheBackend:
+    """Shared backend in the application database (table `llm_cache`)."""
+
+    def _run(self, fn):
+        conn, cur = get_db_conn(db_name, name="llm_cache")
+        try:
+            return fn(cur)
+        finally:
+            try:
+                cur.close()
+                conn.close()
+            except Exception:
+                pass
+
+    def get(self, key: str) -> Any:
+        def op(cur):
+            cur.execute(
+                "UPDATE llm_cache SET last_access_at = NOW() WHERE key = %s AND expires_at > NOW() RETURNING value",
+                (key,),
+            )
+            row = cur.fetchone()
+            return row[0] if row else None
+        return self._run(op)
+
+    def set(self, key: str, namespace: str, value: Any, embedding: Optional[bytes], ttl: float = LLM_CACHE_TTL) -> None:
+        def op(cur):
+            cur.execute(
+                """
+                INSERT INTO llm_cache (key, namespace, value, embedding, expires_at, last_access_at)
+                VALUES (%s, %s, %s::jsonb, %s, NOW() + make_interval(secs => %s), NOW())
+                ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, embedding = EXCLUDED.embedding,
+                    expires_at = EXCLUDED.expires_at, last_access_at = NOW()
+                """,
+                (key, namespace, json.dumps(value), embedding, ttl),
+            )
+        self._run(op)
+
+    def delete_namespace(self, prefix: str) -> int:
+        def op(cur):
+            cur.execute("DELETE FROM llm_cache WHERE namespace = %s OR namespace LIKE %s", (prefix, f"{prefix}:%"))
+            return cur.rowcount
+        return self._run(op)
+
+    def evict(self) -> int:
+        def op(cur):
+            cur.execute("DELETE FROM llm_cache WHERE expires_at <= NOW()")
+            removed = cur.rowcount
+            cur.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "  SELECT key FROM llm_cache ORDER BY last_access_at DESC OFFSET %s"
+                ")",
+                (LLM_CACHE_MAX_ENTRIES,),
+            )
+            return removed + cur.rowcount
+        return self._run(op)
+
+    def embeddings(self, namespace: str, limit: int) -> list[tuple[str, bytes]]:
+        def op(cur):
+            cur.execute(
+                "SELECT key, embedding FROM llm_cache WHERE namespace = %s AND embedding IS NOT NULL "
+                "AND expires_at > NOW() ORDER BY last_access_at DESC LIMIT %s",
+                (namespace, limit),
+            )
+            return [(row[0], bytes(row[1])) for row in cur.fetchall()]
+        return self._run(op)
+
+
+class ResponseCache:
+    """Two-level cache for LLM helper responses.
+
+    Level 1 is an exact match on the normalised prompt plus model parameters.
+    Level 2 (opt-in with `LLM_CACHE_SEMANTIC=1`) embeds the prompt and reuses
+    the answer of a previous prompt whose cosine similarity is at least
+    `LLM_CACHE_SIMILARITY`. Entries expire after `LLM_CACHE_TTL` seconds and the
+    least recently used ones are evicted beyond `LLM_CACHE_MAX_ENTRIES`.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.stats: dict[str, dict[str, int]] = {}
+        self._writes = 0
+        self._semantic: dict[str, tuple[VectorStore, float]] = {}
+
+    def _count(self, namespace: str, event: str) -> None:
+        ns = self.stats.setdefault(namespace, {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "errors": 0})
+        ns[event] = ns.get(event, 0) + 1
+
+    async def _semantic_index(self, namespace: str, dim: int) -> VectorStore:
+        entry = self._semantic.get(namespace)
+        if entry is not None and time.monotonic() - entry[1] < 300:
+            return entry[0]
+        store = VectorStore(dim)
+        rows = await asyncio.to_thread(self.backend.embeddings, namespace, 5000)
+        rows = [(k, np.frombuffer(e, dtype=np.float32)) for k, e in rows if e and len(e) == dim * 4]
+        if rows:
+            store.upsert([k for k, _ in rows], np.stack([v for _, v in rows]))
+        self._semantic[namespace] = (store, time.monotonic())
+        return store
+
+    async def lookup(self, namespace: str, prompt: str, params: dict, scope: str = "") -> tuple[Any, Optional[np.ndarray]]:
+        """Return (cached value or None, prompt embedding used by the semantic layer).
+
+        `scope` partitions the storage (and the semantic index) inside a
+        namespace, e.g. one idea version, while stats stay per namespace.
+        """
+        stored_ns = f"{namespace}:{scope}" if scope else namespace
+        key = cache_key(stored_ns, prompt, params)
+        try:
+            value = await asyncio.to_thread(self.backend.get, key)
+            if value is not None:
+                self._count(namespace, "exact_hits")
+                return value, None
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.error("erro ao ler cache: %s", e)
+
+        vector = None
+        if LLM_CACHE_SEMANTIC:
+            try:
+                embedder = get_embedder()
+                vector = (await embedder.embed([f"{json.dumps(params, sort_keys=True)}\n{normalize_prompt(prompt)}"]))[0]
+                index = await self._semantic_index(stored_ns, embedder.dim)
+                best = index.search(vector, k=1)
+                if best and best[0][1] >= LLM_CACHE_SIMILARITY:
+                    value = await asyncio.to_thread(self.backend.get, best[0][0])
+                    if value is not None:
+                        self._count(namespace, "semantic_hits")
+                        return value, vector
+            except Exception as e:
+                self._count(namespace, "errors")
+                logger.error("erro na camada semantica: %s", e)
+
+        self._count(namespace, "misses")
+        return None, vector
+
+    async def store(
+        self,
+        namespace: str,
+        prompt: str,
+        params: dict,
+        value: Any,
+        vector: Optional[np.ndarray] = None,
+        scope: str = "",
+        ttl: float = LLM_CACHE_TTL,
+    ) -> None:
+        stored_ns = f"{namespace}:{scope}" if scope else namespace
+        key = cache_key(stored_ns, prompt, params)
+        try:
+            embedding = vector.astype(np.float32).tobytes() if vector is not None else None
+            await asyncio.to_thread(self.backend.set, key, stored_ns, value, embedding, ttl)
+            if vector is not None and stored_ns in self._semantic:
+                self._semantic[stored_ns][0].upsert([key], vector[None, :])
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                await asyncio.to_thread(self.backend.evict)
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.error("erro ao gravar cache: %s", e)
+
+    async def invalidate(self, namespace: str, scope: str = "") -> int:
+        """Drop every entry of a namespace (or of `namespace:scope*`)."""
+        prefix = f"{namespace}:{scope}" if scope else namespace
+        for stored_ns in [ns for ns in self._semantic if ns == prefix or ns.startswith(f"{prefix}:")]:
+            self._semantic.pop(stored_ns, None)
+        try:
+            return await asyncio.to_thread(self.backend.delete_namespace, prefix)
+        except Exception as e:
+            self._count(namespace, "errors")
+            logger.error("erro ao invalidar cache: %s", e)
+            return 0
+
+    async def get_or_create(
+        self,
+        namespace: str,
+        prompt: str,
+        params: dict,
+        producer: Callable[[], Awaitable[Any]],
+        is_cacheable: Callable[[Any], bool] = bool,
+    ) -> Any:
+        """Return a cached response for (namespace, prompt, params) or call `producer` and store it."""
+        value, vector = await self.lookup(namespace, prompt, params)
+        if value is not None:
+            return value
+        value = await producer()
+        if is_cacheable(value):
+            await self.store(namespace, prompt, params, value, vector)
+        return value
+
+
+class _NoCache:
+    stats: dict = {}
+
+    async def lookup(self, namespace, prompt, params, scope=""):
+        return None, None
+
+    async def store(self, namespace, prompt, params, value, vector=None, scope="", ttl=LLM_CACHE_TTL):
+        return None
+
+    async def invalidate(self, namespace, scope=""):
+        return 0
+
+    async def get_or_create(self, namespace, prompt, params, producer, is_cacheable=bool):
+        return await producer()
+
+
+def _build_cache():
+    if LLM_CACHE_BACKEND == "off":
+        return _NoCache()
+    try:
+        if LLM_CACHE_BACKEND == "postgres":
+            return ResponseCache(PostgresCacheBackend())
+        return ResponseCache(SQLiteCacheBackend(os.path.abspath(LLM_CACHE_PATH)))
+    except Exception as e:
+        logger.warning("cache desabilitado: %s", e)
+        return _NoCache()
+
+
+response_cache = _build_cache()
@@ -0,0 +1,305 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from ...observability.metrics import AGENT_RUN_SECONDS, LLM_IN_FLIGHT, LLM_RETRIES, LLM_WAITING, current_llm_caller, llm_caller, observe_llm_request
+from ...observability.tracing import SpanKind, span
+
+logger = logging.getLogger(__name__)
+
+# openai | fake (respostas locais e determinísticas, para testes de carga e benchmarks)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "90"))
+LLM_CONNECT_TIMEOUT_S = float(os.getenv("LLM_CONNECT_TIMEOUT_S", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "64"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_S = float(os.getenv("LLM_RETRY_BASE_S", "0.5"))
+LLM_RETRY_MAX_S = float(os.getenv("LLM_RETRY_MAX_S", "20"))
+# Dispara uma segunda requisição idêntica se a primeira passar deste tempo (0 = desligado)
+LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "0"))
+# Limites do provedor por modelo: "gpt-4o-mini=500:200000,gpt-4.1-mini=500:200000" (RPM:TPM)
+LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")
+# Concorrência por modelo: "gpt-4.1-mini=8,gpt-5-nano=32"
+LLM_MODEL_CONCURRENCY = os.getenv("LLM_MODEL_CONCURRENCY", "")
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _parse_mapping(raw: str) -> dict[str, str]:
+    result = {}
+    for part in raw.split(","):
+        if "=" in part:
+            key, value = part.split("=", 1)
+            result[key.strip()] = value.strip()
+    return result
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at `per_minute / 60` tokens per second."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = float(per_minute) / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class ModelLimiter:
+    """Concurrency cap plus optional RPM/TPM buckets for one model."""
+
+    def __init__(self, model: str, concurrency: int, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.model = model
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int):
+        waiting = LLM_WAITING.labels(self.model)
+        waiting.inc()
+        try:
+            if self.requests is not None:
+                await self.requests.acquire(1)
+            if self.tokens is not None:
+                await self.tokens.acquire(estimated_tokens)
+            await self.semaphore.acquire()
+        finally:
+            waiting.dec()
+        in_flight = LLM_IN_FLIGHT.labels(self.model)
+        in_flight.inc()
+        try:
+            yield
+        finally:
+            in_flight.dec()
+            self.semaphore.release()
+
+
+def _inspect_request(request: httpx.Request) -> tuple[str, int]:
+    """Return (model, estimated tokens) for an OpenAI API request body."""
+    try:
+        body = json.loads(request.content or b"{}")
+    except Exception:
+        return "unknown", 0
+    model = str(body.get("model") or "unknown")
+    # estimativa grosseira: ~4 caracteres por token de entrada + o máximo de saída pedido
+    prompt_chars = len(request.content or b"")
+    max_out = body.get("max_tokens") or body.get("max_output_tokens") or body.get("max_completion_tokens") or 512
+    return model, prompt_chars // 4 + int(max_out)
+
+
+async def _usage(response: httpx.Response) -> tuple[int, int]:
+    """(input, output) tokens reported by a non-streaming OpenAI response."""
+    if not response.headers.get("content-type", "").startswith("application/json"):
+        return 0, 0
+    try:
+        # o corpo fica em memória; o cliente da OpenAI lê o mesmo conteúdo depois
+        await response.aread()
+        usage = json.loads(response.content).get("usage") or {}
+    except Exception:
+        return 0, 0
+    inp = usage.get("prompt_tokens") or usage.get("input_tokens") or 0
+    out = usage.get("completion_tokens") or usage.get("output_tokens") or 0
+    return int(inp), int(out)
+
+
+def _retry_delay(attempt: int, response: Optional[httpx.Response]) -> float:
+    if response is not None:
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), LLM_RETRY_MAX_S)
+            except ValueError:
+                pass
+    # exponential backoff com "full jitter"
+    return random.uniform(0, min(LLM_RETRY_MAX_S, LLM_RETRY_BASE_S * (2 ** attempt)))
+
+
+class GatewayTransport(httpx.AsyncBaseTransport):
+    """httpx transport shared by every OpenAI call (helpers and agents SDK).
+
+    Sitting at the transport level means the limits apply to all traffic,
+    including requests made internally by `Runner.run`: per-model concurrency
+    and RPM/TPM buckets, jittered retries on 429/5xx and connection errors, and
+    optional hedging of slow requests.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self._inner = inner
+        self._limiters: dict[str, ModelLimiter] = {}
+        self._rate_limits = _parse_mapping(LLM_RATE_LIMITS)
+        self._concurrency = _parse_mapping(LLM_MODEL_CONCURRENCY)
+
+    def limiter(self, model: str) -> ModelLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            rpm = tpm = None
+            if model in self._rate_limits:
+                rpm_raw, _, tpm_raw = self._rate_limits[model].partition(":")
+                rpm = float(rpm_raw) if rpm_raw else None
+                tpm = float(tpm_raw) if tpm_raw else None
+            concurrency = int(self._concurrency.get(model, LLM_MAX_CONCURRENCY))
+            limiter = self._limiters[model] = ModelLimiter(model, concurrency, rpm, tpm)
+        return limiter
+
+    async def _send_hedged(self, request: httpx.Request) -> httpx.Response:
+        if LLM_HEDGE_AFTER_S <= 0 or request.headers.get("accept") == "text/event-stream":
+            return await self._inner.handle_async_request(request)
+
+        first = asyncio.ensure_future(self._inner.handle_async_request(request))
+        done, _ = await asyncio.wait({first}, timeout=LLM_HEDGE_AFTER_S)
+        if done:
+            return first.result()
+
+        second = asyncio.ensure_future(self._inner.handle_async_request(request))
+        done, pending = await asyncio.wait({first, second}, return_when=asyncio.FIRST_COMPLETED)
+        winner = next((t for t in done if t.exception() is None), None)
+        if winner is None:
+            # quem terminou falhou: fica com o pedido que ainda está em andamento
+            if pending:
+                return await pending.pop()
+            return done.pop().result()
+
+        for task in pending:
+            task.cancel()
+            try:
+                await task
+            except BaseException:
+                pass
+        for task in done - {winner}:
+            if task.exception() is None:
+                await task.result().aclose()
+        return winner.result()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        model, estimated_tokens = _inspect_request(request)
+        limiter = self.limiter(model)
+        started = time.perf_counter()
+
+        with span(f"llm {model}", SpanKind.CLIENT, **{"gen_ai.request.model": model, "ideahub.llm.caller": current_llm_caller(),
+                                                      "url.path": request.url.path}) as s:
+            attempt = 0
+            while True:
+                response = None
+                try:
+                    async with limiter.slot(estimated_tokens):
+                        response = await self._send_hedged(request)
+                    if response.status_code not in RETRY_STATUSES or attempt >= LLM_MAX_RETRIES:
+                        input_tokens, output_tokens = await _usage(response)
+                        observe_llm_request(model, str(response.status_code), time.perf_counter() - started, input_tokens, output_tokens)
+                        if s is not None:
+                            s.set_attribute("http.response.status_code", response.status_code)
+                            s.set_attribute("gen_ai.usage.input_tokens", input_tokens)
+                            s.set_attribute("gen_ai.usage.output_tokens", output_tokens)
+                            s.set_attribute("ideahub.llm.attempts", attempt + 1)
+                        return response
+                    await response.aread()
+                    await response.aclose()
+                except (httpx.TransportError,) as e:
+                    if attempt >= LLM_MAX_RETRIES:
+                        observe_llm_request(model, type(e).__name__, time.perf_counter() - started, 0, 0)
+                        raise
+                    logger.error("erro de transporte (%s), tentativa %s: %s", model, attempt + 1, e)
+                LLM_RETRIES.labels(model).inc()
+                await asyncio.sleep(_retry_delay(attempt, response))
+                attempt += 1
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    if LLM_PROVIDER == "fake":
+        from .fake_llm import get_fake_transport
+        inner = get_fake_transport()
+    else:
+        http2 = importlib.util.find_spec("h2") is not None
+        inner = httpx.AsyncHTTPTransport(
+            http2=http2,
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS, keepalive_expiry=60),
+        )
+    return httpx.AsyncClient(
+        transport=GatewayTransport(inner),
+        timeout=httpx.Timeout(LLM_TIMEOUT_S, connect=LLM_CONNECT_TIMEOUT_S),
+    )
+
+
+def get_client() -> AsyncOpenAI:
+    """Return the process-wide OpenAI client (pooled HTTP/2 connections, limits and retries)."""
+    global _client
+    if _client is None:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if LLM_PROVIDER == "fake":
+            api_key = api_key or "fake"
+        _client = AsyncOpenAI(
+            api_key=api_key,
+            http_client=_build_http_client(),
+            # as tentativas ficam a cargo do GatewayTransport
+            max_retries=0,
+        )
+        try:
+            from agents import set_default_openai_client, set_tracing_disabled
+            set_default_openai_client(_client)
+            if LLM_PROVIDER == "fake":
+                # os traces seriam enviados para a OpenAI por fora deste cliente
+                set_tracing_disabled(True)
+        except Exception as e:
+            logger.warning("agents SDK nao configurado com o cliente compartilhado: %s", e)
+    return _client
+
+
+async def run_agent(name: str, agent, **kwargs):
+    """`Runner.run` with metrics and a tracing span; the run's OpenAI requests are attributed to `name`."""
+    from agents import Runner
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        with span(f"agent {name}", **{"gen_ai.agent.name": name}) as s, llm_caller(name):
+            if s is not None and kwargs.get("run_config") is not None:
+                # liga o trace do agents SDK (painel da OpenAI) ao trace OpenTelemetry da requisição
+                metadata = kwargs["run_config"].trace_metadata
+                if metadata is not None:
+                    metadata["otel_trace_id"] = format(s.get_span_context().trace_id, "032x")
+            result = await Runner.run(agent, **kwargs)
+            if s is not None:
+                usage = result.context_wrapper.usage
+                s.set_attribute("gen_ai.usage.input_tokens", usage.input_tokens)
+                s.set_attribute("gen_ai.usage.output_tokens", usage.output_tokens)
+                s.set_attribute("ideahub.llm.requests", usage.requests)
+        outcome = "ok"
+        return result
+    finally:
+        AGENT_RUN_SECONDS.labels(name, outcome).observe(time.perf_counter() - started)
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import uuid
+from typing import Optional
+
+from ...database.querys.chat_query import create_messages
+
+logger = logging.getLogger(__name__)
+
+# 1 = grava as mensagens em segundo plano, agrupando vários turnos em um INSERT
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+CHAT_WRITE_BEHIND_MS = float(os.getenv("CHAT_WRITE_BEHIND_MS", "5"))
+CHAT_WRITE_BATCH = int(os.getenv("CHAT_WRITE_BATCH", "500"))
+CHAT_WRITE_RETRIES = 3
+
+_STOP = object()
+
+
+class TurnBuffer:
+    """Messages produced by one chat turn, written in batches.
+
+    In the default mode nothing touches the database until `commit`, which
+    writes every message added since the previous commit with one multi-row
+    INSERT (the route commits the user message before running the workflow and
+    the AI replies at the end). In write-behind mode each message is handed to
+    the writer's queue as soon as it is added, so the user message is
+    acknowledged without waiting for the database.
+
+    Message ids are generated here, so `messages` (the turn's messages that were
+    written or queued) can be handed to the chat memory before the rows exist.
+    """
+
+    def __init__(self, writer: "MessageWriter", chat_id: str):
+        self.writer = writer
+        self.chat_id = chat_id
+        self.messages: list[dict] = []
+        self._pending: list[tuple[str, str, str, str]] = []
+
+    def add(self, message: str, sender: str) -> None:
+        message_id = str(uuid.uuid4())
+        self.messages.append({"id": message_id, "sender": sender, "message": message})
+        row = (message_id, self.chat_id, message, sender)
+        if self.writer.write_behind:
+            self.writer.enqueue(row)
+        else:
+            self._pending.append(row)
+
+    async def commit(self) -> bool:
+        rows, self._pending = self._pending, []
+        if not rows:
+            return True
+        try:
+            written = await asyncio.to_thread(create_messages, rows)
+        except Exception:
+            written = False
+        if not written:
+            lost = {row[0] for row in rows}
+            self.messages = [m for m in self.messages if m["id"] not in lost]
+        return written
+
+
+class MessageWriter:
+    """Persists chat messages in batches.
+
+    The INSERT assigns `ai_messages.seq` in list order, and the write-behind
+    queue is FIFO with a single flusher, so messages keep the order in which
+    they were produced without relying on timestamps.
+    """
+
+    def __init__(self, write_behind: bool = CHAT_WRITE_BEHIND):
+        self.write_behind = write_behind
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def turn(self, chat_id: str) -> TurnBuffer:
+        return TurnBuffer(self, chat_id)
+
+    def start(self) -> None:
+        if not self.write_behind or self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, row: tuple[str, str, str, str]) -> None:
+        if self._queue is None:
+            self.start()
+        self._queue.put_nowait(row)
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            # pequena janela para juntar mensagens de outros turnos no mesmo INSERT
+            await asyncio.sleep(CHAT_WRITE_BEHIND_MS / 1000)
+            while len(batch) < CHAT_WRITE_BATCH and not self._queue.empty():
+                item = self._queue.get_nowait()
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[tuple[str, str, str, str]]) -> None:
+        by_chat: dict[str, list[tuple[str, str, str, str]]] = {}
+        for row in batch:
+            by_chat.setdefault(row[1], []).append(row)
+        if len(by_chat) == 1:
+            await self._write_with_retries(batch)
+            return
+        if await self._write(batch):
+            return
+        # uma linha ruim (chat_id inválido ou chat apagado) derruba o INSERT inteiro:
+        # grava chat por chat para que só as mensagens daquele chat se percam
+        for rows in by_chat.values():
+            await self._write_with_retries(rows)
+
+    async def _write(self, rows: list[tuple[str, str, str, str]]) -> bool:
+        try:
+            return await asyncio.to_thread(create_messages, rows)
+        except Exception as e:
+            logger.error("erro ao gravar mensagens: %s", e)
+            return False
+
+    async def _write_with_retries(self, rows: list[tuple[str, str, str, str]]) -> None:
+        for attempt in range(CHAT_WRITE_RETRIES):
+            if await self._write(rows):
+                return
+            await asyncio.sleep(0.1 * (2 ** attempt))
+        logger.error("%s mensagens do chat %s descartadas apos %s tentativas", len(rows), rows[0][1], CHAT_WRITE_RETRIES)
+
+    async def stop(self) -> None:
+        """Write whatever is still queued and stop the flusher."""
+        if self._task is None:
+            return
+        self._queue.put_nowait(_STOP)
+        await self._task
+        self._task = None
+        self._queue = None
+
+
+message_writer = MessageWriter()
@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from .chat.gen_categories import create_categories
+from .chat.gen_classification import run_classification
+from .similar.indexer import schedule_idea_embedding
+from ..database.querys.ideas_query import (
+    apply_idea_enrichment,
+    claim_pending_enrichments,
+    mark_idea_enrichment_failed,
+    set_enrichment_claims,
+)
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_CONCURRENCY = int(os.getenv("ENRICHMENT_CONCURRENCY", "8"))
+# Enriquecimento pendente assumido há mais que isso é dado como abandonado (worker morreu).
+# Cada worker procura pendentes e renova os próprios a cada metade desse tempo
+ENRICHMENT_CLAIM_TTL_SECONDS = float(os.getenv("ENRICHMENT_CLAIM_TTL_SECONDS", "300"))
+
+PENDING_CLASSIFICATION = "unclassified"
+
+
+class EnrichmentPipeline:
+    """Runs AI classification and category generation after the idea is stored.
+
+    Both LLM calls start from the title alone and run concurrently. The result
+    is written back with a version check (see `apply_idea_enrichment`), and
+    waiters in this worker are woken up so the poll endpoint can answer early.
+    Ideas left pending by another (or a previous) worker are claimed and resumed
+    periodically; on shutdown the claims of interrupted ideas are released.
+    """
+
+    def __init__(self, concurrency: int = ENRICHMENT_CONCURRENCY):
+        self._concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: set[asyncio.Task] = set()
+        self._events: dict[str, asyncio.Event] = {}
+        # ideias sendo enriquecidas por este worker (claim renovado; liberado no shutdown)
+        self._in_flight: set[str] = set()
+        self._resume_task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Resume pending enrichments now and every `ENRICHMENT_CLAIM_TTL_SECONDS / 2`."""
+        if self._resume_task is None:
+            self._resume_task = asyncio.create_task(self._resume_loop())
+
+    def submit(self, idea_id: str, version: int, title: str) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._events.setdefault(idea_id, asyncio.Event())
+        self._in_flight.add(idea_id)
+        task = asyncio.create_task(self._enrich(idea_id, version, title))
+        # manter referência para a task não ser coletada antes de terminar
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _enrich(self, idea_id: str, version: int, title: str) -> None:
+        try:
+            async with self._semaphore:
+                classification, categories = await asyncio.gather(
+                    run_classification(title),
+                    create_categories("", title),
+                    return_exceptions=True,
+                )
+            if isinstance(classification, BaseException) or not classification:
+                logger.error("Erro ao classificar Idea: %s", classification)
+                classification = "Não classificado"
+            if isinstance(categories, BaseException):
+                logger.error("Erro ao criar Tags: %s", categories)
+                categories = []
+
+            applied = await asyncio.to_thread(apply_idea_enrichment, idea_id, version, classification, categories)
+            if applied:
+                schedule_idea_embedding(idea_id)
+        except Exception as e:
+            logger.error("Erro ao enriquecer ideia %s: %s", idea_id, e)
+            await asyncio.to_thread(mark_idea_enrichment_failed, idea_id, version)
+        finally:
+            self._in_flight.discard(idea_id)
+            event = self._events.pop(idea_id, None)
+            if event is not None:
+                event.set()
+
+    async def wait(self, idea_id: str, timeout: float) -> None:
+        """Wait until this worker finishes enriching `idea_id` (or `timeout` elapses)."""
+        event = self._events.get(idea_id)
+        if event is None:
+            await asyncio.sleep(min(timeout, 0.5))
+            return
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def resume_pending(self) -> int:
+        """Resubmit enrichments left pending by a previous process (claimed, so each runs in one worker)."""
+        pending = await asyncio.to_thread(claim_pending_enrichments, ENRICHMENT_CLAIM_TTL_SECONDS)
+        for item in pending:
+            if item["id"] not in self._in_flight:
+                self.submit(item["id"], item["version"], item["title"])
+        return len(pending)
+
+    async def _resume_loop(self) -> None:
+        while True:
+            try:
+                # os que ainda estão na fila deste worker não podem parecer abandonados
+                await asyncio.to_thread(set_enrichment_claims, list(self._in_flight), True)
+                await self.resume_pending()
+            except Exception as e:
+                logger.warning("falha ao retomar enriquecimentos pendentes: %s", e)
+            await asyncio.sleep(ENRICHMENT_CLAIM_TTL_SECONDS / 2)
+
+    async def stop(self) -> None:
+        if self._resume_task is not None:
+            self._resume_task.cancel()
+            await asyncio.gather(self._resume_task, return_exceptions=True)
+            self._resume_task = None
+        interrupted = list(self._in_flight)
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        # canceladas continuam 'pending': libera o claim para o próximo processo retomar na hora
+        await asyncio.to_thread(set_enrichment_claims, interrupted, False)
+
+
+pipeline = EnrichmentPipeline()
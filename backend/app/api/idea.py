@@ -1,23 +1,34 @@
+import asyncio
+import logging
 from typing import Optional
 
-from fastapi import APIRouter, Header, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Query, status
 from pydantic import BaseModel
 
+from .chat.answer_cache import invalidate_idea as invalidate_chat_answers
 from .chat.gen_classification import run_classification
-from .chat.gen_categories import create_categories
+from .enrichment import PENDING_CLASSIFICATION, pipeline as enrichment_pipeline
+from .responses import etag_headers, etag_matches, not_modified, rows_response, weak_etag
+from .similar.indexer import find_similar_ideas, forget_idea, schedule_idea_embedding
 from ..database.querys.auth_query import check_token
 from ..database.querys.ideas_query import (
     create_idea,
     Idea as IdeaModel,
     get_all_ideas,
     get_idea_by_id,
+    get_idea_version,
+    get_ideas_version,
     edit_idea_status,
+    get_idea_enrichment,
     edit_idea_content,
     update_idea,
-    delete_idea_by_id
+    delete_idea_by_id,
+    search_ideas
 )
 from ..database.querys.tag_query import replace_tags_for_idea
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 class IdeaCreate(BaseModel):
@@ -34,6 +45,7 @@ class IdeaResponse(BaseModel):
     tags: list[str]
     status: str
     created_at: str
+    enrichment_status: Optional[str] = None
 
 class IdeaEdit(BaseModel):
     title: Optional[str] = None
@@ -42,12 +54,61 @@ class IdeaEdit(BaseModel):
     tags: Optional[list[str]] = None
 
 
+class IdeaCategory(BaseModel):
+    name: str
+    description: Optional[str] = None
+
+
+class IdeaEnrichmentResponse(BaseModel):
+    idea_id: str
+    status: str
+    version: int
+    ai_classification: str
+    categories: list[IdeaCategory] = []
+
+
+class SimilarIdeaItem(BaseModel):
+    id: str
+    title: str
+    status: str
+    ai_classification: str
+    score: float
+
+
+class SimilarIdeasResponse(BaseModel):
+    pending: bool = False
+    items: list[SimilarIdeaItem] = []
+
+
+class IdeaSearchItem(BaseModel):
+    id: str
+    title: str
+    status: str
+    ai_classification: str
+    created_at: Optional[str] = None
+    tags: list[str] = []
+    score: float
+    title_highlight: str
+    snippet: str
+
+
+class IdeaSearchFacets(BaseModel):
+    status: dict[str, int] = {}
+    tags: dict[str, int] = {}
+
+
+class IdeaSearchResponse(BaseModel):
+    items: list[IdeaSearchItem] = []
+    facets: Optional[IdeaSearchFacets] = None
+    next_cursor: Optional[str] = None
+
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=IdeaResponse)
 async def create(idea_data: IdeaCreate, authorization: str = Header(...)):
     """
     Cria uma nova ideia. O user_id é extraído automaticamente do token JWT.
-    A classificação AI é gerada automaticamente.
+    A ideia é salva na hora com `ai_classification = "unclassified"`; a classificação
+    AI e as categorias são geradas em background (acompanhe em `GET /{idea_id}/enrichment`).
     """
 
     # Extrair e validar token
@@ -61,7 +122,7 @@ async def create(idea_data: IdeaCreate, authorization: str = Header(...)):
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        user_id = check_token(token)
+        user_id = await asyncio.to_thread(check_token, token)
 
         if not user_id:
             raise HTTPException(
@@ -72,38 +133,24 @@ async def create(idea_data: IdeaCreate, authorization: str = Header(...)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao verificar token: {e}")
+        logger.warning("Erro ao verificar token: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    try:
-        ai_classification = await run_classification(idea_data.title)
-    except Exception as e:
-        print(f"Erro ao classificar Idea: {e}")
-        ai_classification = "Não classificado"
-
-    try:
-        # Pass ai_classification as context/input and the idea title as the primary idea
-        ai_categories = await create_categories(ai_classification, idea_data.title)
-
-    except Exception as e:
-        print(f"Erro ao criar Tags: {e}")
-        ai_categories = []
-
-    # Criar a ideia no banco
+    # Criar a ideia no banco imediatamente; classificação e categorias rodam em background
     try:
         idea = IdeaModel(
             user_id=user_id,
             title=idea_data.title,
-            ai_classification=ai_classification,
-            categories=ai_categories,
-            tags=idea_data.tags
+            ai_classification=PENDING_CLASSIFICATION,
+            tags=idea_data.tags,
+            enrichment_status="pending"
         )
 
-        idea_id = create_idea(idea)
+        idea_id = await asyncio.to_thread(create_idea, idea)
 
         if not idea_id:
             raise HTTPException(
@@ -111,8 +158,10 @@ async def create(idea_data: IdeaCreate, authorization: str = Header(...)):
                 detail="Erro ao criar ideia no banco de dados"
             )
 
+        enrichment_pipeline.submit(idea_id, 1, idea_data.title)
+
         # Fetch the created idea including created_at and return it so it matches the response_model
-        created_idea = get_idea_by_id(idea_id)
+        created_idea = await asyncio.to_thread(get_idea_by_id, idea_id)
         if not created_idea:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -126,7 +175,7 @@ async def create(idea_data: IdeaCreate, authorization: str = Header(...)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao criar Idea: {e}")
+        logger.error("Erro ao criar Idea: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro ao criar ideia"
@@ -134,9 +183,10 @@ async def create(idea_data: IdeaCreate, authorization: str = Header(...)):
 
 
 @router.get("/", status_code=status.HTTP_200_OK, response_model=list[IdeaResponse])
-def get_ideas(authorization: str = Header(...)):
+def get_ideas(authorization: str = Header(...), if_none_match: Optional[str] = Header(None)):
     """
     Obtém todas as ideias do usuário autenticado.
+    Responde 304 se o `If-None-Match` ainda corresponde à versão atual da lista.
     """
     # Extrair e validar token
     try:
@@ -160,13 +210,19 @@ def get_ideas(authorization: str = Header(...)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao verificar token: {e}")
+        logger.warning("Erro ao verificar token: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # versão lida antes dos dados: se mudar no meio, o próximo poll só recebe a lista de novo
+    version = get_ideas_version(user_id)
+    etag = weak_etag("ideas", user_id, *version) if version is not None else None
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+
     ideas = get_all_ideas(user_id)
 
     if ideas is None:
@@ -178,11 +234,60 @@ def get_ideas(authorization: str = Header(...)):
         if 'tags' not in it or it.get('tags') is None:
             it['tags'] = []
 
-    return ideas
+    return rows_response(ideas, IdeaResponse, headers=etag_headers(etag))
+
+
+@router.get("/search", status_code=status.HTTP_200_OK, response_model=IdeaSearchResponse)
+def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    tags: Optional[list[str]] = Query(None),
+    idea_status: Optional[str] = Query(None, alias="status"),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    authorization: str = Header(...),
+):
+    """
+    Busca textual (full-text + tolerante a erros de digitação no título) nas ideias do usuário.
+    Retorna os resultados ranqueados com trechos destacados, facetas de status/tags
+    (somente na primeira página) e um cursor para a próxima página.
+    """
+    # Extrair e validar token
+    try:
+        token = authorization.replace("Bearer ", "").strip()
+        user_id = check_token(token)
+
+        if not user_id:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido ou expirado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.warning("Erro ao verificar token: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido ou expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    try:
+        result = search_ideas(user_id, q.strip(), tags=tags, status=idea_status, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao buscar ideias"
+        )
+
+    return result
 
 
 @router.get("/{idea_id}", status_code=status.HTTP_200_OK, response_model=IdeaResponse)
-def get_idea(idea_id: str, authorization: str = Header(...)):
+def get_idea(idea_id: str, authorization: str = Header(...), if_none_match: Optional[str] = Header(None)):
     """
     Obtém uma ideia específica por ID.
     """
@@ -200,13 +305,20 @@ def get_idea(idea_id: str, authorization: str = Header(...)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao verificar token: {e}")
+        logger.warning("Erro ao verificar token: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    version = get_idea_version(idea_id)
+    etag = None
+    if version is not None and version["user_id"] == user_id:
+        etag = weak_etag("idea", idea_id, version["version"], version["updated_at"])
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
     idea = get_idea_by_id(idea_id)
 
     if not idea:
@@ -222,7 +334,107 @@ def get_idea(idea_id: str, authorization: str = Header(...)):
             detail="Você não tem permissão para acessar esta ideia"
         )
 
-    return idea
+    return rows_response(idea, IdeaResponse, headers=etag_headers(etag))
+
+
+@router.get("/{idea_id}/enrichment", status_code=status.HTTP_200_OK, response_model=IdeaEnrichmentResponse)
+async def get_enrichment(idea_id: str, wait: float = Query(0, ge=0, le=25), authorization: str = Header(...)):
+    """
+    Estado do enriquecimento AI (classificação + categorias) de uma ideia.
+    Com `wait > 0` funciona como long-poll: responde assim que o enriquecimento
+    terminar ou quando o tempo acabar.
+    """
+    # Extrair e validar token
+    try:
+        token = authorization.replace("Bearer ", "").strip()
+        user_id = await asyncio.to_thread(check_token, token)
+
+        if not user_id:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido ou expirado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.warning("Erro ao verificar token: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido ou expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while True:
+        enrichment = await asyncio.to_thread(get_idea_enrichment, idea_id)
+
+        if not enrichment:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Ideia não encontrada"
+            )
+
+        if enrichment["user_id"] != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Você não tem permissão para acessar esta ideia"
+            )
+
+        remaining = deadline - loop.time()
+        if enrichment["status"] != "pending" or remaining <= 0:
+            return enrichment
+        await enrichment_pipeline.wait(idea_id, remaining)
+
+
+@router.get("/{idea_id}/similar", status_code=status.HTTP_200_OK, response_model=SimilarIdeasResponse)
+def get_similar_ideas(idea_id: str, limit: int = Query(5, ge=1, le=50), authorization: str = Header(...)):
+    """
+    Retorna as ideias do usuário mais parecidas com a ideia informada (similaridade de embeddings).
+    Se a ideia ainda não foi indexada, agenda a indexação e responde com `pending: true`.
+    """
+    # Extrair e validar token
+    try:
+        token = authorization.replace("Bearer ", "").strip()
+        user_id = check_token(token)
+
+        if not user_id:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token inválido ou expirado",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.warning("Erro ao verificar token: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido ou expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    idea = get_idea_by_id(idea_id)
+
+    if not idea:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ideia não encontrada"
+        )
+
+    if idea["user_id"] != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Você não tem permissão para acessar esta ideia"
+        )
+
+    similar = find_similar_ideas(idea_id, user_id, limit=limit)
+    if similar is None:
+        schedule_idea_embedding(idea_id)
+        return {"pending": True, "items": []}
+
+    return {"pending": False, "items": similar}
 
 
 @router.patch("/{idea_id}", status_code=status.HTTP_200_OK, response_model=IdeaResponse)
@@ -233,7 +445,7 @@ async def edit_idea_endpoint(idea_id: str, idea_data: IdeaEdit, authorization: s
     # Extrair e validar token
     try:
         token = authorization.replace("Bearer ", "").strip()
-        user_id = check_token(token)
+        user_id = await asyncio.to_thread(check_token, token)
 
         if not user_id:
             raise HTTPException(
@@ -244,7 +456,7 @@ async def edit_idea_endpoint(idea_id: str, idea_data: IdeaEdit, authorization: s
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao verificar token: {e}")
+        logger.warning("Erro ao verificar token: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado",
@@ -252,7 +464,7 @@ async def edit_idea_endpoint(idea_id: str, idea_data: IdeaEdit, authorization: s
         )
 
     # Verificar se a ideia existe e pertence ao usuário
-    existing_idea = get_idea_by_id(idea_id)
+    existing_idea = await asyncio.to_thread(get_idea_by_id, idea_id)
 
     if not existing_idea:
         raise HTTPException(
@@ -275,7 +487,7 @@ async def edit_idea_endpoint(idea_id: str, idea_data: IdeaEdit, authorization: s
 
     # Atualizar status
     if idea_data.status is not None:
-        success = edit_idea_status(idea_id, idea_data.status)
+        success = await asyncio.to_thread(edit_idea_status, idea_id, idea_data.status)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -284,7 +496,7 @@ async def edit_idea_endpoint(idea_id: str, idea_data: IdeaEdit, authorization: s
 
     # Atualizar conteúdo
     if idea_data.content is not None:
-        success = edit_idea_content(idea_id, idea_data.content)
+        success = await asyncio.to_thread(edit_idea_content, idea_id, idea_data.content)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -296,7 +508,7 @@ async def edit_idea_endpoint(idea_id: str, idea_data: IdeaEdit, authorization: s
         try:
             ai_classification = await run_classification(idea_data.title)
         except Exception as e:
-            print(f"Erro ao classificar Idea: {e}")
+            logger.error("Erro ao classificar Idea: %s", e)
             ai_classification = existing_idea["ai_classification"]  # Manter o antigo se falhar
 
         idea = IdeaModel(
@@ -305,7 +517,7 @@ async def edit_idea_endpoint(idea_id: str, idea_data: IdeaEdit, authorization: s
             ai_classification=ai_classification
         )
 
-        success = update_idea(idea_id, idea)
+        success = await asyncio.to_thread(update_idea, idea_id, idea)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -315,24 +527,29 @@ async def edit_idea_endpoint(idea_id: str, idea_data: IdeaEdit, authorization: s
     # Atualizar tags (substitui tags existentes)
     if idea_data.tags is not None:
         try:
-            ok = replace_tags_for_idea(idea_id, idea_data.tags)
+            ok = await asyncio.to_thread(replace_tags_for_idea, idea_id, idea_data.tags)
             if not ok:
                 raise Exception('Falha ao atualizar tags')
         except Exception as e:
-            print(f"Erro ao substituir tags: {e}")
+            logger.error("Erro ao substituir tags: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Erro ao atualizar tags da ideia"
             )
 
     # Retornar ideia atualizada
-    updated_idea = get_idea_by_id(idea_id)
+    updated_idea = await asyncio.to_thread(get_idea_by_id, idea_id)
     if not updated_idea:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro ao obter ideia atualizada"
         )
 
+    if idea_data.title is not None or idea_data.content is not None:
+        schedule_idea_embedding(idea_id)
+        # respostas do chat sobre a versão anterior não valem mais
+        await invalidate_chat_answers(idea_id)
+
     return updated_idea
 
 
@@ -355,7 +572,7 @@ def delete_idea_endpoint(idea_id: str, authorization: str = Header(...)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao verificar token: {e}")
+        logger.warning("Erro ao verificar token: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado",
@@ -385,4 +602,6 @@ def delete_idea_endpoint(idea_id: str, authorization: str = Header(...)):
             detail="Erro ao deletar ideia"
         )
 
+    forget_idea(idea_id, user_id)
+
     return {"message": "Ideia deletada com sucesso"}
@@ -0,0 +1,103 @@
+"""JSON responses rendered with orjson straight from the query layer's rows.
+
+Returning a dict from a route with `response_model` costs a pydantic
+validation, `jsonable_encoder` and `json.dumps`. The query functions already
+produce JSON-ready dicts (ids and timestamps as strings), so `rows_response`
+only projects them onto the fields of the response model (same keys and
+defaults as the validated output, nested models included) and renders the
+result with orjson.
+
+The ETag helpers implement conditional GETs: routes compute a weak ETag from a
+cheap version query (counts, `updated_at`, sequence numbers) and answer 304
+when `If-None-Match` matches, before running the full hydration query.
+"""
+
+import functools
+import hashlib
+import typing
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+# o navegador guarda a resposta mas revalida (If-None-Match) a cada uso
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+# (campo, valor padrão, modelo aninhado, é lista)
+_Plan = tuple[tuple[str, Any, Optional[type[BaseModel]], bool], ...]
+
+
+def _nested_model(annotation) -> tuple[Optional[type[BaseModel]], bool]:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    origin = typing.get_origin(annotation)
+    args = [a for a in typing.get_args(annotation) if a is not type(None)]
+    if origin is list and args:
+        model, _ = _nested_model(args[0])
+        return model, model is not None
+    if origin is typing.Union and len(args) == 1:
+        return _nested_model(args[0])
+    return None, False
+
+
+@functools.lru_cache(maxsize=None)
+def _plan(model: type[BaseModel]) -> _Plan:
+    plan = []
+    for name, info in model.model_fields.items():
+        default = None if info.is_required() else info.get_default(call_default_factory=True)
+        nested, many = _nested_model(info.annotation)
+        plan.append((name, default, nested, many))
+    return tuple(plan)
+
+
+def _project_one(row: dict, plan: _Plan) -> dict:
+    out = {}
+    for name, default, nested, many in plan:
+        value = row.get(name, default)
+        if nested is not None and value is not None:
+            nested_plan = _plan(nested)
+            value = [_project_one(v, nested_plan) for v in value] if many else _project_one(value, nested_plan)
+        out[name] = value
+    return out
+
+
+def project(data: Any, model: type[BaseModel]) -> Any:
+    """Keep only the fields of `model` (filling defaults), for a row or a list of rows. No validation."""
+    plan = _plan(model)
+    if isinstance(data, list):
+        return [_project_one(row, plan) for row in data]
+    return _project_one(data, plan)
+
+
+def rows_response(data: Any, model: Optional[type[BaseModel]] = None, status_code: int = 200,
+                  headers: Optional[dict[str, str]] = None) -> ORJSONResponse:
+    """Response for rows returned by the query layer; pass the route's model to shape it like `response_model`."""
+    content = project(data, model) if model is not None else data
+    return ORJSONResponse(content, status_code=status_code, headers=headers)
+
+
+def weak_etag(*parts: Any) -> str:
+    """Weak ETag for a resource version described by `parts` (ids, counts, timestamps)."""
+    digest = hashlib.blake2b("\x1f".join(str(p) for p in parts).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Weak comparison of `If-None-Match` (possibly a list, or `*`) against `etag`."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def etag_headers(etag: Optional[str]) -> Optional[dict[str, str]]:
+    if etag is None:
+        return None
+    return {"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=etag_headers(etag))
@@ -1,17 +1,39 @@
+import asyncio
+import logging
 import os
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, status
 from fastapi.responses import FileResponse
 
 from .chat.gen_roadmap_context import run_workflow, WorkflowInput
 from ..database.querys.ideas_query import get_idea_by_id
 from ..database.querys.roadmap_query import create_roadmap, Roadmap, get_roadmap_with_details
-from ..database.querys.roadmap_query import get_all_roadmaps
+from ..database.querys.roadmap_query import get_all_roadmaps, get_roadmap_version
+from .responses import etag_headers, etag_matches, not_modified, rows_response, weak_etag
 from .roadmap.roadmap_generator import RoadmapVisualGenerator
+from ..observability.loop_watchdog import assert_off_loop
+from ..observability.metrics import track_render
+from ..observability.tracing import span
 from pydantic import BaseModel
 from typing import Optional
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+ROADMAP_IMAGES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'roadmap_images')
+
+
+def _render_roadmap_image(roadmap_data: dict, output_path: str) -> None:
+    """Gera o PNG do roadmap e grava em `output_path`. Bloqueante: chamar via asyncio.to_thread."""
+    assert_off_loop("render do roadmap")
+    generator = RoadmapVisualGenerator()
+    with track_render(), span("roadmap.render", **{"ideahub.roadmap.steps": len(roadmap_data.get("steps", []))}):
+        image_bytes = generator.generate_roadmap_image(roadmap_data)
+
+    # Salvar os bytes da imagem em arquivo
+    with open(output_path, 'wb') as f:
+        f.write(image_bytes)
+
 class RoadmapTaskResponse(BaseModel):
     id: str
     task_order: int
@@ -40,12 +62,12 @@ async def create(idea_id: str, exported_to: str):
     roadmap=Roadmap(idea_id=idea_id, exported_to=exported_to)
 
     try:
-        roadmap_id = create_roadmap(roadmap)
+        roadmap_id = await asyncio.to_thread(create_roadmap, roadmap)
         if roadmap_id is None:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erro ao criar roadmap no banco de dados")
 
         try:
-            idea = get_idea_by_id(idea_id)
+            idea = await asyncio.to_thread(get_idea_by_id, idea_id)
             if idea is None:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ideia não encontrada")
 
@@ -56,28 +78,21 @@ async def create(idea_id: str, exported_to: str):
         except HTTPException:
             raise
         except Exception as e:
-            print(f"Erro ao executar workflow: {e}")
+            logger.error("Erro ao executar workflow: %s", e)
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro ao gerar conteúdo do roadmap: {str(e)}")
 
         # Gerar visualização do roadmap
         try:
-            roadmap_data = get_roadmap_with_details(roadmap_id)
+            roadmap_data = await asyncio.to_thread(get_roadmap_with_details, roadmap_id)
             if roadmap_data and len(roadmap_data.get('steps', [])) > 0:
-                generator = RoadmapVisualGenerator()
-
                 # Criar diretório para salvar imagens se não existir
-                output_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'roadmap_images')
-                os.makedirs(output_dir, exist_ok=True)
+                os.makedirs(ROADMAP_IMAGES_DIR, exist_ok=True)
 
                 # Salvar imagem
-                output_path = os.path.join(output_dir, f'roadmap_{roadmap_id}.png')
-                image_bytes = generator.generate_roadmap_image(roadmap_data)
-
-                # Salvar os bytes da imagem em arquivo
-                with open(output_path, 'wb') as f:
-                    f.write(image_bytes)
+                output_path = os.path.join(ROADMAP_IMAGES_DIR, f'roadmap_{roadmap_id}.png')
+                await asyncio.to_thread(_render_roadmap_image, roadmap_data, output_path)
 
-                print(f"Imagem do roadmap gerada: {output_path}")
+                logger.debug("Imagem do roadmap gerada: %s", output_path)
 
                 return {
                     "roadmap_id": roadmap_id,
@@ -85,16 +100,14 @@ async def create(idea_id: str, exported_to: str):
                     "image_path": f"/api/roadmap/{roadmap_id}/image"
                 }
             else:
-                print("Roadmap sem steps, imagem não gerada")
+                logger.debug("Roadmap sem steps, imagem não gerada")
                 return {
                     "roadmap_id": roadmap_id,
                     "image_generated": False,
                     "message": "Roadmap criado mas sem steps para gerar imagem"
                 }
         except Exception as e:
-            print(f"Erro ao gerar visualização: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Erro ao gerar visualização: %s", e)
             # Retorna sucesso mesmo se a imagem falhar
             return {
                 "roadmap_id": roadmap_id,
@@ -105,7 +118,7 @@ async def create(idea_id: str, exported_to: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao criar roadmap no banco de dados: {e}")
+        logger.error("Erro ao criar roadmap no banco de dados: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro ao criar roadmap: {str(e)}")
 
 
@@ -116,26 +129,19 @@ async def get_roadmap_image(roadmap_id: str):
     """
     try:
         # Verificar se a imagem existe
-        output_dir = os.path.join(os.path.dirname(__file__), '..', '..', 'roadmap_images')
-        image_path = os.path.join(output_dir, f'roadmap_{roadmap_id}.png')
+        image_path = os.path.join(ROADMAP_IMAGES_DIR, f'roadmap_{roadmap_id}.png')
 
         if not os.path.exists(image_path):
             # Tentar gerar a imagem se não existir
-            roadmap_data = get_roadmap_with_details(roadmap_id)
+            roadmap_data = await asyncio.to_thread(get_roadmap_with_details, roadmap_id)
             if not roadmap_data:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Roadmap não encontrado")
 
             if len(roadmap_data.get('steps', [])) == 0:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Roadmap sem steps para gerar imagem")
 
-            generator = RoadmapVisualGenerator()
-            os.makedirs(output_dir, exist_ok=True)
-
-            image_bytes = generator.generate_roadmap_image(roadmap_data)
-
-            # Salvar os bytes da imagem em arquivo
-            with open(image_path, 'wb') as f:
-                f.write(image_bytes)
+            os.makedirs(ROADMAP_IMAGES_DIR, exist_ok=True)
+            await asyncio.to_thread(_render_roadmap_image, roadmap_data, image_path)
 
         return FileResponse(
             image_path,
@@ -146,26 +152,32 @@ async def get_roadmap_image(roadmap_id: str):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao buscar imagem do roadmap: {e}")
+        logger.error("Erro ao buscar imagem do roadmap: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro ao buscar imagem: {str(e)}")
 
 
 @router.get("/{roadmap_id}", status_code=200, tags=["Roadmap"])
-async def get_roadmap(roadmap_id: str):
+async def get_roadmap(roadmap_id: str, if_none_match: Optional[str] = Header(None)):
     """
     Retorna os dados completos do roadmap (steps e tasks)
+    Responde 304 se o `If-None-Match` ainda corresponde à versão atual (steps/tasks inclusos).
     """
     try:
-        roadmap_data = get_roadmap_with_details(roadmap_id)
+        version = await asyncio.to_thread(get_roadmap_version, roadmap_id)
+        etag = weak_etag("roadmap", roadmap_id, *version) if version is not None else None
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        roadmap_data = await asyncio.to_thread(get_roadmap_with_details, roadmap_id)
         if not roadmap_data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Roadmap não encontrado")
 
-        return roadmap_data
+        return rows_response(roadmap_data, headers=etag_headers(etag))
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"Erro ao buscar roadmap: {e}")
+        logger.error("Erro ao buscar roadmap: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro ao buscar roadmap: {str(e)}")
 
 
@@ -175,11 +187,11 @@ async def list_roadmaps():
     Lista todos os roadmaps armazenados com seus steps e tasks.
     """
     try:
-        roadmaps = get_all_roadmaps()
+        roadmaps = await asyncio.to_thread(get_all_roadmaps)
         # garantir lista
         if not roadmaps:
             return []
-        return roadmaps
+        return rows_response(roadmaps, RoadmapResponse)
     except Exception as e:
-        print(f"Erro ao listar roadmaps: {e}")
+        logger.error("Erro ao listar roadmaps: %s", e)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erro ao listar roadmaps: {str(e)}")
@@ -0,0 +1,99 @@
+import hashlib
+import os
+import re
+import unicodedata
+
+import numpy as np
+from openai import AsyncOpenAI
+
+from ..chat.llm_gateway import get_client
+from ...observability.metrics import attributed_to
+
+EMBEDDINGS_PROVIDER = os.getenv("EMBEDDINGS_PROVIDER", "openai").lower()
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "256"))
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class OpenAIEmbedder:
+    """Embeds texts in batches with the OpenAI embeddings API (reduced dimensions)."""
+
+    def __init__(self, model: str = EMBEDDING_MODEL, dim: int = EMBEDDING_DIM):
+        self.model = model
+        self.dim = dim
+        self.name = f"openai:{model}:{dim}"
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return get_client()
+
+    @attributed_to("embeddings")
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        response = await self.client.embeddings.create(model=self.model, input=texts, dimensions=self.dim)
+        vectors = np.asarray([item.embedding for item in response.data], dtype=np.float32)
+        return _l2_normalize(vectors)
+
+
+class HashingEmbedder:
+    """Deterministic local embedder (feature hashing of words and word bigrams).
+
+    Needs no network and always returns the same vector for the same text, which
+    makes it suitable for tests, benchmarks and offline development.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"local-hashing:{dim}"
+
+    def _features(self, text: str) -> list[str]:
+        normalized = unicodedata.normalize("NFKD", text.lower())
+        normalized = "".join(c for c in normalized if not unicodedata.combining(c))
+        words = _TOKEN_RE.findall(normalized)
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            h = int.from_bytes(digest, "little")
+            sign = 1.0 if (h >> 63) & 1 else -1.0
+            vec[h % self.dim] += sign
+        return vec
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _l2_normalize(np.stack([self._embed_one(t) for t in texts]))
+
+
+def _l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+_embedder = None
+
+
+def get_embedder():
+    """Return the process-wide embedder selected by `EMBEDDINGS_PROVIDER` (openai | local)."""
+    global _embedder
+    if _embedder is None:
+        if EMBEDDINGS_PROVIDER == "local":
+            _embedder = HashingEmbedder()
+        else:
+            _embedder = OpenAIEmbedder()
+    return _embedder
+
+
+def idea_embedding_text(title: str, ai_classification: str, raw_content: str, max_chars: int = 8000) -> str:
+    """Text that represents an idea for similarity purposes."""
+    parts = [title or "", ai_classification or "", (raw_content or "")[:max_chars]]
+    return "\n".join(p.strip() for p in parts if p and p.strip())
+
+
+def content_hash(text: str, embedder_name: str) -> str:
+    return hashlib.sha256(f"{embedder_name}\0{text}".encode("utf-8")).hexdigest()
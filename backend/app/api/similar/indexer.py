@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+
+from .embedder import content_hash, get_embedder, idea_embedding_text
+from .vector_store import VectorStore, registry
+from ...database.querys.embedding_query import (
+    get_ideas_for_embedding,
+    get_ideas_summary,
+    get_user_embeddings,
+    pgvector_available,
+    similar_ideas_pgvector,
+    upsert_idea_embeddings,
+)
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_BATCH_WAIT_MS = int(os.getenv("EMBEDDING_BATCH_WAIT_MS", "200"))
+
+
+class EmbeddingIndexer:
+    """Background worker that embeds ideas in batches, off the request path.
+
+    Requests only enqueue idea ids. The worker drains the queue in batches of up
+    to `EMBEDDING_BATCH_SIZE` (waiting at most `EMBEDDING_BATCH_WAIT_MS` to fill
+    one), skips ideas whose content hash did not change, persists the vectors and
+    updates the in-memory tenant stores incrementally.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def schedule(self, idea_id: str) -> None:
+        if self._queue is None:
+            return
+        # Pode ser chamado de endpoints síncronos (threadpool): asyncio.Queue não é thread-safe
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, str(idea_id))
+
+    async def _next_batch(self) -> list[str]:
+        first = await self._queue.get()
+        batch = {first: None}
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + EMBEDDING_BATCH_WAIT_MS / 1000
+        while len(batch) < EMBEDDING_BATCH_SIZE:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch[await asyncio.wait_for(self._queue.get(), timeout)] = None
+            except asyncio.TimeoutError:
+                break
+        return list(batch)
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self.index_ideas(batch)
+            except Exception as e:
+                logger.error("erro ao indexar lote de %s ideias: %s", len(batch), e)
+
+    async def index_ideas(self, idea_ids: list[str]) -> int:
+        """Embed and store the given ideas. Returns how many were (re)embedded."""
+        embedder = get_embedder()
+        ideas = await asyncio.to_thread(get_ideas_for_embedding, idea_ids)
+
+        pending = []
+        for idea in ideas:
+            text = idea_embedding_text(idea["title"], idea["ai_classification"], idea["raw_content"])
+            digest = content_hash(text, embedder.name)
+            if digest != idea["content_hash"]:
+                pending.append((idea, text, digest))
+        if not pending:
+            return 0
+
+        vectors = await embedder.embed([text for _, text, _ in pending])
+        rows = [
+            {"id": idea["id"], "user_id": idea["user_id"], "content_hash": digest, "vector": vector}
+            for (idea, _, digest), vector in zip(pending, vectors)
+        ]
+        if not await asyncio.to_thread(upsert_idea_embeddings, rows, embedder.name):
+            return 0
+
+        for row in rows:
+            store = registry.get(row["user_id"])
+            if store is not None:
+                # fora do loop: o lock do store pode estar com uma busca (ou reconstrução do IVF) em andamento
+                await asyncio.to_thread(store.upsert, [row["id"]], row["vector"][None, :])
+        return len(rows)
+
+
+indexer = EmbeddingIndexer()
+
+
+def schedule_idea_embedding(idea_id: str) -> None:
+    """Queue an idea to be (re)embedded in the background. Never blocks the request."""
+    try:
+        indexer.schedule(idea_id)
+    except Exception as e:
+        logger.error("erro ao agendar ideia %s: %s", idea_id, e)
+
+
+def forget_idea(idea_id: str, user_id: str) -> None:
+    store = registry.get(user_id)
+    if store is not None:
+        store.remove(idea_id)
+
+
+def _load_store(user_id: str, model: str, dim: int) -> VectorStore:
+    store = registry.get(user_id)
+    if store is None:
+        store = VectorStore(dim)
+        ids, matrix = get_user_embeddings(user_id, model)
+        if ids:
+            store.upsert(ids, matrix)
+        registry.put(user_id, store)
+    return store
+
+
+def find_similar_ideas(idea_id: str, user_id: str, limit: int = 5) -> Optional[list[dict]]:
+    """Return the ideas most similar to `idea_id` among the user's ideas.
+
+    Uses pgvector when the extension is installed, otherwise the in-memory
+    NumPy store. Returns None when the idea has not been embedded yet.
+    """
+    embedder = get_embedder()
+    if pgvector_available():
+        neighbours = similar_ideas_pgvector(idea_id, user_id, embedder.name, limit)
+    else:
+        store = _load_store(user_id, embedder.name, embedder.dim)
+        query = store.vector(idea_id)
+        neighbours = None if query is None else store.search(np.array(query), k=limit, exclude=idea_id)
+
+    if neighbours is None:
+        return None
+
+    summaries = get_ideas_summary([nid for nid, _ in neighbours])
+    return [dict(summaries[nid], score=score) for nid, score in neighbours if nid in summaries]
@@ -0,0 +1,205 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+# Acima deste tamanho a busca usa IVF (clusters) em vez de força bruta
+IVF_MIN_VECTORS = 5000
+IVF_PROBES = 4
+# O índice IVF é refeito só quando deriva: a maior lista passa deste múltiplo do tamanho médio,
+# o store dobra/cai à metade desde a construção ou metade das linhas mudou desde então
+IVF_MAX_LIST_RATIO = 4.0
+
+
+class VectorStore:
+    """Compact float32 vector store for one tenant (user).
+
+    Vectors are kept L2-normalised in a single contiguous matrix, so cosine
+    similarity is one matrix-vector product. Small stores are searched by brute
+    force; once the store grows past `IVF_MIN_VECTORS` a coarse IVF index
+    (k-means centroids + inverted lists) is built lazily and only the `IVF_PROBES`
+    closest lists are scanned. Upserts and removals keep the index up to date by
+    assigning rows to their nearest existing centroid; k-means runs again only
+    when the lists drift (see `_needs_rebuild`).
+
+    The indexer and `/similar` use a store from worker threads, so mutation and
+    search share one lock: `ids`, `matrix` and the IVF lists are always seen in step.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.ids: list[str] = []
+        self._pos: dict[str, int] = {}
+        self.matrix = np.zeros((0, dim), dtype=np.float32)
+        self._centroids: Optional[np.ndarray] = None
+        # lista (centroide) de cada linha e as linhas de cada lista
+        self._assign = np.zeros(0, dtype=np.int64)
+        self._lists: Optional[list[set[int]]] = None
+        self._built_size = 0
+        self._changes = 0
+        self._lock = threading.Lock()
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def upsert(self, ids: list[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            new_rows = []
+            new_ids = []
+            touched = []
+            for idea_id, vec in zip(ids, vectors):
+                pos = self._pos.get(idea_id)
+                if pos is not None:
+                    self.matrix[pos] = vec
+                    touched.append(pos)
+                else:
+                    new_ids.append(idea_id)
+                    new_rows.append(vec)
+            if new_rows:
+                start = len(self.ids)
+                self.matrix = np.vstack([self.matrix, np.stack(new_rows)])
+                for offset, idea_id in enumerate(new_ids):
+                    self._pos[idea_id] = start + offset
+                self.ids.extend(new_ids)
+                touched.extend(range(start, len(self.ids)))
+            self._assign_rows(touched)
+
+    def remove(self, idea_id: str) -> None:
+        with self._lock:
+            pos = self._pos.pop(idea_id, None)
+            if pos is None:
+                return
+            last = len(self.ids) - 1
+            if self._lists is not None:
+                self._lists[self._assign[pos]].discard(pos)
+                if pos != last:
+                    self._lists[self._assign[last]].discard(last)
+                    self._lists[self._assign[last]].add(pos)
+                    self._assign[pos] = self._assign[last]
+                self._assign = self._assign[:last]
+                self._changes += 1
+            if pos != last:
+                # move a última linha para o buraco (O(1), a ordem não importa)
+                moved_id = self.ids[last]
+                self.matrix[pos] = self.matrix[last]
+                self.ids[pos] = moved_id
+                self._pos[moved_id] = pos
+            self.ids.pop()
+            self.matrix = self.matrix[:last]
+
+    def vector(self, idea_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            pos = self._pos.get(idea_id)
+            # cópia: a linha pode ser sobrescrita/movida por um upsert/remove depois
+            return None if pos is None else self.matrix[pos].copy()
+
+    def search(self, query: np.ndarray, k: int = 5, exclude: Optional[str] = None) -> list[tuple[str, float]]:
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            if not self.ids:
+                return []
+            candidates = self._candidates(query)
+            scores = self.matrix[candidates] @ query
+            if exclude is not None and exclude in self._pos:
+                scores[candidates == self._pos[exclude]] = -np.inf
+            k = min(k, len(candidates))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.ids[candidates[i]], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        if len(self.ids) < IVF_MIN_VECTORS:
+            return np.arange(len(self.ids))
+        if self._needs_rebuild():
+            self._build_ivf()
+        closest = np.argsort(-(self._centroids @ query))[:IVF_PROBES]
+        members = [row for c in closest for row in self._lists[c]]
+        return np.array(members, dtype=np.int64)
+
+    def _assign_rows(self, rows: list[int]) -> None:
+        """Put new/updated rows in the list of their nearest centroid (index kept, not rebuilt)."""
+        if self._lists is None or not rows:
+            return
+        positions = np.asarray(rows, dtype=np.int64)
+        if len(self._assign) < len(self.ids):
+            self._assign = np.concatenate([self._assign, np.full(len(self.ids) - len(self._assign), -1, dtype=np.int64)])
+        nearest = np.argmax(self.matrix[positions] @ self._centroids.T, axis=1)
+        for pos, c in zip(rows, nearest):
+            old = self._assign[pos]
+            if old == c:
+                continue
+            if old >= 0:
+                self._lists[old].discard(pos)
+            self._lists[c].add(pos)
+            self._assign[pos] = c
+        self._changes += len(rows)
+
+    def _needs_rebuild(self) -> bool:
+        if self._lists is None:
+            return True
+        n = len(self.ids)
+        if n > 2 * self._built_size or 2 * n < self._built_size or 2 * self._changes > self._built_size:
+            return True
+        mean = n / len(self._lists)
+        return max(len(rows) for rows in self._lists) > IVF_MAX_LIST_RATIO * mean
+
+    def _build_ivf(self, iterations: int = 8) -> None:
+        n = len(self.ids)
+        n_lists = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        centroids = self.matrix[rng.choice(n, n_lists, replace=False)].copy()
+        assign = np.zeros(n, dtype=np.int64)
+        for _ in range(iterations):
+            assign = np.argmax(self.matrix @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = self.matrix[assign == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    norm = np.linalg.norm(centroid)
+                    centroids[c] = centroid / norm if norm else centroid
+        self._centroids = centroids
+        self._assign = assign.astype(np.int64)
+        self._lists = [set(np.flatnonzero(assign == c).tolist()) for c in range(n_lists)]
+        self._built_size = n
+        self._changes = 0
+
+
+class VectorStoreRegistry:
+    """Keeps the most recently used tenant stores in memory (LRU, reloaded after `ttl`)."""
+
+    def __init__(self, max_tenants: int = 256, ttl: float = 300.0):
+        self.max_tenants = max_tenants
+        self.ttl = ttl
+        self._stores: "OrderedDict[str, VectorStore]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[VectorStore]:
+        with self._lock:
+            store = self._stores.get(user_id)
+            if store is None:
+                return None
+            if time.monotonic() - store.loaded_at > self.ttl:
+                del self._stores[user_id]
+                return None
+            self._stores.move_to_end(user_id)
+            return store
+
+    def put(self, user_id: str, store: VectorStore) -> None:
+        with self._lock:
+            self._stores[user_id] = store
+            self._stores.move_to_end(user_id)
+            while len(self._stores) > self.max_tenants:
+                self._stores.popitem(last=False)
+
+    def discard(self, user_id: str) -> None:
+        with self._lock:
+            self._stores.pop(user_id, None)
+
+
+registry = VectorStoreRegistry()
@@ -1,8 +1,13 @@
+import logging
+
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.concurrency import run_in_threadpool
 from fastapi import Request, HTTPException
 from ..database.querys.auth_query import check_token
 
+logger = logging.getLogger(__name__)
+
+
 class AuthMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         path = request.url.path
@@ -14,20 +19,14 @@ class AuthMiddleware(BaseHTTPMiddleware):
             token = auth_header.replace("Bearer ", "").strip()
             method = request.method
 
-            print("-=-=-=-=-=-=-=-=-=-=-=-=-| Middleware |-=-=-=-=-=-=-=-=-=-=-=-=-\n")
-
-            print(f"Rota protegida: {method} {path}")
             if not token:
-                print("Nenhum token fornecido")
+                logger.info("Nenhum token fornecido", extra={"method": method, "path": path})
                 raise HTTPException(status_code=401, detail="Token de autenticação ausente\n")
 
             try:
                 await run_in_threadpool(check_token, token)
-                print(f"Usuário autenticado\n")
-
+                logger.debug("Usuário autenticado", extra={"method": method, "path": path})
             except Exception as e:
-                print(f"Usuario nao autenticado: {e}\n")
-
-            print("-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-\n\n")
+                logger.info("Usuario nao autenticado: %s", e, extra={"method": method, "path": path})
 
         return await call_next(request)
\ No newline at end of file
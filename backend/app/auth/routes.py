@@ -1,3 +1,4 @@
+import logging
 from typing import Optional
 from fastapi import APIRouter, status, Header, BackgroundTasks
 from fastapi.responses import JSONResponse
@@ -5,6 +6,8 @@ from pydantic import BaseModel, EmailStr
 import re
 from ..database.querys.auth_query import login_query, register_query, check_token, get_user_query, mark_user_logged_in
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 class Login(BaseModel):
@@ -147,7 +150,7 @@ def login(request: Login, background_tasks: BackgroundTasks):
                 if scheduled_user_id:
                     background_tasks.add_task(mark_user_logged_in, scheduled_user_id)
             except Exception as e:
-                print(f"Erro ao agendar mark_user_logged_in: {e}")
+                logger.error("Erro ao agendar mark_user_logged_in: %s", e)
 
             return {"access_token": token, "name": username, "email": email, "first_login": first_login}
 
@@ -171,7 +174,7 @@ def login(request: Login, background_tasks: BackgroundTasks):
             )
 
     except Exception as e:
-        print(f"Erro no login: {e}")
+        logger.error("Erro no login: %s", e)
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"errors": [{"field": "non_field", "message": "Erro interno no login"}]},
@@ -205,7 +208,7 @@ def register(request: Register):
                 content={"errors": [{"field": "email", "message": "O email já está em uso ou ocorreu um erro no registro."}]},
             )
     except Exception as e:
-        print(f"Erro no registro: {e}")
+        logger.error("Erro no registro: %s", e)
         # Retornamos uma resposta estruturada para o frontend
         return JSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -226,7 +229,7 @@ def token(authorization: str = Header(...)):
         check_token(access_token)
         return {"validated": True}
     except Exception as e:
-        print(f"Erro ao validar token: {e}")
+        logger.error("Erro ao validar token: %s", e)
         return JSONResponse(
             status_code=status.HTTP_401_UNAUTHORIZED,
             content={"errors": [{"field": "token", "message": "Token inválido ou expirado"}]},
@@ -260,7 +263,7 @@ def me(authorization: str = Header(...)):
         username, email, first_login = _extract_user_info(user)
         return {"name": username, "email": email, "first_login": first_login}
     except Exception as e:
-        print(f"Erro ao obter username: {e}")
+        logger.error("Erro ao obter username: %s", e)
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             content={"errors": [{"field": "non_field", "message": "Erro ao obter dados do usuário"}]},
@@ -13,6 +13,7 @@ password = os.getenv("POSTGRES_PASSWORD", "postgres")
 host = os.getenv("POSTGRES_HOST", "localhost")
 port = os.getenv("POSTGRES_PORT", "5432")
 db_name = os.getenv("POSTGRES_DB", "idea_forge")
+embedding_dim = int(os.getenv("EMBEDDING_DIM", "256"))
 
 database_url = os.getenv("DATABASE_URL")
 if database_url:
@@ -83,6 +84,12 @@ def ensure_database_and_tables():
         print("[create_db] criando extensão pgcrypto (se não existir)...")
         cur_db.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto;")
 
+        try:
+            print("[create_db] criando extensão pg_trgm (se não existir)...")
+            cur_db.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+        except Exception as e:
+            print(f"[create_db] aviso: falha ao criar extensão pg_trgm: {e}")
+
         tables = [
             # users
             (
@@ -236,6 +243,48 @@ def ensure_database_and_tables():
                 )
                 """,
             ),
+            # idea_embeddings
+            (
+                "idea_embeddings",
+                """
+                CREATE TABLE IF NOT EXISTS idea_embeddings (
+                    idea_id UUID PRIMARY KEY REFERENCES ideas(id) ON DELETE CASCADE,
+                    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                    model VARCHAR(100) NOT NULL,
+                    dim INTEGER NOT NULL,
+                    content_hash CHAR(64) NOT NULL,
+                    embedding BYTEA NOT NULL,
+                    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                )
+                """,
+            ),
+            # llm_cache (usado quando LLM_CACHE_BACKEND=postgres)
+            (
+                "llm_cache",
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key CHAR(64) PRIMARY KEY,
+                    namespace VARCHAR(100) NOT NULL,
+                    value JSONB NOT NULL,
+                    embedding BYTEA,
+                    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                    last_access_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                )
+                """,
+            ),
+            # chat_memory: resumo acumulado + últimas mensagens de cada chat
+            (
+                "chat_memory",
+                """
+                CREATE TABLE IF NOT EXISTS chat_memory (
+                    chat_id UUID PRIMARY KEY REFERENCES ai_chats(id) ON DELETE CASCADE,
+                    summary TEXT NOT NULL DEFAULT '',
+                    recent JSONB NOT NULL DEFAULT '[]'::jsonb,
+                    summarized_count INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+                )
+                """,
+            ),
         ]
 
         for name, stmt in tables:
@@ -246,6 +295,120 @@ def ensure_database_and_tables():
             except Exception as e:
                 print(f"[create_db] erro ao criar tabela {name}: {e}")
 
+        # Colunas adicionadas depois da criação inicial das tabelas
+        columns = [
+            (
+                "ideas.search_vector",
+                """
+                ALTER TABLE ideas ADD COLUMN IF NOT EXISTS search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('portuguese'::regconfig, coalesce(title, '')), 'A') ||
+                    setweight(to_tsvector('portuguese'::regconfig, coalesce(ai_classification, '')), 'B') ||
+                    setweight(to_tsvector('portuguese'::regconfig, coalesce(raw_content, '')), 'C')
+                ) STORED
+                """,
+            ),
+            ("ideas.version", "ALTER TABLE ideas ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1"),
+            (
+                "ideas.enrichment_status",
+                "ALTER TABLE ideas ADD COLUMN IF NOT EXISTS enrichment_status VARCHAR(20) NOT NULL DEFAULT 'done'",
+            ),
+            # quando um worker assumiu o enriquecimento pendente (evita N workers retomando a mesma ideia)
+            (
+                "ideas.enrichment_claimed_at",
+                "ALTER TABLE ideas ADD COLUMN IF NOT EXISTS enrichment_claimed_at TIMESTAMP WITH TIME ZONE",
+            ),
+            # ordem das mensagens: sequência explícita em vez de timestamp. O histórico que já existe é
+            # numerado por created_at (um BIGSERIAL direto numeraria na ordem física das linhas) e só
+            # depois a coluna ganha o default da sequência
+            (
+                "ai_messages.seq",
+                """
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (
+                        SELECT 1 FROM information_schema.columns
+                        WHERE table_schema = current_schema() AND table_name = 'ai_messages' AND column_name = 'seq'
+                    ) THEN
+                        ALTER TABLE ai_messages ADD COLUMN seq BIGINT;
+                        UPDATE ai_messages m SET seq = o.rn
+                        FROM (SELECT id, row_number() OVER (ORDER BY created_at, id) AS rn FROM ai_messages) o
+                        WHERE m.id = o.id;
+                        CREATE SEQUENCE IF NOT EXISTS ai_messages_seq_seq OWNED BY ai_messages.seq;
+                        PERFORM setval('ai_messages_seq_seq', COALESCE((SELECT max(seq) FROM ai_messages), 0) + 1, false);
+                        ALTER TABLE ai_messages ALTER COLUMN seq SET DEFAULT nextval('ai_messages_seq_seq');
+                        ALTER TABLE ai_messages ALTER COLUMN seq SET NOT NULL;
+                    END IF;
+                END $$;
+                """,
+            ),
+        ]
+
+        for name, stmt in columns:
+            try:
+                print(f"[create_db] criando/verificando coluna: {name} ...")
+                cur_db.execute(stmt)
+            except Exception as e:
+                print(f"[create_db] erro ao criar coluna {name}: {e}")
+
+        # pgvector é opcional: sem ele a busca de similares usa o índice em memória (NumPy)
+        try:
+            cur_db.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+            cur_db.execute(
+                f"ALTER TABLE idea_embeddings ADD COLUMN IF NOT EXISTS embedding_vec vector({embedding_dim})"
+            )
+            cur_db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_idea_embeddings_vec ON idea_embeddings "
+                "USING hnsw (embedding_vec vector_cosine_ops)"
+            )
+            print("[create_db] pgvector habilitado para idea_embeddings")
+        except Exception as e:
+            print(f"[create_db] pgvector indisponivel, usando indice em memoria: {e}")
+
+        indexes = [
+            ("idx_idea_tags_idea_id", "CREATE INDEX IF NOT EXISTS idx_idea_tags_idea_id ON idea_tags (idea_id, tag_id)"),
+            # nome de tag único (permite INSERT ... ON CONFLICT (name)). Antes de criar o índice, as tags
+            # duplicadas são fundidas na de menor id: vínculos apontados para ela, vínculos repetidos removidos
+            (
+                "uq_tags_name",
+                """
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (SELECT 1 FROM pg_indexes WHERE schemaname = current_schema() AND indexname = 'uq_tags_name') THEN
+                        UPDATE idea_tags it SET tag_id = k.id
+                        FROM tags t
+                        JOIN (SELECT DISTINCT ON (name) name, id FROM tags ORDER BY name, id) k ON k.name = t.name
+                        WHERE it.tag_id = t.id AND t.id <> k.id;
+                        DELETE FROM idea_tags a USING idea_tags b
+                        WHERE a.idea_id = b.idea_id AND a.tag_id = b.tag_id AND a.id > b.id;
+                        DELETE FROM tags t USING tags k WHERE k.name = t.name AND k.id < t.id;
+                        CREATE UNIQUE INDEX uq_tags_name ON tags (name);
+                        DROP INDEX IF EXISTS idx_tags_name;
+                    END IF;
+                END
+                $$;
+                """,
+            ),
+            ("idx_idea_embeddings_user", "CREATE INDEX IF NOT EXISTS idx_idea_embeddings_user ON idea_embeddings (user_id, model)"),
+            ("idx_llm_cache_access", "CREATE INDEX IF NOT EXISTS idx_llm_cache_access ON llm_cache (last_access_at)"),
+            (
+                "idx_ideas_enrichment_pending",
+                "CREATE INDEX IF NOT EXISTS idx_ideas_enrichment_pending ON ideas (created_at) WHERE enrichment_status = 'pending'",
+            ),
+            ("idx_ideas_user_created", "CREATE INDEX IF NOT EXISTS idx_ideas_user_created ON ideas (user_id, created_at DESC)"),
+            ("idx_ideas_search_vector", "CREATE INDEX IF NOT EXISTS idx_ideas_search_vector ON ideas USING GIN (search_vector)"),
+            ("idx_ideas_title_trgm", "CREATE INDEX IF NOT EXISTS idx_ideas_title_trgm ON ideas USING GIN (title gin_trgm_ops)"),
+            ("idx_ai_chats_user", "CREATE INDEX IF NOT EXISTS idx_ai_chats_user ON ai_chats (user_id)"),
+            ("idx_ai_messages_chat_seq", "CREATE INDEX IF NOT EXISTS idx_ai_messages_chat_seq ON ai_messages (chat_id, seq DESC)"),
+        ]
+
+        for name, stmt in indexes:
+            try:
+                print(f"[create_db] criando/verificando indice: {name} ...")
+                cur_db.execute(stmt)
+            except Exception as e:
+                print(f"[create_db] erro ao criar indice {name}: {e}")
+
         # Correções/alterações para bancos já existentes
         try:
             print("[create_db] aplicando correções na tabela users (se necessário)...")
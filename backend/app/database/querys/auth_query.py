@@ -1,3 +1,4 @@
+import logging
 import os
 from typing import Optional
 
@@ -8,6 +9,8 @@ from passlib.context import CryptContext
 from ..utils.JWT import decode_access_token
 from ..utils.connect_db import get_db_conn
 
+logger = logging.getLogger(__name__)
+
 
 load_dotenv()
 
@@ -52,7 +55,7 @@ def check_token(token: str) -> str | None:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexão ao tentar conectar com o banco: {e}")
+        logger.error("Erro de conexão ao tentar conectar com o banco: %s", e)
         return None
 
     try:
@@ -65,7 +68,7 @@ def check_token(token: str) -> str | None:
         else:
             return None
     except Exception as e:
-        print(f"Erro ao verificar token: {e}")
+        logger.warning("Erro ao verificar token: %s", e)
         return None
     finally:
         try:
@@ -87,7 +90,7 @@ def login_query(login_data: Login) -> dict | None:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexão ao tentar fazer login: {e}")
+        logger.error("Erro de conexão ao tentar fazer login: %s", e)
         return {"status": "error", "message": "db_connection_error"}
 
     try:
@@ -121,7 +124,7 @@ def login_query(login_data: Login) -> dict | None:
         try:
             if pwd_context.verify(login_data.password, stored_password):
                 # Log para debug: informar se será tratado como primeiro login
-                print(f"[login_query] user_id={user_id} is_first_login={is_first_login} has_first_login_col={has_first_login}")
+                logger.debug("user_id=%s is_first_login=%s has_first_login_col=%s", user_id, is_first_login, has_first_login)
 
                 # NÃO atualizamos aqui: a atualização será executada em background pela rota
                 from ..utils.JWT import create_access_token
@@ -135,11 +138,11 @@ def login_query(login_data: Login) -> dict | None:
             else:
                 return {"status": "wrong_password"}
         except Exception as e:
-            print(f"Erro ao verificar senha: {e}")
+            logger.error("Erro ao verificar senha: %s", e)
             return {"status": "error", "message": "password_verify_error"}
 
     except Exception as e:
-        print(f"Erro na query de login: {e}")
+        logger.error("Erro na query de login: %s", e)
         return {"status": "error", "message": "query_error"}
     finally:
         try:
@@ -156,14 +159,14 @@ def register_query(register_data: Register) -> str | None:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexão ao tentar registrar: {e}")
+        logger.error("Erro de conexão ao tentar registrar: %s", e)
         return None
 
     try:
         # Verifica se email já existe
         cur.execute("SELECT 1 FROM users WHERE email = %s", (register_data.email,))
         if cur.fetchone():
-            print("register_query: email já existe")
+            logger.debug("register_query: email já existe")
             return None
 
         hashed = pwd_context.hash(register_data.password)
@@ -187,7 +190,7 @@ def register_query(register_data: Register) -> str | None:
             return str(row[0])
         return None
     except Exception as e:
-        print(f"Erro na query de registro: {e}")
+        logger.error("Erro na query de registro: %s", e)
         return None
     finally:
         try:
@@ -201,7 +204,7 @@ def get_user_query(user_id: str) -> Optional[dict]:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexão ao tentar fazer login: {e}")
+        logger.error("Erro de conexão ao tentar fazer login: %s", e)
         return {"status": "error", "message": "db_connection_error"}
 
 
@@ -234,11 +237,11 @@ def get_user_query(user_id: str) -> Optional[dict]:
             first_login = True if last_login is None else False
 
         # Log para debug
-        print(f"[get_user_query] user_id={user_id} last_login={last_login} first_login={first_login} has_first_login_col={has_first_login}")
+        logger.debug("user_id=%s last_login=%s first_login=%s has_first_login_col=%s", user_id, last_login, first_login, has_first_login)
 
         return {"email": email, "name": name, "first_login": first_login}
     except Exception as e:
-        print(f"Erro na query de login: {e}")
+        logger.error("Erro na query de login: %s", e)
         return None
     finally:
         try:
@@ -257,7 +260,7 @@ def mark_user_logged_in(user_id: str) -> None:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"[mark_user_logged_in] erro ao conectar no banco: {e}")
+        logger.error("erro ao conectar no banco: %s", e)
         return
 
     try:
@@ -267,9 +270,9 @@ def mark_user_logged_in(user_id: str) -> None:
         else:
             cur.execute("UPDATE users SET last_login = NOW() WHERE id = %s", (user_id,))
         conn.commit()
-        print(f"[mark_user_logged_in] updated user {user_id} (has_first_login={has_first_login})")
+        logger.debug("updated user %s (has_first_login=%s)", user_id, has_first_login)
     except Exception as e:
-        print(f"[mark_user_logged_in] erro ao atualizar usuario: {e}")
+        logger.error("erro ao atualizar usuario: %s", e)
     finally:
         try:
             cur.close()
@@ -1,9 +1,13 @@
+import logging
 import os
 from dotenv import load_dotenv
 from pydantic import BaseModel
 from typing import Optional
 
 from ..utils.connect_db import get_db_conn
+from ..utils.name_cache import MISSING, category_name_cache, notify_name_changed
+
+logger = logging.getLogger(__name__)
 
 
 load_dotenv()
@@ -29,7 +33,7 @@ def create_categories(categories: Categories) -> Optional[str]:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao Criar Categoria: {e}")
+        logger.error("Erro de conexao ao Criar Categoria: %s", e)
         return None
 
     try:
@@ -50,13 +54,15 @@ def create_categories(categories: Categories) -> Optional[str]:
             conn.rollback()
             return None
         categories_id = str(row[0])
+        notify_name_changed(cur, "categories", [categories.name])
         conn.commit()
+        category_name_cache.store(categories.name, categories_id)
 
         # Link category to idea
         return create_idea_categories(categories, categories_id)
 
     except Exception as e:
-        print(f"Erro ao inserir Categoria: {e}")
+        logger.error("Erro ao inserir Categoria: %s", e)
         try:
             conn.rollback()
         except Exception:
@@ -79,7 +85,7 @@ def create_idea_categories(categories: Categories, categories_id: str) -> Option
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao Criar Idea-Categoria: {e}")
+        logger.error("Erro de conexao ao Criar Idea-Categoria: %s", e)
         return None
 
     try:
@@ -96,7 +102,7 @@ def create_idea_categories(categories: Categories, categories_id: str) -> Option
         conn.commit()
         return idea_cat_id
     except Exception as e:
-        print(f"Erro ao inserir categoria na ideia: {e}")
+        logger.error("Erro ao inserir categoria na ideia: %s", e)
         try:
             conn.rollback()
         except Exception:
@@ -111,21 +117,28 @@ def create_idea_categories(categories: Categories, categories_id: str) -> Option
 
 
 def get_categories_by_name(name: str) -> Optional[str]:
-    """Return the category id (str) for the given name or None if not found."""
+    """Return the category id (str) for the given name or None if not found.
+
+    Served from the in-process name cache when possible (misses included).
+    """
+    cached = category_name_cache.lookup(name)
+    if cached is not MISSING:
+        return cached
+
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao pegar Categoria: {e}")
+        logger.error("Erro de conexao ao pegar Categoria: %s", e)
         return None
 
     try:
         cur.execute("SELECT id FROM categories WHERE name = %s", (name,))
         row = cur.fetchone()
-        if row:
-            return str(row[0])
-        return None
+        categories_id = str(row[0]) if row else None
+        category_name_cache.store(name, categories_id)
+        return categories_id
     except Exception as e:
-        print(f"Erro ao pegar categoria: {e}")
+        logger.error("Erro ao pegar categoria: %s", e)
         return None
     finally:
         try:
@@ -1,4 +1,6 @@
+import base64
 import json
+import logging
 import os
 from dotenv import load_dotenv
 from pydantic import BaseModel
@@ -6,6 +8,8 @@ from passlib.context import CryptContext
 
 from ..utils.connect_db import get_db_conn
 
+logger = logging.getLogger(__name__)
+
 
 load_dotenv()
 
@@ -38,7 +42,7 @@ def create_chat(chat: Chat) -> str | None:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao criar chat: {e}")
+        logger.error("Erro de conexao ao criar chat: %s", e)
         return None
 
     try:
@@ -51,7 +55,7 @@ def create_chat(chat: Chat) -> str | None:
         conn.rollback()
         return None
     except Exception as e:
-        print(f"Erro ao criar chat: {e}")
+        logger.error("Erro ao criar chat: %s", e)
         try:
             conn.rollback()
         except Exception:
@@ -62,7 +66,7 @@ def create_chat(chat: Chat) -> str | None:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
 
 def create_message(chat_id: str, message: str, sender: str) -> bool:
     """
@@ -83,7 +87,7 @@ def create_message(chat_id: str, message: str, sender: str) -> bool:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao enviar mensagem: {e}")
+        logger.error("Erro de conexao ao enviar mensagem: %s", e)
         return False
 
     try:
@@ -91,7 +95,7 @@ def create_message(chat_id: str, message: str, sender: str) -> bool:
         conn.commit()
         return True
     except Exception as e:
-        print(f"Erro ao enviar mensagem: {e}")
+        logger.error("Erro ao enviar mensagem: %s", e)
         try:
             conn.rollback()
         except Exception:
@@ -102,7 +106,49 @@ def create_message(chat_id: str, message: str, sender: str) -> bool:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
+
+def create_messages(messages: list[tuple[str, str, str, str]]) -> bool:
+    """
+    Insere várias mensagens (id, chat_id, message, sender) em um único INSERT.
+
+    O id vem de quem produziu a mensagem (a memória do chat o usa antes de a
+    mensagem chegar ao banco). A sequência (seq) de cada mensagem é atribuída na
+    ordem da lista, então a ordem em que as mensagens foram produzidas é preservada.
+
+    :param messages: lista de tuplas (id, chat_id, message, sender), em ordem
+    :return: True se todas foram gravadas, False caso contrário
+    """
+    if not messages:
+        return True
+
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao enviar mensagens: %s", e)
+        return False
+
+    try:
+        ids, chat_ids, texts, senders = (list(column) for column in zip(*messages))
+        cur.execute(
+            """
+            INSERT INTO ai_messages (id, chat_id, message, sender)
+            SELECT t.id, t.chat_id, t.message, t.sender
+            FROM unnest(%s::uuid[], %s::uuid[], %s::text[], %s::text[]) WITH ORDINALITY AS t(id, chat_id, message, sender, ord)
+            ORDER BY t.ord
+            """,
+            (ids, chat_ids, texts, senders)
+        )
+        return True
+    except Exception as e:
+        logger.error("Erro ao enviar mensagens: %s", e)
+        return False
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception as e:
+            logger.error("Erro ao fechar conexao: %s", e)
 
 def get_idea_by_chat_id(chat_id: str):
     """
@@ -123,7 +169,7 @@ def get_idea_by_chat_id(chat_id: str):
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao pegar idea: {e}")
+        logger.error("Erro de conexao ao pegar idea: %s", e)
         return None
 
     try:
@@ -133,14 +179,14 @@ def get_idea_by_chat_id(chat_id: str):
             return str(idea[0])
         return None
     except Exception as e:
-        print(f"Erro ao pegar idea: {e}")
+        logger.error("Erro ao pegar idea: %s", e)
         return None
     finally:
         try:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
 
 def get_all_chats(user_id: str):
     """
@@ -158,7 +204,7 @@ def get_all_chats(user_id: str):
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao pegar chats: {e}")
+        logger.error("Erro de conexao ao pegar chats: %s", e)
         return None
 
     try:
@@ -169,7 +215,7 @@ def get_all_chats(user_id: str):
             FROM ai_chats 
             INNER JOIN ai_messages ON ai_chats.id = ai_messages.chat_id 
             WHERE ai_chats.user_id = %s 
-            ORDER BY ai_chats.id DESC, ai_messages.created_at ASC
+            ORDER BY ai_chats.started_at DESC, ai_chats.id, ai_messages.seq ASC
             """,
             (user_id,)
         )
@@ -194,8 +240,6 @@ def get_all_chats(user_id: str):
 
             # Se mudou de chat, salva o chat anterior
             if current_chat_id is not None and chat_id != current_chat_id:
-                print(f"current_messages: {current_messages}")
-
                 chats.append({
                     "chat_id": current_chat_id,
                     "idea_id": current_idea_id,
@@ -213,9 +257,6 @@ def get_all_chats(user_id: str):
                 "created_at": created_at.isoformat() if hasattr(created_at, 'isoformat') else str(created_at)
             })
 
-            print(f"current_chat_id: {current_chat_id}")
-            print(f"current_idea_id: {current_idea_id}")
-
         # Adiciona o último chat
         if current_chat_id is not None:
             chats.append({
@@ -227,16 +268,14 @@ def get_all_chats(user_id: str):
         return chats
 
     except Exception as e:
-        print(f"Erro ao pegar chats: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Erro ao pegar chats: %s", e)
         return None
     finally:
         try:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
 
 def get_chat(chat_id: str):
     """
@@ -257,7 +296,7 @@ def get_chat(chat_id: str):
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao pegar chats: {e}")
+        logger.error("Erro de conexao ao pegar chats: %s", e)
         return None
 
     try:
@@ -267,7 +306,7 @@ def get_chat(chat_id: str):
             "FROM ai_chats "
             "INNER JOIN ai_messages ON ai_chats.id = ai_messages.chat_id "
             "WHERE ai_chats.id = %s "
-            "ORDER BY ai_messages.id DESC",
+            "ORDER BY ai_messages.seq DESC",
             (chat_id,)
         )
         rows = cur.fetchall()
@@ -284,14 +323,14 @@ def get_chat(chat_id: str):
         return chats
 
     except Exception as e:
-        print(f"Erro ao pegar chats: {e}")
+        logger.error("Erro ao pegar chats: %s", e)
         return None
     finally:
         try:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
 
 def get_last_ai_message(chat_id: str) -> str | None:
     """
@@ -303,12 +342,12 @@ def get_last_ai_message(chat_id: str) -> str | None:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao pegar ultima mensagem AI: {e}")
+        logger.error("Erro de conexao ao pegar ultima mensagem AI: %s", e)
         return None
 
     try:
         cur.execute(
-            "SELECT message FROM ai_messages WHERE chat_id = %s AND sender = %s ORDER BY id DESC LIMIT 1",
+            "SELECT message FROM ai_messages WHERE chat_id = %s AND sender = %s ORDER BY seq DESC LIMIT 1",
             (chat_id, 'AI')
         )
         row = cur.fetchone()
@@ -316,14 +355,14 @@ def get_last_ai_message(chat_id: str) -> str | None:
             return row[0]
         return None
     except Exception as e:
-        print(f"Erro ao pegar ultima mensagem AI: {e}")
+        logger.error("Erro ao pegar ultima mensagem AI: %s", e)
         return None
     finally:
         try:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
 
 
 def delete_chat(chat_id: str, user_id: str) -> bool:
@@ -338,7 +377,7 @@ def delete_chat(chat_id: str, user_id: str) -> bool:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao deletar chat: {e}")
+        logger.error("Erro de conexao ao deletar chat: %s", e)
         return False
 
     try:
@@ -347,7 +386,7 @@ def delete_chat(chat_id: str, user_id: str) -> bool:
         chat = cur.fetchone()
 
         if not chat:
-            print(f"Chat {chat_id} nao encontrado ou nao pertence ao usuario {user_id}")
+            logger.debug("Chat %s nao encontrado ou nao pertence ao usuario %s", chat_id, user_id)
             return False
 
         # Delete messages first (due to foreign key constraint)
@@ -357,11 +396,11 @@ def delete_chat(chat_id: str, user_id: str) -> bool:
         cur.execute("DELETE FROM ai_chats WHERE id = %s", (chat_id,))
 
         conn.commit()
-        print(f"Chat {chat_id} deletado com sucesso")
+        logger.debug("Chat %s deletado com sucesso", chat_id)
         return True
 
     except Exception as e:
-        print(f"Erro ao deletar chat: {e}")
+        logger.error("Erro ao deletar chat: %s", e)
         try:
             conn.rollback()
         except Exception:
@@ -372,4 +411,308 @@ def delete_chat(chat_id: str, user_id: str) -> bool:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
+
+
+def get_chat_memory(chat_id: str) -> dict | None:
+    """
+    Retorna a memória do chat (resumo acumulado e últimas mensagens) em uma única
+    consulta pela chave primária.
+
+    :param chat_id: ID do chat
+    :return: dict com summary, recent e summarized_count, ou None se ainda não existir
+    """
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar memoria do chat: %s", e)
+        return None
+
+    try:
+        cur.execute(
+            "SELECT summary, recent, summarized_count FROM chat_memory WHERE chat_id = %s",
+            (chat_id,)
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        return {"summary": row[0] or "", "recent": row[1] or [], "summarized_count": row[2]}
+    except Exception as e:
+        logger.error("Erro ao pegar memoria do chat: %s", e)
+        return None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception as e:
+            logger.error("Erro ao fechar conexao: %s", e)
+
+
+def save_chat_memory(chat_id: str, summary: str, recent: list, summarized_count: int) -> bool:
+    """
+    Grava (upsert) a memória do chat.
+
+    :param chat_id: ID do chat
+    :param summary: resumo das mensagens que já saíram da janela
+    :param recent: últimas mensagens, em ordem cronológica ([{"id", "sender", "message"}])
+    :param summarized_count: quantas mensagens já foram incorporadas ao resumo
+    :return: True se gravou, False caso contrário
+    """
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao salvar memoria do chat: %s", e)
+        return False
+
+    try:
+        cur.execute(
+            """
+            INSERT INTO chat_memory (chat_id, summary, recent, summarized_count, updated_at)
+            VALUES (%s, %s, %s::jsonb, %s, NOW())
+            ON CONFLICT (chat_id) DO UPDATE SET summary = EXCLUDED.summary, recent = EXCLUDED.recent,
+                summarized_count = EXCLUDED.summarized_count, updated_at = NOW()
+            """,
+            (chat_id, summary, json.dumps(recent), summarized_count)
+        )
+        return True
+    except Exception as e:
+        logger.error("Erro ao salvar memoria do chat: %s", e)
+        return False
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception as e:
+            logger.error("Erro ao fechar conexao: %s", e)
+
+
+def get_recent_messages(chat_id: str, limit: int) -> list[dict]:
+    """
+    Retorna as últimas `limit` mensagens do chat em ordem cronológica
+    (usa o índice por chat_id, seq).
+
+    :param chat_id: ID do chat
+    :param limit: quantidade máxima de mensagens
+    :return: lista de {"id", "sender", "message"}
+    """
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar mensagens recentes: %s", e)
+        return []
+
+    try:
+        cur.execute(
+            "SELECT id, sender, message FROM ai_messages WHERE chat_id = %s ORDER BY seq DESC LIMIT %s",
+            (chat_id, limit)
+        )
+        return [{"id": str(row[0]), "sender": row[1], "message": row[2]} for row in reversed(cur.fetchall())]
+    except Exception as e:
+        logger.error("Erro ao pegar mensagens recentes: %s", e)
+        return []
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception as e:
+            logger.error("Erro ao fechar conexao: %s", e)
+
+
+def _encode_message_cursor(seq: int) -> str:
+    raw = json.dumps([seq]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_message_cursor(cursor: str) -> int:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    (seq,) = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    return int(seq)
+
+
+def get_chat_messages(chat_id: str, user_id: str, before: str | None = None, limit: int = 50) -> dict | None:
+    """
+    Retorna uma página de mensagens do chat, das mais novas para as mais antigas,
+    usando paginação por chave na sequência das mensagens (seq).
+
+    As mensagens da página vêm em ordem cronológica; `next_before` é o cursor
+    para buscar as mensagens anteriores (None quando não há mais).
+
+    :param chat_id: ID do chat
+    :param user_id: ID do usuário dono do chat
+    :param before: cursor devolvido pela página anterior
+    :param limit: tamanho da página
+    :return: dict com chat_id, idea_id, messages e next_before; None em caso de erro
+    :raises ValueError: se o cursor for inválido
+    :raises LookupError: se o chat não existir ou não pertencer ao usuário
+    """
+    try:
+        before_seq = _decode_message_cursor(before) if before else None
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar mensagens: %s", e)
+        return None
+
+    try:
+        cur.execute("SELECT idea_id FROM ai_chats WHERE id = %s AND user_id = %s", (chat_id, user_id))
+        chat = cur.fetchone()
+        if not chat:
+            raise LookupError("Chat não encontrado")
+
+        cur.execute(
+            """
+            SELECT id, message, sender, created_at, seq
+            FROM ai_messages
+            WHERE chat_id = %(chat_id)s
+              AND (%(before_seq)s::bigint IS NULL OR seq < %(before_seq)s::bigint)
+            ORDER BY seq DESC
+            LIMIT %(limit)s
+            """,
+            {"chat_id": chat_id, "before_seq": before_seq, "limit": limit + 1}
+        )
+        rows = cur.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        next_before = _encode_message_cursor(rows[-1][4]) if has_more and rows else None
+        messages = [
+            {
+                "message_id": str(row[0]),
+                "message": row[1],
+                "sender": row[2],
+                "created_at": row[3].isoformat() if hasattr(row[3], 'isoformat') else str(row[3])
+            }
+            for row in reversed(rows)
+        ]
+        return {
+            "chat_id": chat_id,
+            "idea_id": str(chat[0]) if chat[0] is not None else None,
+            "messages": messages,
+            "next_before": next_before,
+        }
+    except LookupError:
+        raise
+    except Exception as e:
+        logger.error("Erro ao pegar mensagens: %s", e)
+        return None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception as e:
+            logger.error("Erro ao fechar conexao: %s", e)
+
+
+def get_chats_version(user_id: str) -> tuple | None:
+    """
+    Versão barata da lista de chats do usuário, para ETags:
+    (chats, último started_at, maior seq, soma do último seq de cada chat).
+    Mensagens só são inseridas (seq crescente) ou apagadas junto com o chat, então
+    o último seq de cada chat basta: uma linha por chat pelo índice (chat_id, seq),
+    sem percorrer as mensagens. A soma muda quando um chat recebe mensagem ou é apagado.
+
+    :param user_id: ID do usuário
+    :return: tupla com a versão; None em caso de erro
+    """
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar versao dos chats: %s", e)
+        return None
+
+    try:
+        cur.execute(
+            """
+            SELECT count(*), max(c.started_at), max(m.seq), sum(m.seq)
+            FROM ai_chats c
+            LEFT JOIN LATERAL (
+                SELECT seq FROM ai_messages WHERE chat_id = c.id ORDER BY seq DESC LIMIT 1
+            ) m ON true
+            WHERE c.user_id = %s
+            """,
+            (user_id,)
+        )
+        return cur.fetchone()
+    except Exception as e:
+        logger.error("Erro ao pegar versao dos chats: %s", e)
+        return None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_chat_summaries(user_id: str) -> list[dict] | None:
+    """
+    Lista os chats do usuário com a contagem de mensagens, a primeira mensagem do
+    usuário e a última mensagem de cada um (LATERAL JOIN, sem carregar o histórico).
+
+    :param user_id: ID do usuário
+    :return: lista de chats, do mais recentemente ativo para o menos; None em caso de erro
+    """
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar chats: %s", e)
+        return None
+
+    try:
+        cur.execute(
+            """
+            SELECT c.id, c.idea_id, c.started_at, stats.message_count,
+                   first_msg.message,
+                   last_msg.id, last_msg.message, last_msg.sender, last_msg.created_at
+            FROM ai_chats c
+            CROSS JOIN LATERAL (
+                SELECT count(*) AS message_count FROM ai_messages m WHERE m.chat_id = c.id
+            ) stats
+            LEFT JOIN LATERAL (
+                SELECT m.message FROM ai_messages m
+                WHERE m.chat_id = c.id AND m.sender = 'USER'
+                ORDER BY m.seq ASC
+                LIMIT 1
+            ) first_msg ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT m.id, m.message, m.sender, m.created_at FROM ai_messages m
+                WHERE m.chat_id = c.id
+                ORDER BY m.seq DESC
+                LIMIT 1
+            ) last_msg ON TRUE
+            WHERE c.user_id = %s
+            ORDER BY COALESCE(last_msg.created_at, c.started_at) DESC, c.id
+            """,
+            (user_id,)
+        )
+        chats = []
+        for row in cur.fetchall():
+            last_message = None
+            if row[5] is not None:
+                last_message = {
+                    "message_id": str(row[5]),
+                    "message": row[6],
+                    "sender": row[7],
+                    "created_at": row[8].isoformat() if hasattr(row[8], 'isoformat') else str(row[8])
+                }
+            chats.append({
+                "chat_id": str(row[0]),
+                "idea_id": str(row[1]) if row[1] is not None else None,
+                "started_at": row[2].isoformat() if hasattr(row[2], 'isoformat') else str(row[2]),
+                "message_count": row[3],
+                "first_message": row[4],
+                "last_message": last_message,
+            })
+        return chats
+    except Exception as e:
+        logger.error("Erro ao pegar chats: %s", e)
+        return None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception as e:
+            logger.error("Erro ao fechar conexao: %s", e)
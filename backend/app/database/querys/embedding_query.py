@@ -0,0 +1,239 @@
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+from ..utils.connect_db import get_db_conn
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+db_name = os.getenv("POSTGRES_DB", "idea_hub_db")
+
+_pgvector_available: Optional[bool] = None
+
+
+def pgvector_available() -> bool:
+    """Return True when the `vector` extension and the `embedding_vec` column exist (checked once)."""
+    global _pgvector_available
+    if _pgvector_available is not None:
+        return _pgvector_available
+
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao verificar pgvector: %s", e)
+        return False
+
+    try:
+        cur.execute(
+            "SELECT 1 FROM information_schema.columns WHERE table_name = 'idea_embeddings' AND column_name = 'embedding_vec'"
+        )
+        _pgvector_available = cur.fetchone() is not None
+        return _pgvector_available
+    except Exception as e:
+        logger.error("Erro ao verificar pgvector: %s", e)
+        return False
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_ideas_for_embedding(idea_ids: list[str]) -> list[dict]:
+    """Fetch the fields used to embed the given ideas plus their current embedding hash, in one query."""
+    if not idea_ids:
+        return []
+
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar ideias para embedding: %s", e)
+        return []
+
+    try:
+        cur.execute(
+            """
+            SELECT i.id, i.user_id, i.title, i.ai_classification, i.raw_content, e.content_hash
+            FROM ideas i
+            LEFT JOIN idea_embeddings e ON e.idea_id = i.id
+            WHERE i.id = ANY(%s::uuid[])
+            """,
+            (idea_ids,)
+        )
+        return [
+            {
+                "id": str(row[0]),
+                "user_id": str(row[1]),
+                "title": row[2],
+                "ai_classification": row[3],
+                "raw_content": row[4],
+                "content_hash": row[5],
+            }
+            for row in cur.fetchall()
+        ]
+    except Exception as e:
+        logger.error("Erro ao pegar ideias para embedding: %s", e)
+        return []
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def upsert_idea_embeddings(rows: list[dict], model: str) -> bool:
+    """Insert or update a batch of embeddings (`id`, `user_id`, `content_hash`, `vector`) in one statement."""
+    if not rows:
+        return True
+
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao salvar embeddings: %s", e)
+        return False
+
+    use_pgvector = pgvector_available()
+    try:
+        values = []
+        for row in rows:
+            vector = np.asarray(row["vector"], dtype=np.float32)
+            values.append((
+                row["id"], row["user_id"], model, int(vector.shape[0]), row["content_hash"], vector.tobytes(),
+            ) + (("[" + ",".join(repr(float(x)) for x in vector) + "]",) if use_pgvector else ()))
+
+        columns = "idea_id, user_id, model, dim, content_hash, embedding"
+        updates = "model = EXCLUDED.model, dim = EXCLUDED.dim, content_hash = EXCLUDED.content_hash, embedding = EXCLUDED.embedding, updated_at = NOW()"
+        if use_pgvector:
+            columns += ", embedding_vec"
+            updates += ", embedding_vec = EXCLUDED.embedding_vec"
+        placeholders = ",".join(["%s"] * len(values[0]))
+        args_sql = ",".join(cur.mogrify(f"({placeholders})", v).decode("utf-8") for v in values)
+        cur.execute(
+            f"INSERT INTO idea_embeddings ({columns}) VALUES {args_sql} "
+            f"ON CONFLICT (idea_id) DO UPDATE SET {updates}"
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        logger.error("Erro ao salvar embeddings: %s", e)
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return False
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_user_embeddings(user_id: str, model: str) -> tuple[list[str], Optional[np.ndarray]]:
+    """Load every embedding of a user for the given model as (ids, float32 matrix)."""
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar embeddings: %s", e)
+        return [], None
+
+    try:
+        cur.execute(
+            "SELECT idea_id, dim, embedding FROM idea_embeddings WHERE user_id = %s AND model = %s",
+            (user_id, model)
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return [], None
+        ids = [str(row[0]) for row in rows]
+        matrix = np.stack([np.frombuffer(bytes(row[2]), dtype=np.float32, count=row[1]) for row in rows])
+        return ids, matrix
+    except Exception as e:
+        logger.error("Erro ao pegar embeddings: %s", e)
+        return [], None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def similar_ideas_pgvector(idea_id: str, user_id: str, model: str, limit: int) -> Optional[list[tuple[str, float]]]:
+    """Nearest neighbours by cosine distance using pgvector. Returns None when the idea has no embedding."""
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao buscar ideias similares: %s", e)
+        return None
+
+    try:
+        cur.execute("SELECT embedding_vec FROM idea_embeddings WHERE idea_id = %s AND model = %s", (idea_id, model))
+        row = cur.fetchone()
+        if not row or row[0] is None:
+            return None
+        # Busca exata dentro do usuário: o índice HNSW é global e filtraria user_id depois de
+        # pegar ef_search vizinhos de todos, devolvendo pouco ou nada para quem tem poucas ideias.
+        # MATERIALIZED obriga o filtro (idx_idea_embeddings_user) antes da ordenação.
+        cur.execute(
+            """
+            WITH candidates AS MATERIALIZED (
+                SELECT idea_id, embedding_vec <=> %s::vector AS distance
+                FROM idea_embeddings
+                WHERE user_id = %s AND model = %s AND idea_id <> %s AND embedding_vec IS NOT NULL
+            )
+            SELECT idea_id, 1 - distance AS score
+            FROM candidates
+            ORDER BY distance
+            LIMIT %s
+            """,
+            (row[0], user_id, model, idea_id, limit)
+        )
+        return [(str(r[0]), float(r[1])) for r in cur.fetchall()]
+    except Exception as e:
+        logger.error("Erro ao buscar ideias similares: %s", e)
+        return None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_ideas_summary(idea_ids: list[str]) -> dict[str, dict]:
+    """Fetch id/title/status/ai_classification for a list of ideas, keyed by id."""
+    if not idea_ids:
+        return {}
+
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar ideias: %s", e)
+        return {}
+
+    try:
+        cur.execute(
+            "SELECT id, title, status, ai_classification FROM ideas WHERE id = ANY(%s::uuid[])",
+            (idea_ids,)
+        )
+        return {
+            str(row[0]): {"id": str(row[0]), "title": row[1], "status": row[2], "ai_classification": row[3]}
+            for row in cur.fetchall()
+        }
+    except Exception as e:
+        logger.error("Erro ao pegar ideias: %s", e)
+        return {}
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
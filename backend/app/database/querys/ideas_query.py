@@ -1,3 +1,6 @@
+import base64
+import json
+import logging
 import os
 from typing import Optional
 
@@ -6,8 +9,11 @@ from pydantic import BaseModel
 from passlib.context import CryptContext
 
 from .categories_tags import Categories, create_categories as create_db_categories
-from .tag_query import create_tag, Tag
+from .tag_query import replace_tags_for_idea
 from ..utils.connect_db import get_db_conn
+from ..utils.name_cache import category_name_cache, notify_name_changed
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
@@ -27,6 +33,7 @@ class Idea(BaseModel):
     raw_content: Optional[str] = None
     categories: Optional[list[dict[str, str]]] = None
     tags: Optional[list[str]] = None
+    enrichment_status: Optional[str] = None
 
 
 
@@ -46,19 +53,24 @@ def create_idea(idea: Idea) -> str | None:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexão ao Criar Ideia: {e}")
+        logger.error("Erro de conexão ao Criar Ideia: %s", e)
         return None
 
     try:
         cur.execute(
-            "INSERT INTO ideas (user_id, title, ai_classification) VALUES (%s, %s, %s) RETURNING id",
-            (idea.user_id, idea.title, idea.ai_classification)
+            # enriquecimento pendente já nasce assumido pelo worker que criou a ideia
+            """
+            INSERT INTO ideas (user_id, title, ai_classification, enrichment_status, enrichment_claimed_at)
+            VALUES (%s, %s, %s, %s, CASE WHEN %s = 'pending' THEN NOW() END)
+            RETURNING id
+            """,
+            (idea.user_id, idea.title, idea.ai_classification, idea.enrichment_status or 'done', idea.enrichment_status)
         )
         row = cur.fetchone()
         if row:
             idea_id = str(row[0])
             conn.commit()
-            print(f"Ideia criada com ID: {idea_id}")
+            logger.debug("Ideia criada com ID: %s", idea_id)
 
             if idea.categories:
                 for cat in idea.categories:
@@ -80,17 +92,11 @@ def create_idea(idea: Idea) -> str | None:
                     try:
                         create_db_categories(categories)
                     except Exception as e:
-                        print(f"Erro ao criar categoria no DB: {e}")
+                        logger.error("Erro ao criar categoria no DB: %s", e)
             if idea.tags:
-                for tag in idea.tags:
-                    tags = Tag(
-                        idea_id=idea_id,
-                        name=tag,
-                    )
-                    try:
-                        create_tag(tags)
-                    except Exception as e:
-                        print(f"Erro ao criar tag no DB: {e}")
+                # vínculo em lote, numa única transação
+                if not replace_tags_for_idea(idea_id, idea.tags):
+                    logger.error("Erro ao criar tags no DB para a ideia %s", idea_id)
 
 
             if idea.raw_content:
@@ -103,7 +109,7 @@ def create_idea(idea: Idea) -> str | None:
         conn.rollback()
         return None
     except Exception as e:
-        print(f"Erro ao inserir ideia: {e}")
+        logger.error("Erro ao inserir ideia: %s", e)
         try:
             conn.rollback()
         except Exception:
@@ -116,6 +122,246 @@ def create_idea(idea: Idea) -> str | None:
         except Exception:
             pass
 
+def apply_idea_enrichment(idea_id: str, version: int, ai_classification: str, categories: list[dict] | None) -> bool:
+    """
+    Write back the result of the background enrichment (classification + categories).
+
+    The update only applies while the idea is still at `version` and pending,
+    so a title edited in the meantime (or a duplicate run) never gets overwritten.
+    The status and the categories are written in one transaction: the idea is
+    never seen as 'done' without its categories. Returns True if the result was applied.
+    """
+    names: dict[str, str] = {}
+    for cat in categories or []:
+        if isinstance(cat, dict) and cat.get("name"):
+            names.setdefault(cat["name"], cat.get("description", ""))
+    fetched: dict[str, str] = {}
+
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao enriquecer Ideia: %s", e)
+        return False
+
+    try:
+        conn.autocommit = False
+        cur.execute(
+            """
+            UPDATE ideas
+            SET ai_classification = %s, enrichment_status = 'done', updated_at = NOW()
+            WHERE id = %s AND version = %s AND enrichment_status = 'pending'
+            RETURNING id
+            """,
+            (ai_classification, idea_id, version)
+        )
+        if cur.fetchone() is None:
+            conn.rollback()
+            return False
+
+        if names:
+            # categorias existentes (cache primeiro), as que faltam em lote e os vínculos, na mesma transação
+            category_ids: dict[str, str] = {}
+            for name in names:
+                cached = category_name_cache.lookup(name)
+                if cached:
+                    category_ids[name] = cached
+            unknown = [name for name in names if name not in category_ids]
+            if unknown:
+                cur.execute(
+                    "SELECT DISTINCT ON (name) name, id FROM categories WHERE name = ANY(%s) ORDER BY name, id",
+                    (unknown,)
+                )
+                found = {name: str(cat_id) for name, cat_id in cur.fetchall()}
+                category_ids.update(found)
+                fetched.update(found)
+            missing = [name for name in names if name not in category_ids]
+            if missing:
+                cur.execute(
+                    "INSERT INTO categories (name, description) "
+                    "SELECT * FROM unnest(%s::varchar[], %s::text[]) RETURNING name, id",
+                    (missing, [names[name] for name in missing])
+                )
+                inserted = {name: str(cat_id) for name, cat_id in cur.fetchall()}
+                category_ids.update(inserted)
+                fetched.update(inserted)
+                notify_name_changed(cur, "categories", missing)
+            cur.execute(
+                "INSERT INTO idea_categories (idea_id, category_id) SELECT %s, unnest(%s::uuid[])",
+                (idea_id, [category_ids[name] for name in names])
+            )
+
+        conn.commit()
+        for name, cat_id in fetched.items():
+            category_name_cache.store(name, cat_id)
+        return True
+    except Exception as e:
+        logger.error("Erro ao enriquecer Ideia: %s", e)
+        # Um id em cache pode ter ficado inválido; força nova leitura na próxima vez
+        for name in names:
+            category_name_cache.invalidate(name)
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        return False
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def mark_idea_enrichment_failed(idea_id: str, version: int) -> None:
+    """Flag a pending enrichment as failed (only if the idea is still at `version`)."""
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao marcar enriquecimento: %s", e)
+        return
+
+    try:
+        cur.execute(
+            "UPDATE ideas SET enrichment_status = 'failed', updated_at = NOW() "
+            "WHERE id = %s AND version = %s AND enrichment_status = 'pending'",
+            (idea_id, version)
+        )
+    except Exception as e:
+        logger.error("Erro ao marcar enriquecimento: %s", e)
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def get_idea_enrichment(idea_id: str) -> dict | None:
+    """Return the enrichment state of an idea: status, version, classification and categories."""
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar enriquecimento: %s", e)
+        return None
+
+    try:
+        cur.execute(
+            """
+            SELECT
+                i.user_id,
+                i.enrichment_status,
+                i.version,
+                i.ai_classification,
+                COALESCE(
+                    json_agg(json_build_object('name', c.name, 'description', c.description) ORDER BY c.name)
+                        FILTER (WHERE c.id IS NOT NULL),
+                    '[]'::json
+                )
+            FROM ideas i
+            LEFT JOIN idea_categories ic ON ic.idea_id = i.id
+            LEFT JOIN categories c ON c.id = ic.category_id
+            WHERE i.id = %s
+            GROUP BY i.id
+            """,
+            (idea_id,)
+        )
+        row = cur.fetchone()
+        if not row:
+            return None
+        return {
+            "idea_id": idea_id,
+            "user_id": str(row[0]),
+            "status": row[1],
+            "version": row[2],
+            "ai_classification": row[3],
+            "categories": row[4] or [],
+        }
+    except Exception as e:
+        logger.error("Erro ao pegar enriquecimento: %s", e)
+        return None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def claim_pending_enrichments(stale_seconds: float, limit: int = 500) -> list[dict]:
+    """Claim ideas whose enrichment never finished (e.g. the worker restarted mid-way).
+
+    Only rows unclaimed, or claimed more than `stale_seconds` ago, are taken, and
+    the claim is written in the same statement (`FOR UPDATE SKIP LOCKED`), so
+    workers starting together split the backlog instead of each resubmitting it.
+    """
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar enriquecimentos pendentes: %s", e)
+        return []
+
+    try:
+        cur.execute(
+            """
+            UPDATE ideas
+            SET enrichment_claimed_at = NOW()
+            WHERE id IN (
+                SELECT id FROM ideas
+                WHERE enrichment_status = 'pending'
+                  AND (enrichment_claimed_at IS NULL OR enrichment_claimed_at < NOW() - make_interval(secs => %s))
+                ORDER BY created_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, version, title
+            """,
+            (stale_seconds, limit)
+        )
+        return [{"id": str(r[0]), "version": r[1], "title": r[2]} for r in cur.fetchall()]
+    except Exception as e:
+        logger.error("Erro ao pegar enriquecimentos pendentes: %s", e)
+        return []
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
+def set_enrichment_claims(idea_ids: list[str], claimed: bool) -> bool:
+    """Renew (`claimed=True`) or release the claim on pending enrichments.
+
+    Workers renew the claims of the ideas they are still enriching, so nobody
+    takes them over, and release them on shutdown so the next process can
+    claim them right away instead of waiting for the claim to go stale.
+    """
+    if not idea_ids:
+        return True
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao atualizar enriquecimentos assumidos: %s", e)
+        return False
+
+    try:
+        cur.execute(
+            "UPDATE ideas SET enrichment_claimed_at = CASE WHEN %s THEN NOW() END "
+            "WHERE id = ANY(%s::uuid[]) AND enrichment_status = 'pending'",
+            (claimed, idea_ids)
+        )
+        return True
+    except Exception as e:
+        logger.error("Erro ao atualizar enriquecimentos assumidos: %s", e)
+        return False
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
 def get_all_ideas(user_id: str) -> list[dict] | None:
     """
     Fetches a list of ideas associated with the given user, including tag names.
@@ -127,7 +373,7 @@ def get_all_ideas(user_id: str) -> list[dict] | None:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao pegar ideas: {e}")
+        logger.error("Erro de conexao ao pegar ideas: %s", e)
         return None
 
     try:
@@ -141,12 +387,13 @@ def get_all_ideas(user_id: str) -> list[dict] | None:
                 i.ai_classification,
                 i.created_at,
                 i.raw_content,
-                COALESCE(array_agg(t.name ORDER BY t.name) FILTER (WHERE t.name IS NOT NULL), ARRAY[]::text[]) AS tags
+                COALESCE(array_agg(t.name ORDER BY t.name) FILTER (WHERE t.name IS NOT NULL), ARRAY[]::text[]) AS tags,
+                i.enrichment_status
             FROM ideas i
             LEFT JOIN idea_tags it ON it.idea_id = i.id
             LEFT JOIN tags t ON t.id = it.tag_id
             WHERE i.user_id = %s
-            GROUP BY i.id, i.user_id, i.title, i.status, i.ai_classification, i.created_at, i.raw_content
+            GROUP BY i.id, i.user_id, i.title, i.status, i.ai_classification, i.created_at, i.raw_content, i.enrichment_status
             ORDER BY i.created_at DESC
             """,
             (user_id,)
@@ -168,11 +415,12 @@ def get_all_ideas(user_id: str) -> list[dict] | None:
                 "created_at": created_at_str,
                 "raw_content": row[6],
                 "tags": tags_list,
+                "enrichment_status": row[8],
             })
 
         return ideas
     except Exception as e:
-        print(f"Erro ao pegar ideas: {e}")
+        logger.error("Erro ao pegar ideas: %s", e)
         return None
     finally:
         try:
@@ -181,6 +429,33 @@ def get_all_ideas(user_id: str) -> list[dict] | None:
         except Exception:
             pass
 
+def get_ideas_version(user_id: str) -> tuple | None:
+    """
+    Cheap version of the user's idea list for ETags: (count, latest updated_at).
+
+    Every write to an idea (content, status, title, tags, enrichment) touches
+    `updated_at`; deletions change the count.
+    """
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar versao das ideias: %s", e)
+        return None
+
+    try:
+        cur.execute("SELECT count(*), max(updated_at) FROM ideas WHERE user_id = %s", (user_id,))
+        return cur.fetchone()
+    except Exception as e:
+        logger.error("Erro ao pegar versao das ideias: %s", e)
+        return None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
 def get_idea_by_id(idea_id: str) -> dict | None:
     """
     Fetches an idea by its unique identifier, including tag names.
@@ -190,7 +465,7 @@ def get_idea_by_id(idea_id: str) -> dict | None:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao pegar Ideia: {e}")
+        logger.error("Erro de conexao ao pegar Ideia: %s", e)
         return None
 
     try:
@@ -204,12 +479,13 @@ def get_idea_by_id(idea_id: str) -> dict | None:
                 i.ai_classification,
                 i.created_at,
                 i.raw_content,
-                COALESCE(array_agg(t.name ORDER BY t.name) FILTER (WHERE t.name IS NOT NULL), ARRAY[]::text[]) AS tags
+                COALESCE(array_agg(t.name ORDER BY t.name) FILTER (WHERE t.name IS NOT NULL), ARRAY[]::text[]) AS tags,
+                i.enrichment_status
             FROM ideas i
             LEFT JOIN idea_tags it ON it.idea_id = i.id
             LEFT JOIN tags t ON t.id = it.tag_id
             WHERE i.id = %s
-            GROUP BY i.id, i.user_id, i.title, i.status, i.ai_classification, i.created_at, i.raw_content
+            GROUP BY i.id, i.user_id, i.title, i.status, i.ai_classification, i.created_at, i.raw_content, i.enrichment_status
             """,
             (idea_id,)
         )
@@ -228,10 +504,35 @@ def get_idea_by_id(idea_id: str) -> dict | None:
                 "created_at": created_at_str,
                 "raw_content": row[6],
                 "tags": tags_list,
+                "enrichment_status": row[8],
             }
         return None
     except Exception as e:
-        print(f"Erro ao pegar Ideia: {e}")
+        logger.error("Erro ao pegar Ideia: %s", e)
+        return None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+def get_idea_version(idea_id: str) -> dict | None:
+    """Owner, version and updated_at of an idea (for ETags), or None if missing/error."""
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar versao da Ideia: %s", e)
+        return None
+
+    try:
+        cur.execute("SELECT user_id, version, updated_at FROM ideas WHERE id = %s", (idea_id,))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return {"user_id": str(row[0]), "version": row[1], "updated_at": row[2]}
+    except Exception as e:
+        logger.error("Erro ao pegar versao da Ideia: %s", e)
         return None
     finally:
         try:
@@ -240,6 +541,7 @@ def get_idea_by_id(idea_id: str) -> dict | None:
         except Exception:
             pass
 
+
 def edit_idea_status(idea_id: str, new_status: str) -> bool:
     """
     Edit the status of an idea in the database. This function updates the idea's
@@ -257,7 +559,7 @@ def edit_idea_status(idea_id: str, new_status: str) -> bool:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao editar Ideia: {e}")
+        logger.error("Erro de conexao ao editar Ideia: %s", e)
         return False
 
     try:
@@ -265,7 +567,7 @@ def edit_idea_status(idea_id: str, new_status: str) -> bool:
         conn.commit()
         return True
     except Exception as e:
-        print(f"Erro ao editar Ideia: {e}")
+        logger.error("Erro ao editar Ideia: %s", e)
         conn.rollback()
         return False
     finally:
@@ -294,7 +596,7 @@ def edit_idea_content(idea_id: str, content: str) -> bool:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao editar Ideia: {e}")
+        logger.error("Erro de conexao ao editar Ideia: %s", e)
         return False
 
     try:
@@ -324,7 +626,7 @@ def edit_idea_content(idea_id: str, content: str) -> bool:
         create_idea_version(idea_id, content)
         return True
     except Exception as e:
-        print(f"Erro ao editar Ideia: {e}")
+        logger.error("Erro ao editar Ideia: %s", e)
         conn.rollback()
         return False
     finally:
@@ -332,7 +634,7 @@ def edit_idea_content(idea_id: str, content: str) -> bool:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
             pass
 
 def update_idea(idea_id: str, idea: Idea) -> bool:
@@ -353,19 +655,20 @@ def update_idea(idea_id: str, idea: Idea) -> bool:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao editar Ideia: {e}")
+        logger.error("Erro de conexao ao editar Ideia: %s", e)
         return False
 
     try:
-        # update multiple fields and touch updated_at
+        # update multiple fields, touch updated_at and bump version so in-flight enrichments are discarded
         cur.execute(
-            "UPDATE ideas SET title = %s, ai_classification = %s, updated_at = NOW() WHERE id = %s",
+            "UPDATE ideas SET title = %s, ai_classification = %s, enrichment_status = 'done', "
+            "version = version + 1, updated_at = NOW() WHERE id = %s",
             (idea.title, idea.ai_classification, idea_id)
         )
         conn.commit()
         return True
     except Exception as e:
-        print(f"Erro ao editar Ideia: {e}")
+        logger.error("Erro ao editar Ideia: %s", e)
         conn.rollback()
         return False
     finally:
@@ -392,7 +695,7 @@ def delete_idea_by_id(idea_id: str) -> bool:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao deletar Ideia: {e}")
+        logger.error("Erro de conexao ao deletar Ideia: %s", e)
         return False
 
     try:
@@ -400,7 +703,7 @@ def delete_idea_by_id(idea_id: str) -> bool:
         conn.commit()
         return True
     except Exception as e:
-        print(f"Erro ao deletar Ideia: {e}")
+        logger.error("Erro ao deletar Ideia: %s", e)
         conn.rollback()
         return False
     finally:
@@ -427,7 +730,7 @@ def create_idea_version(idea_id: str, content: str):
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao Criar Ideia: {e}")
+        logger.error("Erro de conexao ao Criar Ideia: %s", e)
         return None
 
     try:
@@ -439,16 +742,16 @@ def create_idea_version(idea_id: str, content: str):
         if row:
             idea_version_id = str(row[0])
             conn.commit()
-            print(f"Ideia criada com ID: {idea_version_id}")
+            logger.debug("Ideia criada com ID: %s", idea_version_id)
             return idea_version_id
         conn.rollback()
         return None
     except Exception as e:
-        print(f"Erro ao inserir ideia: {e}")
+        logger.error("Erro ao inserir ideia: %s", e)
         try:
             conn.rollback()
         except Exception as e:
-            print(f"Erro ao rollback: {e}")
+            logger.error("Erro ao rollback: %s", e)
             pass
         return None
     finally:
@@ -456,5 +759,180 @@ def create_idea_version(idea_id: str, content: str):
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
+            pass
+
+def _encode_search_cursor(score: float, idea_id: str) -> str:
+    raw = json.dumps([score, idea_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_search_cursor(cursor: str) -> tuple[float, str]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    score, idea_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    return float(score), str(idea_id)
+
+
+def _html_escaped(column: str) -> str:
+    """SQL expression HTML-escaping `column` (user text: only the `<mark>` of ts_headline may come back as markup)."""
+    return (
+        f"replace(replace(replace(replace(replace({column}, '&', '&amp;'), '<', '&lt;'), '>', '&gt;'), "
+        f"'\"', '&quot;'), '''', '&#39;')"
+    )
+
+
+def search_ideas(
+    user_id: str,
+    query: str,
+    tags: Optional[list[str]] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 20,
+) -> dict | None:
+    """
+    Full-text and fuzzy search over the ideas of a user.
+
+    Matches the `search_vector` generated column (title, ai_classification and
+    raw_content, weighted in that order) with `websearch_to_tsquery` and also
+    accepts typo-tolerant title matches through `pg_trgm`. Results are ranked by
+    `ts_rank_cd + similarity(title)` and paginated with an opaque keyset cursor
+    over `(score, id)`. Highlight snippets are only built for the returned page.
+    Status/tag facets are computed on the first page (no cursor) only.
+    The title and raw_content are HTML-escaped before highlighting, so the only
+    markup in `title_highlight` and `snippet` is the `<mark>` added here.
+
+    :return: dict with `items`, `facets` and `next_cursor`, or None on error.
+    """
+    try:
+        after_score, after_id = _decode_search_cursor(cursor) if cursor else (None, None)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao buscar ideias: %s", e)
+        return None
+
+    params = {
+        "user_id": user_id,
+        "q": query,
+        "tags": tags or None,
+        "status": status,
+        "after_score": after_score,
+        "after_id": after_id,
+        "limit": limit + 1,
+    }
+    matches_cte = """
+        WITH q AS (
+            SELECT websearch_to_tsquery('portuguese', %(q)s) AS tsq
+        ),
+        matches AS (
+            SELECT
+                i.id,
+                i.status,
+                (ts_rank_cd(i.search_vector, q.tsq) + similarity(i.title, %(q)s))::float8 AS score
+            FROM ideas i, q
+            WHERE i.user_id = %(user_id)s
+              AND (i.search_vector @@ q.tsq OR i.title %% %(q)s)
+              AND (%(status)s::text IS NULL OR i.status = %(status)s)
+              AND (
+                  %(tags)s::text[] IS NULL OR EXISTS (
+                      SELECT 1 FROM idea_tags it
+                      JOIN tags t ON t.id = it.tag_id
+                      WHERE it.idea_id = i.id AND t.name = ANY(%(tags)s::text[])
+                  )
+              )
+        )
+    """
+
+    try:
+        cur.execute(
+            matches_cte + """
+            , page AS (
+                SELECT m.id, m.score
+                FROM matches m
+                WHERE %(after_score)s::float8 IS NULL
+                   OR (m.score, m.id) < (%(after_score)s::float8, %(after_id)s::uuid)
+                ORDER BY m.score DESC, m.id DESC
+                LIMIT %(limit)s
+            )
+            SELECT
+                i.id,
+                i.title,
+                i.status,
+                i.ai_classification,
+                i.created_at,
+                p.score,
+                ts_headline('portuguese', """ + _html_escaped("i.title") + """, q.tsq,
+                            'HighlightAll=true, StartSel=<mark>, StopSel=</mark>'),
+                ts_headline('portuguese', """ + _html_escaped("i.raw_content") + """, q.tsq,
+                            'MaxFragments=2, MaxWords=20, MinWords=5, StartSel=<mark>, StopSel=</mark>'),
+                COALESCE(
+                    (SELECT array_agg(t.name ORDER BY t.name)
+                     FROM idea_tags it JOIN tags t ON t.id = it.tag_id
+                     WHERE it.idea_id = i.id),
+                    ARRAY[]::text[]
+                ) AS tags
+            FROM page p
+            JOIN ideas i ON i.id = p.id
+            CROSS JOIN q
+            ORDER BY p.score DESC, p.id DESC
+            """,
+            params
+        )
+        rows = cur.fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        items: list[dict] = []
+        for row in rows:
+            created_at = row[4]
+            items.append({
+                "id": str(row[0]),
+                "title": row[1],
+                "status": row[2],
+                "ai_classification": row[3],
+                "created_at": created_at.isoformat() if getattr(created_at, 'isoformat', None) else None,
+                "score": float(row[5]),
+                "title_highlight": row[6],
+                "snippet": row[7] or "",
+                "tags": row[8] or [],
+            })
+
+        facets = None
+        if cursor is None:
+            cur.execute(
+                matches_cte + "SELECT status, count(*) FROM matches GROUP BY status",
+                params
+            )
+            status_facets = {row[0]: row[1] for row in cur.fetchall()}
+            cur.execute(
+                matches_cte + """
+                SELECT t.name, count(*)
+                FROM matches m
+                JOIN idea_tags it ON it.idea_id = m.id
+                JOIN tags t ON t.id = it.tag_id
+                GROUP BY t.name
+                ORDER BY count(*) DESC, t.name
+                LIMIT 50
+                """,
+                params
+            )
+            tag_facets = {row[0]: row[1] for row in cur.fetchall()}
+            facets = {"status": status_facets, "tags": tag_facets}
+
+        next_cursor = None
+        if has_more and items:
+            next_cursor = _encode_search_cursor(items[-1]["score"], items[-1]["id"])
+
+        return {"items": items, "facets": facets, "next_cursor": next_cursor}
+    except Exception as e:
+        logger.error("Erro ao buscar ideias: %s", e)
+        return None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
             pass
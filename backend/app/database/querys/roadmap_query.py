@@ -1,3 +1,4 @@
+import logging
 import os
 import json
 from typing import Optional, Dict, Any
@@ -8,6 +9,8 @@ from passlib.context import CryptContext
 
 from ..utils.connect_db import get_db_conn
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 user = os.getenv("POSTGRES_USER", "postgres")
@@ -50,7 +53,7 @@ def create_roadmap(roadmap: Roadmap) -> Optional[str]:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao criar roadmap: {e}")
+        logger.error("Erro de conexao ao criar roadmap: %s", e)
         return None
 
     try:
@@ -59,7 +62,7 @@ def create_roadmap(roadmap: Roadmap) -> Optional[str]:
         roadmap_id = cur.fetchone()[0]
         return str(roadmap_id)
     except Exception as e:
-        print(f"Erro ao criar roadmap: {e}")
+        logger.error("Erro ao criar roadmap: %s", e)
         conn.rollback()
         return None
     finally:
@@ -87,7 +90,7 @@ def create_roadmap_steps(step: RoadmapSteps) -> Optional[str]:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao criar roadmap steps: {e}")
+        logger.error("Erro de conexao ao criar roadmap steps: %s", e)
         return None
 
 
@@ -97,7 +100,7 @@ def create_roadmap_steps(step: RoadmapSteps) -> Optional[str]:
         step_id = cur.fetchone()[0]
         return str(step_id)
     except Exception as e:
-        print(f"Erro ao criar roadmap steps: {e}")
+        logger.error("Erro ao criar roadmap steps: %s", e)
         conn.rollback()
         return None
     finally:
@@ -105,7 +108,7 @@ def create_roadmap_steps(step: RoadmapSteps) -> Optional[str]:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro de conexao ao criar roadmap steps: {e}")
+            logger.error("Erro de conexao ao criar roadmap steps: %s", e)
             pass
 
 def create_roadmap_tasks(task: RoadmapTasks) -> Optional[str]:
@@ -124,7 +127,7 @@ def create_roadmap_tasks(task: RoadmapTasks) -> Optional[str]:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao criar roadmap tasks: {e}")
+        logger.error("Erro de conexao ao criar roadmap tasks: %s", e)
         return None
 
     try:
@@ -135,7 +138,7 @@ def create_roadmap_tasks(task: RoadmapTasks) -> Optional[str]:
         task_id = cur.fetchone()[0]
         return str(task_id)
     except Exception as e:
-        print(f"Erro ao criar roadmap tasks: {e}")
+        logger.error("Erro ao criar roadmap tasks: %s", e)
         conn.rollback()
         return None
     finally:
@@ -143,7 +146,7 @@ def create_roadmap_tasks(task: RoadmapTasks) -> Optional[str]:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro de conexao ao criar roadmap tasks: {e}")
+            logger.error("Erro de conexao ao criar roadmap tasks: %s", e)
             pass
 
 def get_roadmap_with_details(roadmap_id: str) -> Optional[Dict]:
@@ -180,7 +183,7 @@ def get_roadmap_with_details(roadmap_id: str) -> Optional[Dict]:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro ao conectar ao banco: {e}")
+        logger.error("Erro ao conectar ao banco: %s", e)
         return None
 
     try:
@@ -255,9 +258,7 @@ def get_roadmap_with_details(roadmap_id: str) -> Optional[Dict]:
         return roadmap
 
     except Exception as e:
-        print(f"Erro ao buscar roadmap: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Erro ao buscar roadmap: %s", e)
         return None
     finally:
         try:
@@ -266,11 +267,47 @@ def get_roadmap_with_details(roadmap_id: str) -> Optional[Dict]:
         except:
             pass
 
+def get_roadmap_version(roadmap_id: str) -> Optional[tuple]:
+    """
+    Cheap version of a roadmap for ETags: (generated_at, exported_to, steps, tasks).
+
+    Steps and tasks are only ever inserted after the roadmap row, so their
+    counts change while the workflow is still filling the roadmap in.
+    """
+    try:
+        conn, cur = get_db_conn(db_name)
+    except Exception as e:
+        logger.error("Erro de conexao ao pegar versao do roadmap: %s", e)
+        return None
+
+    try:
+        cur.execute(
+            """
+            SELECT r.generated_at, r.exported_to,
+                   (SELECT count(*) FROM roadmap_steps s WHERE s.roadmap_id = r.id),
+                   (SELECT count(*) FROM roadmap_tasks t JOIN roadmap_steps s ON s.id = t.step_id WHERE s.roadmap_id = r.id)
+            FROM roadmaps r
+            WHERE r.id = %s
+            """,
+            (roadmap_id,)
+        )
+        return cur.fetchone()
+    except Exception as e:
+        logger.error("Erro ao pegar versao do roadmap: %s", e)
+        return None
+    finally:
+        try:
+            cur.close()
+            conn.close()
+        except Exception:
+            pass
+
+
 def get_all_roadmaps() -> Optional[list[Any]]:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro ao conectar ao banco: {e}")
+        logger.error("Erro ao conectar ao banco: %s", e)
         return []
 
     try:
@@ -356,7 +393,7 @@ def get_all_roadmaps() -> Optional[list[Any]]:
 
         return roadmaps
     except Exception as e:
-        print(f"Erro ao buscar roadmaps: {e}")
+        logger.error("Erro ao buscar roadmaps: %s", e)
         return []
     finally:
         try:
@@ -380,7 +417,7 @@ def update_roadmap_image_path(roadmap_id: str, image_path: str) -> bool:
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro ao conectar ao banco: {e}")
+        logger.error("Erro ao conectar ao banco: %s", e)
         return False
 
     try:
@@ -395,7 +432,7 @@ def update_roadmap_image_path(roadmap_id: str, image_path: str) -> bool:
         return True
 
     except Exception as e:
-        print(f"Erro ao atualizar roadmap: {e}")
+        logger.error("Erro ao atualizar roadmap: %s", e)
         conn.rollback()
         return False
     finally:
@@ -1,3 +1,4 @@
+import logging
 import os
 from typing import Optional
 
@@ -6,6 +7,9 @@ from pydantic import BaseModel
 from passlib.context import CryptContext
 
 from ..utils.connect_db import get_db_conn
+from ..utils.name_cache import MISSING, notify_name_changed, tag_name_cache
+
+logger = logging.getLogger(__name__)
 
 
 load_dotenv()
@@ -38,7 +42,7 @@ def create_tag(tag: Tag):
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao criar tag: {e}")
+        logger.error("Erro de conexao ao criar tag: %s", e)
         return None
 
     try:
@@ -53,7 +57,7 @@ def create_tag(tag: Tag):
                 pass
             return None
     except Exception as e:
-        print(f"Erro ao pegar tag: {e}")
+        logger.error("Erro ao pegar tag: %s", e)
         # garantir fechamento da conexão aberta no início
         try:
             cur.close()
@@ -64,20 +68,28 @@ def create_tag(tag: Tag):
 
     try:
         # Corrigido: inserir somente o nome na tabela tags e retornar id
-        cur.execute("INSERT INTO tags (name) VALUES (%s) RETURNING id", (tag.name,))
-        tag_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO tags (name) VALUES (%s) ON CONFLICT (name) DO NOTHING RETURNING id", (tag.name,))
+        row = cur.fetchone()
+        if row is None:
+            # criada por outra requisição entre a consulta e o INSERT
+            cur.execute("SELECT id FROM tags WHERE name = %s", (tag.name,))
+            row = cur.fetchone()
+        else:
+            notify_name_changed(cur, "tags", [tag.name])
+        tag_id = row[0]
         conn.commit()
+        tag_name_cache.store(tag.name, str(tag_id))
 
         try:
             tag.tag_id = str(tag_id)
             create_tags_idea(tag)
         except Exception as e:
-            print(f"Erro ao criar tag: {e}")
+            logger.error("Erro ao criar tag: %s", e)
             conn.rollback()
             return None
 
     except Exception as e:
-        print(f"Erro ao criar tag: {e}")
+        logger.error("Erro ao criar tag: %s", e)
         try:
             conn.rollback()
         except Exception:
@@ -88,7 +100,7 @@ def create_tag(tag: Tag):
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
 
 def create_tags_idea(tag: Tag):
     """
@@ -112,7 +124,7 @@ def create_tags_idea(tag: Tag):
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao criar tag: {e}")
+        logger.error("Erro de conexao ao criar tag: %s", e)
         return None
 
     try:
@@ -120,7 +132,7 @@ def create_tags_idea(tag: Tag):
         conn.commit()
         return True
     except Exception as e:
-        print(f"Erro ao criar tag: {e}")
+        logger.error("Erro ao criar tag: %s", e)
         conn.rollback()
         return False
     finally:
@@ -128,7 +140,7 @@ def create_tags_idea(tag: Tag):
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
 
 
 def get_tag_by_name(name: str):
@@ -139,62 +151,158 @@ def get_tag_by_name(name: str):
     the corresponding tag object. It is used to identify or access specific tags
     based on their unique names.
 
+    Lookups go through an in-process name cache (misses included), so repeated
+    names do not cost a round-trip.
+
     :param name: The name of the tag to search for.
     :type name: str
     :return: The tag object that matches the provided name.
     :rtype: Any
     """
+    cached = tag_name_cache.lookup(name)
+    if cached is not MISSING:
+        return cached
 
     try:
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao pegar tag: {e}")
+        logger.error("Erro de conexao ao pegar tag: %s", e)
         return None
 
     try:
         cur.execute("SELECT id FROM tags WHERE name = %s", (name,))
         row = cur.fetchone()
-        if row:
-            return str(row[0])
-        return None
+        tag_id = str(row[0]) if row else None
+        tag_name_cache.store(name, tag_id)
+        return tag_id
     except Exception as e:
-        print(f"Erro ao pegar tag: {e}")
+        logger.error("Erro ao pegar tag: %s", e)
         return None
     finally:
         try:
             cur.close()
             conn.close()
         except Exception as e:
-            print(f"Erro ao fechar conexao: {e}")
+            logger.error("Erro ao fechar conexao: %s", e)
+
+def _normalize_tag_names(tags: list[str] | None) -> list[str]:
+    """Strip blanks and drop duplicates while keeping the first occurrence order."""
+    names: list[str] = []
+    seen = set()
+    for raw in tags or []:
+        name = (raw or "").strip()
+        if not name or name in seen:
+            continue
+        seen.add(name)
+        names.append(name)
+    return names
+
 
 def replace_tags_for_idea(idea_id: str, tags: list[str]) -> bool:
-    """Replace all tags for the given idea.
+    """Replace the tags of the given idea using a set-diff in one transaction.
 
-    This deletes existing rows in `idea_tags` for the idea and then ensures
-    each provided tag exists and is linked to the idea (using `create_tag`).
+    Only the link rows that actually changed are touched: names no longer
+    present are unlinked, new names are upserted into `tags` in bulk and then
+    linked. Re-saving (or re-ordering) the same tags is a no-op. Everything runs
+    in a single transaction, so a failure midway keeps the previous tags intact.
     Returns True on success, False on error.
     """
+    desired = _normalize_tag_names(tags)
+    added: list[str] = []
+
     try:
-        # Remove existing mappings
         conn, cur = get_db_conn(db_name)
     except Exception as e:
-        print(f"Erro de conexao ao substituir tags: {e}")
+        logger.error("Erro de conexao ao substituir tags: %s", e)
         return False
 
     try:
-        cur.execute("DELETE FROM idea_tags WHERE idea_id = %s", (idea_id,))
+        conn.autocommit = False
+
+        # Tags atualmente vinculadas (nome -> ids dos vínculos existentes)
+        cur.execute(
+            """
+            SELECT t.id, t.name
+            FROM idea_tags it
+            JOIN tags t ON t.id = it.tag_id
+            WHERE it.idea_id = %s
+            FOR UPDATE OF it
+            """,
+            (idea_id,)
+        )
+        current: dict[str, list[str]] = {}
+        for tag_id, name in cur.fetchall():
+            current.setdefault(name, []).append(str(tag_id))
+
+        desired_set = set(desired)
+        removed_ids = [tid for name, ids in current.items() if name not in desired_set for tid in ids]
+        added = [name for name in desired if name not in current]
+
+        if not removed_ids and not added:
+            conn.rollback()
+            return True
+
+        if removed_ids:
+            cur.execute(
+                "DELETE FROM idea_tags WHERE idea_id = %s AND tag_id = ANY(%s::uuid[])",
+                (idea_id, removed_ids)
+            )
+
+        fetched: dict[str, str] = {}
+        if added:
+            # Upsert em lote: reaproveita tags existentes (cache primeiro) e cria somente as que faltam
+            tag_ids: dict[str, str] = {}
+            for name in added:
+                cached = tag_name_cache.lookup(name)
+                if cached:
+                    tag_ids[name] = cached
+            unknown = [name for name in added if name not in tag_ids]
+            if unknown:
+                cur.execute(
+                    "SELECT DISTINCT ON (name) name, id FROM tags WHERE name = ANY(%s) ORDER BY name, id",
+                    (unknown,)
+                )
+                found = {name: str(tag_id) for name, tag_id in cur.fetchall()}
+                tag_ids.update(found)
+                fetched.update(found)
+            missing = [name for name in added if name not in tag_ids]
+            if missing:
+                cur.execute(
+                    "INSERT INTO tags (name) SELECT unnest(%s::varchar[]) ON CONFLICT (name) DO NOTHING RETURNING name, id",
+                    (missing,)
+                )
+                inserted = {name: str(tag_id) for name, tag_id in cur.fetchall()}
+                if inserted:
+                    notify_name_changed(cur, "tags", list(inserted))
+                # as que outra transação criou nesse meio tempo
+                raced = [name for name in missing if name not in inserted]
+                if raced:
+                    cur.execute("SELECT name, id FROM tags WHERE name = ANY(%s)", (raced,))
+                    inserted.update({name: str(tag_id) for name, tag_id in cur.fetchall()})
+                tag_ids.update(inserted)
+                fetched.update(inserted)
+
+            cur.execute(
+                "INSERT INTO idea_tags (idea_id, tag_id) SELECT %s, unnest(%s::uuid[])",
+                (idea_id, [tag_ids[name] for name in added])
+            )
+
+        # as tags fazem parte da ideia: muda o ETag de GET /api/idea
+        cur.execute("UPDATE ideas SET updated_at = NOW() WHERE id = %s", (idea_id,))
+
         conn.commit()
+        for name, tag_id in fetched.items():
+            tag_name_cache.store(name, tag_id)
+        return True
     except Exception as e:
-        print(f"Erro ao deletar mapeamentos de tags: {e}")
+        logger.error("Erro ao substituir tags: %s", e)
+        # Um id em cache pode ter ficado inválido; força nova leitura na próxima vez
+        for name in added:
+            tag_name_cache.invalidate(name)
         try:
             conn.rollback()
         except Exception:
             pass
-        try:
-            cur.close()
-            conn.close()
-        except Exception:
-            pass
         return False
     finally:
         try:
@@ -202,17 +310,3 @@ def replace_tags_for_idea(idea_id: str, tags: list[str]) -> bool:
             conn.close()
         except Exception:
             pass
-
-    # Recreate tags and mappings using create_tag helper (it handles creating tag row and idea_tags row)
-    try:
-        for tag_name in tags or []:
-            try:
-                tg = Tag(idea_id=idea_id, name=tag_name)
-                create_tag(tg)
-            except Exception as e:
-                print(f"Erro ao criar/vincular tag '{tag_name}': {e}")
-                # continue with other tags
-        return True
-    except Exception as e:
-        print(f"Erro geral ao substituir tags: {e}")
-        return False
@@ -1,9 +1,12 @@
+import logging
 import os
 from datetime import timedelta, datetime
 
 from dotenv import load_dotenv
 from jose import jwt, JWTError
 
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 
 SECRET_KEY = os.getenv("JWT_SECRET")
@@ -36,8 +39,8 @@ def decode_access_token(token: str):
             raise ValueError("Token não contém 'sub' (user_id)")
         return user_id
     except JWTError as e:
-        print(f"Erro ao decodificar JWT: {e}")
+        logger.warning("Erro ao decodificar JWT: %s", e)
         raise
     except Exception as e:
-        print(f"Erro inesperado ao decodificar token: {e}")
+        logger.warning("Erro inesperado ao decodificar token: %s", e)
         raise
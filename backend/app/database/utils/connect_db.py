@@ -1,8 +1,17 @@
 import os
+import sys
+import time
+
 from dotenv import load_dotenv
 import psycopg2
+import psycopg2.extensions
 from passlib.context import CryptContext
 
+from ...observability.loop_watchdog import assert_off_loop
+from ...observability.metrics import DB_CONNECT_SECONDS, DB_CONNECTIONS_OPEN, DB_QUERY_ERRORS, DB_QUERY_SECONDS
+from ...observability.queries import query_stats
+from ...observability.tracing import db_span
+
 load_dotenv()
 
 user = os.getenv("POSTGRES_USER", "postgres")
@@ -13,17 +22,65 @@ db_name = os.getenv("POSTGRES_DB", "idea_hub_db")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-def get_db_conn(db: str = None):
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection that knows which query function opened it (for the metrics)."""
+
+    query_name = "unknown"
+
+    def close(self):
+        if not self.closed:
+            DB_CONNECTIONS_OPEN.dec()
+        super().close()
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Times (and traces) every statement, labelled with the query function that owns the connection.
+
+    Each statement is also fingerprinted into `query_stats` (slow query log, top-N by total time).
+    """
+
+    def execute(self, query, vars=None):
+        name = getattr(self.connection, "query_name", "unknown")
+        with db_span(name, query) as span:
+            started = time.perf_counter()
+            failed = False
+            try:
+                result = super().execute(query, vars)
+            except Exception:
+                failed = True
+                DB_QUERY_ERRORS.labels(name).inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                DB_QUERY_SECONDS.labels(name).observe(elapsed)
+                query_stats.record(self, name, query, vars, elapsed, failed)
+            if span is not None:
+                span.set_attribute("db.response.returned_rows", self.rowcount)
+            return result
+
+
+def get_db_conn(db: str = None, name: str = None):
     """Abre e retorna (conn, cur). Levanta exceção se não conseguir conectar.
     Faz a conexão por chamada (não no import) para evitar falha ao iniciar a aplicação
     quando o banco não estiver disponível.
+    `name` rotula as métricas das consultas; por padrão é o nome da função que chamou.
     """
     database = db or db_name
+    assert_off_loop("get_db_conn")
     try:
-        conn = psycopg2.connect(dbname=database, user=user, password=password, host=host, port=port)
+        started = time.perf_counter()
+        conn = psycopg2.connect(
+            dbname=database, user=user, password=password, host=host, port=port,
+            connection_factory=InstrumentedConnection, cursor_factory=InstrumentedCursor,
+        )
+        DB_CONNECT_SECONDS.observe(time.perf_counter() - started)
+        DB_CONNECTIONS_OPEN.inc()
+        # nome da função de consulta que pediu a conexão (get_idea_by_id, create_messages, ...)
+        conn.query_name = name or sys._getframe(1).f_code.co_name
         conn.autocommit = True
         cur = conn.cursor()
         return conn, cur
     except Exception:
         # Re-raise para o chamador lidar.
-        raise
\ No newline at end of file
+        raise
@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import select
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+from dotenv import load_dotenv
+
+from .connect_db import get_db_conn
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+db_name = os.getenv("POSTGRES_DB", "idea_hub_db")
+
+NAME_CACHE_SIZE = int(os.getenv("NAME_CACHE_SIZE", "4096"))
+NAME_CACHE_TTL = float(os.getenv("NAME_CACHE_TTL", "600"))
+NAME_CACHE_NEGATIVE_TTL = float(os.getenv("NAME_CACHE_NEGATIVE_TTL", "30"))
+NAME_CACHE_WARM = os.getenv("NAME_CACHE_WARM", "0").lower() in ("1", "true", "yes")
+NAME_CACHE_LISTEN = os.getenv("NAME_CACHE_LISTEN", "1").lower() in ("1", "true", "yes")
+
+# Canal do Postgres usado para invalidar os caches entre workers
+NOTIFY_CHANNEL = "name_cache_invalidate"
+
+# Identifica este processo para ignorar as próprias notificações
+WORKER_ID = uuid.uuid4().hex
+
+MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a per-entry TTL.
+
+    `get` returns `MISSING` when the key is absent or expired. Values may be
+    `None`, which lets callers cache negative lookups with their own TTL.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Any) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires_at, value = entry
+            if expires_at < now:
+                del self._data[key]
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class NameCache:
+    """name -> id cache for a small, read-mostly vocabulary table (tags, categories).
+
+    Misses are cached as `None` for `NAME_CACHE_NEGATIVE_TTL` seconds so repeated
+    lookups of names that do not exist yet also skip the database.
+    """
+
+    def __init__(self, table: str):
+        self.table = table
+        self._cache = TTLCache(maxsize=NAME_CACHE_SIZE, ttl=NAME_CACHE_TTL)
+
+    @property
+    def stats(self) -> dict:
+        return {"hits": self._cache.hits, "misses": self._cache.misses, "size": len(self._cache)}
+
+    def lookup(self, name: str) -> Any:
+        """Return the cached id, `None` for a cached miss, or `MISSING` when unknown."""
+        return self._cache.get(name)
+
+    def store(self, name: str, value: Optional[str]) -> None:
+        if value is None:
+            self._cache.set(name, None, ttl=NAME_CACHE_NEGATIVE_TTL)
+        else:
+            self._cache.set(name, str(value))
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        if name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(name)
+
+    def warm(self) -> int:
+        """Load the whole table into the cache. Returns the number of names loaded."""
+        try:
+            conn, cur = get_db_conn(db_name)
+        except Exception as e:
+            logger.error("erro de conexao ao carregar %s: %s", self.table, e)
+            return 0
+
+        try:
+            cur.execute(f"SELECT DISTINCT ON (name) name, id FROM {self.table} ORDER BY name, id")
+            rows = cur.fetchall()
+            for name, row_id in rows:
+                self.store(name, str(row_id))
+            return len(rows)
+        except Exception as e:
+            logger.error("erro ao carregar %s: %s", self.table, e)
+            return 0
+        finally:
+            try:
+                cur.close()
+                conn.close()
+            except Exception:
+                pass
+
+
+tag_name_cache = NameCache("tags")
+category_name_cache = NameCache("categories")
+
+_caches = {
+    tag_name_cache.table: tag_name_cache,
+    category_name_cache.table: category_name_cache,
+}
+
+
+def notify_name_changed(cur, table: str, names: list[str]) -> None:
+    """Publish an invalidation for `names` so other workers drop stale entries.
+
+    Uses the caller's cursor: when it runs inside a transaction the notification
+    is only delivered after commit.
+    """
+    for name in names:
+        payload = json.dumps({"origin": WORKER_ID, "table": table, "name": name})
+        cur.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, payload))
+
+
+def _handle_notification(payload: str) -> None:
+    try:
+        data = json.loads(payload)
+    except Exception:
+        return
+    if data.get("origin") == WORKER_ID:
+        return
+    cache = _caches.get(data.get("table"))
+    if cache is not None:
+        cache.invalidate(data.get("name"))
+
+
+class NameCacheListener:
+    """Background thread that LISTENs for invalidations published by other workers."""
+
+    def __init__(self, poll_timeout: float = 5.0):
+        self.poll_timeout = poll_timeout
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="name-cache-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_timeout + 1)
+            self._thread = None
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                conn, cur = get_db_conn(db_name, name="name_cache_listener")
+            except Exception as e:
+                logger.error("listener sem conexao: %s", e)
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+
+            try:
+                cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                # Entradas podem ter ficado velhas enquanto estávamos desconectados
+                for cache in _caches.values():
+                    cache.invalidate()
+                backoff = 1.0
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], self.poll_timeout) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        _handle_notification(conn.notifies.pop(0).payload)
+            except Exception as e:
+                logger.error("listener interrompido: %s", e)
+                self._stop.wait(backoff)
+            finally:
+                try:
+                    cur.close()
+                    conn.close()
+                except Exception:
+                    pass
+
+
+listener = NameCacheListener()
+
+
+def start_name_caches() -> None:
+    """Warm the caches (when enabled) and start the cross-worker invalidation listener."""
+    if NAME_CACHE_WARM:
+        for cache in _caches.values():
+            loaded = cache.warm()
+            logger.info("%s: %s nomes carregados", cache.table, loaded)
+    if NAME_CACHE_LISTEN:
+        listener.start()
+
+
+def stop_name_caches() -> None:
+    listener.stop()
@@ -1,6 +1,13 @@
+import logging
+from .observability.logs import setup_logging, shutdown_logging
+
+# antes dos demais imports: o que for logado durante a importação dos módulos já passa pela fila
+setup_logging()
+
 from .auth.middleware import AuthMiddleware
 from .auth.routes import router as auth_router
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from .api.routes import router as api_router
 from fastapi.middleware.cors import CORSMiddleware
 from starlette.middleware import Middleware
@@ -8,15 +15,35 @@ import json
 import os
 import asyncio
 from .database.create_db import ensure_database_and_tables
+from .database.utils.name_cache import start_name_caches, stop_name_caches
+from .api.similar.indexer import indexer as embedding_indexer
+from .api.enrichment import pipeline as enrichment_pipeline
+from .api.chat.llm_gateway import close_client as close_llm_client
+from .api.chat.chat_memory import chat_memory
+from .api.chat.message_writer import message_writer
+from .api.chat.intent_router import intent_router
+from .observability.metrics import MetricsMiddleware, router as metrics_router
+from .observability.tracing import TracingMiddleware, setup_tracing, shutdown_tracing
+from .observability.profiling import SlowRequestMiddleware, router as profiling_router, slow_requests
+from .observability.queries import router as queries_router
+from .observability.loop_watchdog import loop_watchdog
 from contextlib import asynccontextmanager
 
+logger = logging.getLogger(__name__)
+
 middleware = [
+    # primeiro da lista = mais externo: mede também o CORS e a autenticação
+    Middleware(TracingMiddleware),
+    Middleware(MetricsMiddleware),
+    Middleware(SlowRequestMiddleware),
     Middleware(
         CORSMiddleware,
         allow_origins=["*"],
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # clientes que fazem polling leem o ETag para mandar no If-None-Match
+        expose_headers=["ETag"],
     ),
     Middleware(AuthMiddleware),
 ]
@@ -28,17 +55,45 @@ async def lifespan(app):
 
     Executa a função síncrona em uma thread para não bloquear o loop async.
     """
+    setup_tracing()
+    loop_watchdog.start()
     try:
         await asyncio.to_thread(ensure_database_and_tables)
     except Exception as e:
-        print(f"[lifespan] aviso: falha ao garantir DB na startup: {e}")
+        logger.warning("falha ao garantir DB na startup: %s", e)
+    try:
+        await asyncio.to_thread(start_name_caches)
+    except Exception as e:
+        logger.warning("falha ao iniciar cache de nomes: %s", e)
+    try:
+        await asyncio.to_thread(intent_router.load)
+    except Exception as e:
+        logger.warning("falha ao treinar roteador de intencoes: %s", e)
+    embedding_indexer.start()
+    message_writer.start()
+    enrichment_pipeline.start()
     yield
+    await enrichment_pipeline.stop()
+    await chat_memory.stop()
+    await message_writer.stop()
+    await embedding_indexer.stop()
+    await asyncio.to_thread(intent_router.stop)
+    await asyncio.to_thread(stop_name_caches)
+    await close_llm_client()
+    await loop_watchdog.stop()
+    slow_requests.stop()
+    shutdown_tracing()
+    shutdown_logging()
 
 
-app = FastAPI(middleware=middleware, lifespan=lifespan)
+# orjson no lugar de json.dumps para todas as respostas que não escolhem outra classe
+app = FastAPI(middleware=middleware, lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 app.include_router(api_router, prefix="/api", tags=["API"])
+app.include_router(metrics_router)
+app.include_router(profiling_router)
+app.include_router(queries_router)
 
 # Sobrescrever o schema OpenAPI com o arquivo customizado
 def custom_openapi():
@@ -64,6 +119,6 @@ async def root():
     try:
         await asyncio.to_thread(ensure_database_and_tables)
     except Exception as e:
-        print(f"[root] aviso: falha ao garantir DB no root: {e}")
+        logger.warning("falha ao garantir DB no root: %s", e)
     return {"message": "API rodando! e banco verificado."}
 
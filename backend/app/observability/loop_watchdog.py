@@ -0,0 +1,114 @@
+"""Event-loop stall detection (debug aid, off by default).
+
+* `LOOP_WATCHDOG_MS=N`: a heartbeat task updates a timestamp on the loop and a
+  watchdog thread checks it; when the loop has not run for N ms the watchdog
+  logs the loop thread's current stack (the code that is blocking it), and logs
+  the total stall once the loop comes back.
+* `LOOP_STRICT=warn|raise`: `assert_off_loop` (called when a database
+  connection is opened and when a roadmap is rendered) reports, or raises on,
+  synchronous calls made from the event loop thread instead of through
+  `asyncio.to_thread` / `run_in_threadpool`.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from .metrics import EVENT_LOOP_STALL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 0 = desligado
+LOOP_WATCHDOG_MS = float(os.getenv("LOOP_WATCHDOG_MS", "0"))
+# "" (desligado), "warn" ou "raise"
+LOOP_STRICT = os.getenv("LOOP_STRICT", "").lower()
+
+_reported_sites: set[tuple[str, int]] = set()
+
+
+class BlockingCallError(RuntimeError):
+    """Synchronous database/render call made on the event loop thread (LOOP_STRICT=raise)."""
+
+
+def assert_off_loop(what: str) -> None:
+    """Flag `what` when it runs on the event loop thread and strict mode is on."""
+    if not LOOP_STRICT:
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # thread de trabalho: ok
+    stack = traceback.extract_stack()[:-2]
+    if LOOP_STRICT == "raise":
+        raise BlockingCallError(f"{what} chamado no event loop em {stack[-1].filename}:{stack[-1].lineno}")
+    # um aviso por local de chamada, senão cada requisição repete o mesmo log
+    site = (stack[-1].filename, stack[-1].lineno)
+    if site in _reported_sites:
+        return
+    _reported_sites.add(site)
+    logger.warning("%s chamado no event loop (use asyncio.to_thread):\n%s", what, "".join(traceback.format_list(stack)))
+
+
+class LoopWatchdog:
+    """Heartbeat on the loop plus a thread that notices when it stops beating."""
+
+    def __init__(self, threshold_ms: float = LOOP_WATCHDOG_MS):
+        self.threshold = threshold_ms / 1000
+        # batida bem mais frequente que o limite, para medir o atraso com folga
+        self.interval = self.threshold / 4
+        self._last_beat = 0.0
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self.threshold <= 0 or self._task is not None:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        await asyncio.to_thread(self._thread.join, 1)
+        self._task = None
+        self._thread = None
+
+    async def _beat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    def _watch(self) -> None:
+        stalled_since: Optional[float] = None
+        while not self._stop.wait(self.interval):
+            last_beat = self._last_beat
+            # o loop deveria ter batido a cada `interval`; o que passar disso é bloqueio
+            lag = time.monotonic() - last_beat - self.interval
+            if lag >= self.threshold:
+                if stalled_since != last_beat:
+                    stalled_since = last_beat
+                    frame = sys._current_frames().get(self._loop_thread)
+                    stack = "".join(traceback.format_stack(frame)) if frame is not None else "(pilha indisponível)"
+                    logger.warning("event loop bloqueado ha %.0f ms em:\n%s", lag * 1000, stack)
+            elif stalled_since is not None:
+                stall = last_beat - stalled_since - self.interval
+                EVENT_LOOP_STALL_SECONDS.observe(stall)
+                logger.warning("event loop ficou bloqueado por %.0f ms", stall * 1000, extra={"duration_ms": round(stall * 1000, 1)})
+                stalled_since = None
+
+
+loop_watchdog = LoopWatchdog()
@@ -0,0 +1,236 @@
+import contextvars
+import functools
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "yes")
+# Se definido, /metrics exige "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Preço por 1M de tokens (entrada:saída), sobrescreve/completa a tabela abaixo: "gpt-4.1-mini=0.4:1.6"
+LLM_PRICES = os.getenv("LLM_PRICES", "")
+
+_DEFAULT_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-5-nano": (0.05, 0.40),
+    "gpt-5-mini": (0.25, 2.00),
+    "text-embedding-3-small": (0.02, 0.0),
+}
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "ideahub_http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"], buckets=_LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge("ideahub_http_requests_in_flight", "HTTP requests being processed", multiprocess_mode="livesum")
+
+DB_QUERY_SECONDS = Histogram(
+    "ideahub_db_query_duration_seconds", "SQL statement latency by query function",
+    ["function"], buckets=_DB_BUCKETS,
+)
+DB_QUERY_ERRORS = Counter("ideahub_db_query_errors_total", "SQL statements that raised, by query function", ["function"])
+DB_CONNECT_SECONDS = Histogram("ideahub_db_connect_duration_seconds", "Time to open a database connection", buckets=_DB_BUCKETS)
+DB_CONNECTIONS_OPEN = Gauge("ideahub_db_connections_open", "Database connections currently open by this process", multiprocess_mode="livesum")
+
+LLM_REQUEST_SECONDS = Histogram(
+    "ideahub_llm_request_duration_seconds", "OpenAI API request latency (including retries) by caller",
+    ["caller", "model", "status"], buckets=_LLM_BUCKETS,
+)
+LLM_TOKENS = Counter("ideahub_llm_tokens_total", "Tokens used by caller", ["caller", "model", "kind"])
+LLM_COST = Counter("ideahub_llm_cost_usd_total", "Estimated OpenAI cost in USD by caller", ["caller", "model"])
+LLM_RETRIES = Counter("ideahub_llm_retries_total", "OpenAI requests retried by the gateway", ["model"])
+LLM_WAITING = Gauge("ideahub_llm_requests_waiting", "OpenAI requests waiting for a gateway slot", ["model"], multiprocess_mode="livesum")
+LLM_IN_FLIGHT = Gauge("ideahub_llm_requests_in_flight", "OpenAI requests holding a gateway slot", ["model"], multiprocess_mode="livesum")
+AGENT_RUN_SECONDS = Histogram(
+    "ideahub_agent_run_duration_seconds", "Agents SDK Runner.run duration by agent",
+    ["agent", "outcome"], buckets=_LLM_BUCKETS,
+)
+
+EVENT_LOOP_STALL_SECONDS = Histogram(
+    "ideahub_event_loop_stall_seconds", "Event loop stalls detected by the loop watchdog",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+RENDER_SECONDS = Histogram(
+    "ideahub_roadmap_render_duration_seconds", "RoadmapVisualGenerator.generate_roadmap_image duration",
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+
+# Quem está chamando a OpenAI agora (nome do agente ou da função); lido pelo GatewayTransport
+_llm_caller: contextvars.ContextVar[str] = contextvars.ContextVar("llm_caller", default="other")
+
+
+def _parse_prices(raw: str) -> dict[str, tuple[float, float]]:
+    prices = dict(_DEFAULT_PRICES)
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        model, _, value = part.partition("=")
+        inp, _, out = value.partition(":")
+        try:
+            prices[model.strip()] = (float(inp or 0), float(out or 0))
+        except ValueError:
+            logger.warning("preco invalido em LLM_PRICES: %r", part)
+    return prices
+
+
+_prices = _parse_prices(LLM_PRICES)
+
+
+def _price(model: str) -> Optional[tuple[float, float]]:
+    if model in _prices:
+        return _prices[model]
+    # modelos com data no nome (gpt-4.1-mini-2025-04-14) usam o preço do modelo base
+    for name in sorted(_prices, key=len, reverse=True):
+        if model.startswith(name):
+            return _prices[name]
+    return None
+
+
+@contextmanager
+def llm_caller(name: str) -> Iterator[None]:
+    """Attribute every OpenAI request made inside the block to `name`."""
+    token = _llm_caller.set(name)
+    try:
+        yield
+    finally:
+        _llm_caller.reset(token)
+
+
+def attributed_to(name: str):
+    """Decorator for coroutines that call the OpenAI API: their requests are labelled `name`."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with llm_caller(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_llm_caller() -> str:
+    return _llm_caller.get()
+
+
+def observe_llm_request(model: str, status_code: str, seconds: float, input_tokens: int, output_tokens: int) -> None:
+    caller = _llm_caller.get()
+    LLM_REQUEST_SECONDS.labels(caller, model, status_code).observe(seconds)
+    if input_tokens:
+        LLM_TOKENS.labels(caller, model, "input").inc(input_tokens)
+    if output_tokens:
+        LLM_TOKENS.labels(caller, model, "output").inc(output_tokens)
+    price = _price(model)
+    if price is not None and (input_tokens or output_tokens):
+        LLM_COST.labels(caller, model).inc((input_tokens * price[0] + output_tokens * price[1]) / 1_000_000)
+
+
+@contextmanager
+def track_render() -> Iterator[None]:
+    with RENDER_SECONDS.time():
+        yield
+
+
+class CacheStatsCollector:
+    """Exposes the hit/miss counters the in-process caches already keep.
+
+    Read at scrape time, so the caches pay nothing extra per lookup.
+    """
+
+    def collect(self):
+        requests = CounterMetricFamily("ideahub_cache_requests", "Cache lookups by cache and result", labels=["cache", "result"])
+        size = GaugeMetricFamily("ideahub_cache_entries", "Entries held by in-process caches", labels=["cache"])
+
+        from ..database.utils.name_cache import tag_name_cache, category_name_cache
+        for cache in (tag_name_cache, category_name_cache):
+            stats = cache.stats
+            name = f"names_{cache.table}"
+            requests.add_metric([name, "hit"], stats["hits"])
+            requests.add_metric([name, "miss"], stats["misses"])
+            size.add_metric([name], stats["size"])
+
+        from ..api.chat.llm_cache import response_cache
+        for namespace, stats in list(response_cache.stats.items()):
+            name = f"llm_{namespace}"
+            requests.add_metric([name, "hit"], stats.get("exact_hits", 0))
+            requests.add_metric([name, "semantic_hit"], stats.get("semantic_hits", 0))
+            requests.add_metric([name, "miss"], stats.get("misses", 0))
+            requests.add_metric([name, "error"], stats.get("errors", 0))
+
+        from ..api.chat.intent_router import intent_router
+        routed = CounterMetricFamily("ideahub_intent_decisions", "Chat intent decisions by source", labels=["source"])
+        for source, count in intent_router.stats.items():
+            routed.add_metric([source], count)
+
+        yield requests
+        yield size
+        yield routed
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request.
+
+    The route label is the matched path template (`/api/idea/{idea_id}`), read
+    from the scope after routing, so ids never become label values.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            if template != "/metrics":
+                HTTP_REQUEST_SECONDS.labels(scope["method"], template, str(status_code)).observe(time.perf_counter() - started)
+
+
+if METRICS_ENABLED:
+    REGISTRY.register(CacheStatsCollector())
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(authorization: Optional[str] = Header(None)):
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if METRICS_TOKEN and (authorization or "").replace("Bearer ", "").strip() != METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de métricas inválido")
+
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # vários workers do uvicorn: agrega os arquivos de cada processo
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,316 @@
+"""Sampling profiler for the running process.
+
+Both entry points are off by default:
+
+* `GET /debug/profile?seconds=N` samples the stack of every busy thread for N
+  seconds and returns a flame graph (SVG), or the folded stacks with
+  `format=folded` (readable by speedscope and flamegraph.pl).
+* With `SLOW_REQUEST_MS` set, `SlowRequestMiddleware` keeps a registry of
+  in-flight requests and a watcher thread samples stacks only while some
+  request is past the threshold. Captures are stored with the route template
+  and listed by `GET /debug/profile/slow`.
+
+The endpoints exist only when `PROFILING_TOKEN` is set and require
+"Authorization: Bearer <PROFILING_TOKEN>".
+"""
+
+import asyncio
+import hashlib
+import html
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from fastapi.responses import PlainTextResponse
+
+logger = logging.getLogger(__name__)
+
+# Sem token os endpoints de profiling respondem 404
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILING_INTERVAL_MS = float(os.getenv("PROFILING_INTERVAL_MS", "5"))
+PROFILING_MAX_SECONDS = float(os.getenv("PROFILING_MAX_SECONDS", "60"))
+# 0 = não captura requisições lentas
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+SLOW_REQUEST_KEEP = int(os.getenv("SLOW_REQUEST_KEEP", "50"))
+
+# Frame mais interno de uma thread parada esperando trabalho: não entra no perfil
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+
+_FLAME_WIDTH = 1200
+_FLAME_ROW = 16
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    # pasta + arquivo: distingue app/api/idea.py de fastapi/routing.py sem o caminho inteiro
+    path = os.path.normpath(code.co_filename).split(os.sep)
+    return f"{code.co_name} ({'/'.join(path[-2:])})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES
+
+
+def sample_stacks(counts: Counter) -> None:
+    """Add one sample of every busy thread to `counts`, keyed by (thread, *frames) from root to leaf."""
+    names = {t.ident: t.name for t in threading.enumerate()}
+    me = threading.get_ident()
+    for ident, frame in sys._current_frames().items():
+        if ident == me or _is_idle(frame):
+            continue
+        stack = []
+        while frame is not None:
+            stack.append(_frame_name(frame))
+            frame = frame.f_back
+        stack.append(names.get(ident, f"thread-{ident}"))
+        counts[tuple(reversed(stack))] += 1
+
+
+def profile_for(seconds: float, interval: float) -> Counter:
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        sample_stacks(counts)
+        time.sleep(interval)
+    return counts
+
+
+def folded(counts: Counter) -> str:
+    return "".join(f"{';'.join(stack)} {n}\n" for stack, n in sorted(counts.items()))
+
+
+def _color(name: str) -> str:
+    h = hashlib.md5(name.encode("utf-8")).digest()
+    return f"rgb({205 + h[0] % 50},{h[1] % 200},{h[2] % 60})"
+
+
+def render_flamegraph(counts: Counter, title: str) -> str:
+    """Flame graph (root at the bottom) as a standalone SVG; hover shows the sample count."""
+    root = {"value": 0, "children": {}}
+    for stack, n in counts.items():
+        root["value"] += n
+        node = root
+        for name in stack:
+            node = node["children"].setdefault(name, {"value": 0, "children": {}})
+            node["value"] += n
+    total = root["value"] or 1
+
+    def depth_of(node) -> int:
+        return 1 + max((depth_of(child) for child in node["children"].values()), default=0)
+
+    height = (depth_of(root) + 2) * _FLAME_ROW
+    rects = []
+
+    def walk(name: str, node: dict, x: float, depth: int) -> None:
+        width = node["value"] / total * _FLAME_WIDTH
+        if width < 0.5:
+            return
+        y = height - (depth + 1) * _FLAME_ROW
+        label = html.escape(name)
+        tip = f"{label} ({node['value']} amostras, {node['value'] / total:.1%})"
+        chars = int(width / 7)
+        text = html.escape(name[:chars - 2] + ".." if len(name) > chars else name) if chars >= 3 else ""
+        rects.append(
+            f'<g><title>{tip}</title><rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="{_FLAME_ROW - 1}" '
+            f'fill="{_color(name)}"/><text x="{x + 3:.1f}" y="{y + _FLAME_ROW - 4}">{text}</text></g>'
+        )
+        child_x = x
+        for child_name, child in sorted(node["children"].items()):
+            walk(child_name, child, child_x, depth + 1)
+            child_x += child["value"] / total * _FLAME_WIDTH
+
+    walk("all", root, 0.0, 0)
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_FLAME_WIDTH}" height="{height}" '
+        f'font-family="monospace" font-size="11">'
+        f'<text x="4" y="12">{html.escape(title)} - {root["value"]} amostras</text>'
+        + "".join(rects)
+        + "</svg>"
+    )
+
+
+@dataclass
+class _ActiveRequest:
+    started: float
+    samples: Counter = field(default_factory=Counter)
+
+
+class SlowRequestRecorder:
+    """Stack samples for requests that take longer than `threshold_ms`.
+
+    `begin`/`end` only touch a dict under a lock; the watcher thread wakes every
+    sampling interval and takes a sample only when some in-flight request is
+    already past the threshold, so fast traffic pays almost nothing. A sample
+    covers every busy thread (the event loop and the worker threads), which is
+    what shows whether the slow request was blocked by its own work or by
+    another one holding the loop.
+    """
+
+    def __init__(self, threshold_ms: float = SLOW_REQUEST_MS, keep: int = SLOW_REQUEST_KEEP,
+                 interval: float = PROFILING_INTERVAL_MS / 1000):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.captures: deque = deque(maxlen=keep)
+        self._active: dict[int, _ActiveRequest] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def begin(self) -> int:
+        if self._thread is None:
+            self.start()
+        key = next(self._ids)
+        with self._lock:
+            self._active[key] = _ActiveRequest(time.monotonic())
+        return key
+
+    def end(self, key: int, method: str, route: str, status_code: int) -> None:
+        with self._lock:
+            request = self._active.pop(key, None)
+        if request is None or not request.samples:
+            return
+        duration_ms = (time.monotonic() - request.started) * 1000
+        self.captures.append({
+            "id": key,
+            "method": method,
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(duration_ms, 1),
+            "finished_at": time.time(),
+            "samples": request.samples,
+        })
+        logger.warning(
+            "requisicao lenta %s %s: %.0f ms (%s amostras)", method, route, duration_ms, sum(request.samples.values()),
+            extra={"method": method, "route": route, "duration_ms": round(duration_ms, 1)},
+        )
+
+    def get(self, capture_id: int) -> Optional[dict]:
+        return next((c for c in list(self.captures) if c["id"] == capture_id), None)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="slow-request-sampler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            with self._lock:
+                overdue = [(k, r) for k, r in self._active.items() if now - r.started >= self.threshold]
+            if not overdue:
+                continue
+            sample: Counter = Counter()
+            sample_stacks(sample)
+            with self._lock:
+                # quem terminou durante a amostragem já foi entregue por `end`
+                for key, request in overdue:
+                    if key in self._active:
+                        request.samples.update(sample)
+
+
+class SlowRequestMiddleware:
+    """Pure ASGI middleware registering requests with `slow_requests` when `SLOW_REQUEST_MS` is set."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or SLOW_REQUEST_MS <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        key = slow_requests.begin()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            template = getattr(scope.get("route"), "path", None) or "unmatched"
+            slow_requests.end(key, scope["method"], template, status_code)
+
+
+slow_requests = SlowRequestRecorder()
+_profile_lock = threading.Lock()
+
+router = APIRouter()
+
+
+def require_admin(authorization: Optional[str]) -> None:
+    if not PROFILING_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if (authorization or "").replace("Bearer ", "").strip() != PROFILING_TOKEN:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de profiling inválido")
+
+
+def _render(counts: Counter, fmt: str, title: str) -> Response:
+    if fmt == "folded":
+        return PlainTextResponse(folded(counts))
+    if fmt == "svg":
+        return Response(render_flamegraph(counts, title), media_type="image/svg+xml")
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Formato deve ser svg ou folded")
+
+
+@router.get("/debug/profile", include_in_schema=False)
+async def profile(seconds: float = 10, interval_ms: float = PROFILING_INTERVAL_MS, format: str = "svg",
+                  authorization: Optional[str] = Header(None)):
+    require_admin(authorization)
+    seconds = max(0.1, min(seconds, PROFILING_MAX_SECONDS))
+    interval = max(1.0, interval_ms) / 1000
+    if not _profile_lock.acquire(blocking=False):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Já existe um profiling em andamento")
+    try:
+        # amostra em outra thread: o loop continua atendendo (e aparecendo no perfil)
+        counts = await asyncio.to_thread(profile_for, seconds, interval)
+    finally:
+        _profile_lock.release()
+    return _render(counts, format, f"profile {seconds:g}s")
+
+
+@router.get("/debug/profile/slow", include_in_schema=False)
+def list_slow_requests(authorization: Optional[str] = Header(None)):
+    require_admin(authorization)
+    return [
+        {**{k: v for k, v in c.items() if k != "samples"}, "samples": sum(c["samples"].values())}
+        for c in reversed(list(slow_requests.captures))
+    ]
+
+
+@router.get("/debug/profile/slow/{capture_id}", include_in_schema=False)
+def get_slow_request(capture_id: int, format: str = "svg", authorization: Optional[str] = Header(None)):
+    require_admin(authorization)
+    capture = slow_requests.get(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Captura não encontrada")
+    title = f"{capture['method']} {capture['route']} {capture['duration_ms']:.0f} ms"
+    return _render(capture["samples"], format, title)
@@ -0,0 +1,224 @@
+"""Per-statement statistics for the SQL run through `InstrumentedCursor`.
+
+Every statement is reduced to a fingerprint (literals and placeholders become
+`?`, lists of values collapse to one) so `get_idea_by_id('a')` and
+`get_idea_by_id('b')` are counted together. For each fingerprint the process
+keeps calls, total/max time, rows and errors, plus the slowest execution
+(unless larger than `QUERY_SAMPLE_MAX_CHARS`), which
+`GET /debug/queries/{id}/explain` re-runs under `EXPLAIN (ANALYZE, BUFFERS)`
+inside a transaction that is rolled back. Statements slower than
+`SLOW_QUERY_MS` are logged. The numbers are per worker process.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from .profiling import require_admin
+
+logger = logging.getLogger(__name__)
+
+QUERY_STATS_ENABLED = os.getenv("QUERY_STATS_ENABLED", "1").lower() in ("1", "true", "yes")
+# Acima disso a consulta vai para o log (0 = não loga)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+QUERY_STATS_MAX = int(os.getenv("QUERY_STATS_MAX", "2000"))
+# Comandos maiores que isso (ex.: INSERT em lote já mogrificado) não entram no cache de fingerprints
+FINGERPRINT_CACHE_MAX_CHARS = int(os.getenv("FINGERPRINT_CACHE_MAX_CHARS", "4096"))
+# Amostra guardada para o EXPLAIN: comandos/parâmetros maiores que isso não são guardados
+QUERY_SAMPLE_MAX_CHARS = int(os.getenv("QUERY_SAMPLE_MAX_CHARS", "8192"))
+
+_EXPLAIN_NAME = "query_explain"
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_VALUE_LIST_RE = re.compile(r"\(\s*\?(?:\s*(?:::\s*\w+)?\s*,\s*\?)*\s*(?:::\s*\w+)?\s*\)")
+_REPEATED_LIST_RE = re.compile(r"\(\?\.\.\.\)(?:\s*,\s*\(\?\.\.\.\))+")
+_ARRAY_RE = re.compile(r"ARRAY\[[^\]]*\]", re.I)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalised form of a statement: no literals, one entry per value list, single spaces."""
+    # o cache é indexado pelo texto inteiro: um comando enorme ficaria preso nele
+    if len(statement) > FINGERPRINT_CACHE_MAX_CHARS:
+        return _normalize(statement)
+    return _cached_normalize(statement)
+
+
+def _normalize(statement: str) -> str:
+    text = _COMMENT_RE.sub(" ", statement)
+    text = _STRING_RE.sub("?", text)
+    text = _PLACEHOLDER_RE.sub("?", text)
+    text = _NUMBER_RE.sub("?", text)
+    text = _ARRAY_RE.sub("ARRAY[?...]", text)
+    text = _VALUE_LIST_RE.sub("(?...)", text)
+    text = _REPEATED_LIST_RE.sub("(?...)", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+_cached_normalize = functools.lru_cache(maxsize=4096)(_normalize)
+
+
+def _sample(query: str, vars) -> Optional[tuple[str, Any]]:
+    """(query, vars) kept for EXPLAIN, or None when it is too large to hold on to."""
+    if len(query) + len(repr(vars)) > QUERY_SAMPLE_MAX_CHARS:
+        return None
+    return query, vars
+
+
+def fingerprint_id(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+@dataclass
+class QueryStat:
+    id: str
+    statement: str
+    functions: set[str] = field(default_factory=set)
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    rows: int = 0
+    # execução mais lenta, usada pelo EXPLAIN (None se grande demais para guardar)
+    sample: Optional[tuple[str, Any]] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "statement": self.statement,
+            "functions": sorted(self.functions),
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "mean_ms": round(self.total_seconds * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "rows": self.rows,
+            "rows_per_call": round(self.rows / self.calls, 2) if self.calls else 0.0,
+        }
+
+
+class QueryStats:
+    """Aggregates statements by fingerprint; fed by `InstrumentedCursor.execute`."""
+
+    def __init__(self, max_entries: int = QUERY_STATS_MAX, slow_ms: float = SLOW_QUERY_MS):
+        self.max_entries = max_entries
+        self.slow_seconds = slow_ms / 1000
+        self.dropped = 0
+        self._stats: dict[str, QueryStat] = {}
+        self._lock = threading.Lock()
+
+    def record(self, cursor, function: str, query, vars, seconds: float, failed: bool) -> None:
+        if not QUERY_STATS_ENABLED or function == _EXPLAIN_NAME:
+            return
+        if isinstance(query, bytes):
+            query = query.decode("utf-8", "replace")
+        elif not isinstance(query, str):
+            # psycopg2.sql.Composed
+            query = query.as_string(cursor)
+        normalized = fingerprint(query)
+        rows = max(cursor.rowcount, 0)
+        with self._lock:
+            stat = self._stats.get(normalized)
+            if stat is None:
+                if len(self._stats) >= self.max_entries:
+                    self.dropped += 1
+                    return
+                stat = self._stats[normalized] = QueryStat(fingerprint_id(normalized), normalized)
+            stat.functions.add(function)
+            stat.calls += 1
+            stat.total_seconds += seconds
+            stat.rows += rows
+            if failed:
+                stat.errors += 1
+            if seconds >= stat.max_seconds:
+                stat.max_seconds = seconds
+                stat.sample = _sample(query, vars)
+        if self.slow_seconds and seconds >= self.slow_seconds:
+            logger.warning(
+                "consulta lenta em %s: %.1f ms, %s linhas: %s", function, seconds * 1000, rows, normalized,
+                extra={"function": function, "duration_ms": round(seconds * 1000, 2), "rows": rows, "fingerprint": stat.id},
+            )
+
+    def top(self, limit: int = 20, order: str = "total") -> list[dict]:
+        key = {
+            "total": lambda s: s.total_seconds,
+            "mean": lambda s: s.total_seconds / s.calls if s.calls else 0.0,
+            "max": lambda s: s.max_seconds,
+            "calls": lambda s: s.calls,
+            "rows": lambda s: s.rows,
+        }[order]
+        with self._lock:
+            stats = sorted(self._stats.values(), key=key, reverse=True)[:limit]
+            return [s.as_dict() for s in stats]
+
+    def get(self, stat_id: str) -> Optional[QueryStat]:
+        with self._lock:
+            return next((s for s in self._stats.values() if s.id == stat_id), None)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self.dropped = 0
+
+
+def explain(stat: QueryStat) -> Optional[list[str]]:
+    """EXPLAIN (ANALYZE, BUFFERS) of the slowest execution of `stat`, rolled back afterwards."""
+    from ..database.utils.connect_db import get_db_conn
+
+    if stat.sample is None:
+        return None
+    query, vars = stat.sample
+    conn, cur = get_db_conn(name=_EXPLAIN_NAME)
+    try:
+        # ANALYZE executa a consulta de verdade: em transação para desfazer INSERT/UPDATE/DELETE
+        conn.autocommit = False
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + query, vars)
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        conn.rollback()
+        cur.close()
+        conn.close()
+
+
+query_stats = QueryStats()
+
+router = APIRouter()
+
+
+@router.get("/debug/queries", include_in_schema=False)
+def list_queries(limit: int = 20, order: str = "total", authorization: Optional[str] = Header(None)):
+    require_admin(authorization)
+    if order not in ("total", "mean", "max", "calls", "rows"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="order deve ser total, mean, max, calls ou rows")
+    return {"dropped": query_stats.dropped, "statements": query_stats.top(max(1, limit), order)}
+
+
+@router.delete("/debug/queries", include_in_schema=False, status_code=status.HTTP_204_NO_CONTENT)
+def reset_queries(authorization: Optional[str] = Header(None)):
+    require_admin(authorization)
+    query_stats.reset()
+
+
+@router.get("/debug/queries/{stat_id}/explain", include_in_schema=False)
+async def explain_query(stat_id: str, authorization: Optional[str] = Header(None)):
+    require_admin(authorization)
+    stat = query_stats.get(stat_id)
+    if stat is None or stat.sample is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Consulta não encontrada")
+    try:
+        plan = await run_in_threadpool(explain, stat)
+    except Exception as e:
+        logger.error("erro ao executar EXPLAIN de %s: %s", stat_id, e)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"EXPLAIN falhou: {e}")
+    return {**stat.as_dict(), "plan": plan}
@@ -0,0 +1,152 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from opentelemetry import propagate, trace
+from opentelemetry.trace import SpanKind, Status, StatusCode
+
+logger = logging.getLogger(__name__)
+
+# Desligado por padrão: sem provider configurado a API do OpenTelemetry não faz nada
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "0").lower() in ("1", "true", "yes")
+# otlp (OTEL_EXPORTER_OTLP_ENDPOINT, padrão http://localhost:4318) | file | console
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "otlp").lower()
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+TRACING_SAMPLE_RATIO = float(os.getenv("TRACING_SAMPLE_RATIO", "1.0"))
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "ideahub-api")
+
+# SQL gravado no span é cortado neste tamanho
+_MAX_STATEMENT_CHARS = 2000
+
+tracer = trace.get_tracer("ideahub")
+_provider = None
+
+
+class JsonLinesSpanExporter:
+    """Writes finished spans to a file, one JSON object per line (tests and local runs)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        from opentelemetry.sdk.trace.export import SpanExportResult
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                for s in spans:
+                    f.write(s.to_json(indent=None) + "\n")
+            return SpanExportResult.SUCCESS
+        except OSError as e:
+            logger.error("erro ao gravar spans em %s: %s", self.path, e)
+            return SpanExportResult.FAILURE
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000):
+        return True
+
+
+def setup_tracing() -> None:
+    """Install the SDK tracer provider and exporter (no-op unless TRACING_ENABLED=1)."""
+    global _provider
+    if not TRACING_ENABLED or _provider is not None:
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+    from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+    if TRACING_EXPORTER == "file":
+        exporter = JsonLinesSpanExporter(TRACING_FILE_PATH)
+    elif TRACING_EXPORTER == "console":
+        exporter = ConsoleSpanExporter()
+    else:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(TRACING_SAMPLE_RATIO)),
+    )
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+    logger.info("spans exportados via %s", TRACING_EXPORTER)
+
+
+def shutdown_tracing() -> None:
+    """Flush pending spans; called on application shutdown."""
+    global _provider
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+
+
+@contextmanager
+def span(name: str, kind: SpanKind = SpanKind.INTERNAL, **attributes) -> Iterator[Optional[trace.Span]]:
+    """Child span of the current one; yields None (and costs nothing) when tracing is off."""
+    if not TRACING_ENABLED:
+        yield None
+        return
+    with tracer.start_as_current_span(name, kind=kind, attributes={k: v for k, v in attributes.items() if v is not None}) as s:
+        yield s
+
+
+@contextmanager
+def db_span(function: str, statement) -> Iterator[Optional[trace.Span]]:
+    if not TRACING_ENABLED:
+        yield None
+        return
+    if isinstance(statement, bytes):
+        statement = statement.decode("utf-8", "replace")
+    with tracer.start_as_current_span(
+        f"db {function}",
+        kind=SpanKind.CLIENT,
+        attributes={
+            "db.system": "postgresql",
+            "db.operation.name": function,
+            "db.query.text": str(statement)[:_MAX_STATEMENT_CHARS],
+        },
+    ) as s:
+        yield s
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware opening one server span per HTTP request.
+
+    Continues the caller's trace when a `traceparent` header is sent, and
+    renames the span to the matched route template once routing is done.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        carrier = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope.get("headers", [])}
+        method = scope["method"]
+        with tracer.start_as_current_span(
+            f"{method} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        ) as s:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    s.set_attribute("http.response.status_code", message["status"])
+                    if message["status"] >= 500:
+                        s.set_status(Status(StatusCode.ERROR))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    s.update_name(f"{method} {route}")
+                    s.set_attribute("http.route", route)
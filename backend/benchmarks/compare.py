@@ -0,0 +1,75 @@
+"""Compare two load-test result files.
+
+    python -m benchmarks.compare benchmarks/results/base.json benchmarks/results/new.json --fail-over 15
+
+Prints the change of throughput, latency percentiles and DB queries per
+endpoint; with `--fail-over`, exits with status 1 when any endpoint's p95
+latency got worse by more than that percentage.
+"""
+import argparse
+import json
+import sys
+from typing import Optional
+
+
+def _delta(old: Optional[float], new: Optional[float]) -> Optional[float]:
+    if old in (None, 0) or new is None:
+        return None
+    return (new - old) / old * 100
+
+
+def _fmt(old: Optional[float], new: Optional[float]) -> str:
+    if new is None:
+        return "-"
+    d = _delta(old, new)
+    return f"{new:.1f} ({d:+.0f}%)" if d is not None else f"{new:.1f}"
+
+
+def compare(base: dict, new: dict) -> list[dict]:
+    rows = []
+    for name, n in new["endpoints"].items():
+        b = base["endpoints"].get(name)
+        if b is None:
+            continue
+        rows.append({
+            "endpoint": name,
+            "rps": (b["throughput_rps"], n["throughput_rps"]),
+            "p50": (b["latency_ms"]["p50"], n["latency_ms"]["p50"]),
+            "p95": (b["latency_ms"]["p95"], n["latency_ms"]["p95"]),
+            "p99": (b["latency_ms"]["p99"], n["latency_ms"]["p99"]),
+            "queries": (b.get("db_per_request", {}).get("queries"), n.get("db_per_request", {}).get("queries")),
+        })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmarks.load")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--fail-over", type=float, help="falha se o p95 de algum endpoint piorar mais que N%%")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"base: {base['meta'].get('commit', '')[:8]}  novo: {new['meta'].get('commit', '')[:8]}")
+    header = f"{'endpoint':<16}{'rps':>18}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}{'db q/req':>16}"
+    print(header)
+    print("-" * len(header))
+    regressions = []
+    for row in compare(base, new):
+        print(f"{row['endpoint']:<16}{_fmt(*row['rps']):>18}{_fmt(*row['p50']):>18}{_fmt(*row['p95']):>18}"
+              f"{_fmt(*row['p99']):>18}{_fmt(*row['queries']):>16}")
+        d = _delta(*row["p95"])
+        if args.fail_over is not None and d is not None and d > args.fail_over:
+            regressions.append(f"{row['endpoint']} p95 {d:+.0f}%")
+
+    if regressions:
+        print(f"\n[compare] regressoes acima de {args.fail_over:.0f}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
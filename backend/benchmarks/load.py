@@ -0,0 +1,308 @@
+"""Async load generator for the API routes.
+
+Usage (from backend/, after `python -m benchmarks.seed`):
+
+    python -m benchmarks.load --duration 20 --concurrency 16
+    python -m benchmarks.load --endpoints idea_list,chat_messages --mode mixed
+    python -m benchmarks.load --base-url http://localhost:8000   # servidor já rodando
+
+By default the app runs in this process (httpx ASGI transport, with the
+lifespan started) and the fake LLM provider, so the numbers exclude network
+noise and OpenAI latency, and database round-trips can be counted per request.
+Results are written as JSON to `benchmarks/results/`.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import math
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Optional
+
+from . import runtime
+
+import httpx
+
+from app.database.utils.JWT import create_access_token
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+SEARCH_TERMS = ["plataforma", "pagamento", "usuario", "relatorio", "integracao", "agenda", "plataforma pagamento", "aplicatvo"]
+
+
+@dataclass
+class Fixture:
+    user_id: str
+    token: str
+    idea_ids: list[str]
+    chat_ids: list[str]
+    roadmap_ids: list[str]
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    params: Optional[dict] = None
+    json: Optional[dict] = None
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    status: dict = field(default_factory=dict)
+    connections: int = 0
+    queries: int = 0
+    elapsed: float = 0.0
+
+
+def _message(f: Fixture, rng: random.Random) -> Request:
+    return Request("POST", f"/api/agent/{rng.choice(f.chat_ids)}", params={"message": rng.choice([
+        "Como posso validar essa ideia com poucos usuarios?",
+        "Quais funcionalidades devo priorizar no MVP do projeto?",
+        "Qual stack voce recomenda para o backend do projeto?",
+    ])})
+
+
+# nome -> (peso no modo misto, construtor da requisição)
+SCENARIOS: dict[str, tuple[int, Callable[[Fixture, random.Random], Request]]] = {
+    "idea_list": (10, lambda f, rng: Request("GET", "/api/idea/")),
+    "idea_get": (15, lambda f, rng: Request("GET", f"/api/idea/{rng.choice(f.idea_ids)}")),
+    "idea_search": (8, lambda f, rng: Request("GET", "/api/idea/search", params={"q": rng.choice(SEARCH_TERMS)})),
+    "idea_similar": (4, lambda f, rng: Request("GET", f"/api/idea/{rng.choice(f.idea_ids)}/similar")),
+    "idea_create": (2, lambda f, rng: Request("POST", "/api/idea/", json={
+        "title": f"Ideia de carga {rng.randrange(10 ** 6)}", "tags": rng.sample(["ia", "web", "mobile", "saude"], 2),
+    })),
+    "chat_summary": (10, lambda f, rng: Request("GET", "/api/agent/summary")),
+    "chat_messages": (15, lambda f, rng: Request("GET", f"/api/agent/{rng.choice(f.chat_ids)}/messages", params={"limit": 50})),
+    "chat_list_full": (1, lambda f, rng: Request("GET", "/api/agent/")),
+    "chat_message": (5, _message),
+    "roadmap_get": (8, lambda f, rng: Request("GET", f"/api/roadmap/{rng.choice(f.roadmap_ids)}")),
+    "roadmap_list": (1, lambda f, rng: Request("GET", "/api/roadmap/")),
+}
+
+
+def load_fixtures(max_users: int) -> list[Fixture]:
+    conn = runtime.connect()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            SELECT u.id,
+                   ARRAY(SELECT i.id::text FROM ideas i WHERE i.user_id = u.id),
+                   ARRAY(SELECT c.id::text FROM ai_chats c WHERE c.user_id = u.id),
+                   ARRAY(SELECT r.id::text FROM roadmaps r JOIN ideas i ON i.id = r.idea_id WHERE i.user_id = u.id)
+            FROM users u
+            WHERE u.email LIKE %s
+            ORDER BY u.email
+            LIMIT %s
+            """,
+            (f"bench-%@{runtime.BENCH_EMAIL_DOMAIN}", max_users),
+        )
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+        conn.close()
+    fixtures = [
+        Fixture(str(user_id), create_access_token({"sub": str(user_id)}), ideas, chats, roadmaps)
+        for user_id, ideas, chats, roadmaps in rows
+        if ideas and chats and roadmaps
+    ]
+    if not fixtures:
+        raise SystemExit("[load] nenhum usuario de benchmark encontrado; rode `python -m benchmarks.seed` antes")
+    return fixtures
+
+
+def percentile(sorted_values: list[float], p: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+def summarize(stats: EndpointStats, count_db: bool) -> dict:
+    values = sorted(stats.latencies)
+    n = len(values)
+    total = n + stats.errors
+
+    def ms(v: Optional[float]) -> Optional[float]:
+        return round(v * 1000, 3) if v is not None else None
+
+    summary = {
+        "requests": total,
+        "errors": stats.errors,
+        "status": stats.status,
+        "throughput_rps": round(total / stats.elapsed, 2) if stats.elapsed else None,
+        "latency_ms": {
+            "mean": ms(sum(values) / n) if n else None,
+            "p50": ms(percentile(values, 50)),
+            "p95": ms(percentile(values, 95)),
+            "p99": ms(percentile(values, 99)),
+            "max": ms(values[-1]) if n else None,
+        },
+    }
+    if count_db and total:
+        summary["db_per_request"] = {
+            "connections": round(stats.connections / total, 2),
+            "queries": round(stats.queries / total, 2),
+        }
+    return summary
+
+
+class LoadRunner:
+    def __init__(self, client: httpx.AsyncClient, fixtures: list[Fixture], count_db: bool, seed: int):
+        self.client = client
+        self.fixtures = fixtures
+        self.count_db = count_db
+        self.seed = seed
+
+    async def _one(self, name: str, fixture: Fixture, rng: random.Random, stats: Optional[EndpointStats]) -> None:
+        req = SCENARIOS[name][1](fixture, rng)
+        db = runtime.track_db() if self.count_db else None
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(
+                req.method, req.path, params=req.params, json=req.json,
+                headers={"Authorization": f"Bearer {fixture.token}"},
+            )
+            code = response.status_code
+        except Exception as e:
+            code = type(e).__name__
+        latency = time.perf_counter() - started
+        if stats is None:
+            return
+        stats.status[str(code)] = stats.status.get(str(code), 0) + 1
+        if isinstance(code, int) and code < 400:
+            stats.latencies.append(latency)
+        else:
+            stats.errors += 1
+        if db is not None:
+            stats.connections += db.connections
+            stats.queries += db.queries
+
+    async def run(self, names: list[str], concurrency: int, duration: float, warmup: float, results: dict) -> None:
+        """Closed loop: `concurrency` workers, each sending its next request as soon as the last one returns."""
+        weights = [SCENARIOS[n][0] for n in names]
+
+        async def worker(worker_id: int, until: float, record: bool) -> None:
+            rng = random.Random(self.seed * 1000 + worker_id)
+            fixture = self.fixtures[worker_id % len(self.fixtures)]
+            while time.perf_counter() < until:
+                name = names[0] if len(names) == 1 else rng.choices(names, weights)[0]
+                await self._one(name, fixture, rng, results[name] if record else None)
+
+        if warmup > 0:
+            until = time.perf_counter() + warmup
+            await asyncio.gather(*(worker(i, until, False) for i in range(concurrency)))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i, started + duration, True) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        for name in names:
+            results[name].elapsed = elapsed
+
+
+@contextlib.asynccontextmanager
+async def _client(base_url: Optional[str], concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if base_url:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+            yield client
+        return
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            yield client
+
+
+def _print_table(report: dict) -> None:
+    header = f"{'endpoint':<16}{'req':>8}{'err':>6}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'db q/req':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, s in report["endpoints"].items():
+        lat = s["latency_ms"]
+        db = s.get("db_per_request", {}).get("queries")
+
+        def fmt(v) -> str:
+            return "-" if v is None else f"{v:.1f}"
+
+        print(f"{name:<16}{s['requests']:>8}{s['errors']:>6}{fmt(s['throughput_rps']):>9}"
+              f"{fmt(lat['p50']):>10}{fmt(lat['p95']):>10}{fmt(lat['p99']):>10}{fmt(db):>10}")
+
+
+async def main_async(args) -> dict:
+    names = [n.strip() for n in args.endpoints.split(",")] if args.endpoints else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"[load] endpoints desconhecidos: {', '.join(unknown)} (disponiveis: {', '.join(SCENARIOS)})")
+
+    fixtures = load_fixtures(args.users)
+    count_db = not args.base_url
+    if count_db:
+        runtime.install_db_counter()
+
+    results = {name: EndpointStats() for name in names}
+    async with _client(args.base_url, args.concurrency) as client:
+        runner = LoadRunner(client, fixtures, count_db, args.seed)
+        if args.mode == "mixed":
+            await runner.run(names, args.concurrency, args.duration, args.warmup, results)
+        else:
+            for name in names:
+                await runner.run([name], args.concurrency, args.duration, args.warmup, results)
+
+    return {
+        "meta": {
+            **runtime.run_metadata(),
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+            "target": args.base_url or "in-process",
+            "mode": args.mode,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "users": len(fixtures),
+            "seed": args.seed,
+        },
+        "endpoints": {name: summarize(results[name], count_db) for name in names},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga dos endpoints da API")
+    parser.add_argument("--endpoints", help=f"lista separada por virgula ({', '.join(SCENARIOS)})")
+    parser.add_argument("--mode", choices=["isolated", "mixed"], default="isolated",
+                        help="isolated: um endpoint por vez; mixed: todos juntos, sorteados pelo peso")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="segundos medidos por endpoint (ou no total, em mixed)")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--users", type=int, default=20, help="quantos usuarios de benchmark usar")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--base-url", help="mede um servidor ja rodando em vez do app em processo")
+    parser.add_argument("--output", help="arquivo JSON de saida (padrao: benchmarks/results/<data>-<commit>.json)")
+    parser.add_argument("--app-logs", action="store_true", help="mostra os logs INFO da aplicacao durante a carga")
+    args = parser.parse_args()
+    if args.app_logs:
+        # lido por app.observability.logs quando app.main é importado (em _client)
+        os.environ["LOG_LEVEL"] = "INFO"
+
+    report = asyncio.run(main_async(args))
+    _print_table(report)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{(report['meta']['commit'] or 'nogit')[:8]}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n[load] resultados em {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Micro-benchmark for RoadmapVisualGenerator.
+
+Usage (from backend/):
+
+    python -m benchmarks.roadmap_render                      # roda e mostra a tabela
+    python -m benchmarks.roadmap_render --save-baseline      # grava benchmarks/baselines/roadmap_render.json
+    python -m benchmarks.roadmap_render --check              # compara com a baseline (sai com 1 se regrediu)
+    python -m benchmarks.roadmap_render --cases 'render-s30-*'
+
+Each `generate_roadmap_image` case runs in a fresh child process, so the peak
+RSS reported is the case's own (matplotlib keeps caches for the life of the
+process). Synthetic roadmaps are deterministic, which makes output bytes and
+pixel count comparable across commits: a change there means the layout changed.
+"""
+import argparse
+import fnmatch
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime
+from queue import Empty
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "roadmap_render.json")
+
+STEP_COUNTS = (1, 5, 15, 30)
+TASK_COUNTS = (0, 3, 6)
+TEXT_SIZES = ("curto", "longo")
+
+_WORDS = (
+    "validar proposta valor clientes entrevistas mercado concorrência prototipo usuários plataforma integração "
+    "pagamentos assinatura métricas retenção lançamento campanha parceria infraestrutura segurança automação "
+    "relatórios painel notificações experiência onboarding escalabilidade documentação implantação monitoramento"
+).split()
+_TOOLS = ["Figma", "FastAPI", "PostgreSQL", "React", "Docker", "Stripe", "Notion", "GitHub Actions", "Sentry", "Redis"]
+_TEXT_WORDS = {
+    # (título, descrição, tarefa) em palavras
+    "curto": ((2, 4), (8, 14), (4, 8)),
+    "longo": ((8, 14), (60, 90), (20, 35)),
+}
+
+
+def _phrase(rng: random.Random, bounds: tuple[int, int]) -> str:
+    return " ".join(rng.choices(_WORDS, k=rng.randint(*bounds))).capitalize()
+
+
+def synthetic_roadmap(steps: int, tasks: int, text: str, seed: int = 7) -> dict:
+    rng = random.Random(f"{steps}-{tasks}-{text}-{seed}")
+    title_w, desc_w, task_w = _TEXT_WORDS[text]
+    return {
+        "id": f"bench-{steps}-{tasks}-{text}",
+        "steps": [
+            {
+                "step_order": s + 1,
+                "title": _phrase(rng, title_w),
+                "description": _phrase(rng, desc_w) + ".",
+                "tasks": [
+                    {
+                        "task_order": t + 1,
+                        "description": _phrase(rng, task_w) + ".",
+                        "suggested_tools": rng.sample(_TOOLS, rng.randint(0, 3)),
+                    }
+                    for t in range(tasks)
+                ],
+            }
+            for s in range(steps)
+        ],
+    }
+
+
+def _render_cases() -> list[dict]:
+    return [
+        {"name": f"render-s{s}-t{t}-{text}", "kind": "render", "steps": s, "tasks": t, "text": text}
+        for s in STEP_COUNTS for t in TASK_COUNTS for text in TEXT_SIZES
+    ]
+
+
+def _wrap_cases() -> list[dict]:
+    return [
+        {"name": f"wrap-{text}-{width}px", "kind": "wrap", "text": text, "width_px": width}
+        for text in TEXT_SIZES for width in (300, 1200)
+    ]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_render(case: dict, repeats: int) -> dict:
+    from PIL import Image
+    from app.api.roadmap.roadmap_generator import RoadmapVisualGenerator
+
+    generator = RoadmapVisualGenerator()
+    # aquecimento: cache de fontes do matplotlib fora da medição
+    generator.generate_roadmap_image(synthetic_roadmap(1, 0, "curto"))
+    rss_before = _peak_rss_mb()
+
+    roadmap = synthetic_roadmap(case["steps"], case["tasks"], case["text"])
+    times = []
+    image = b""
+    for _ in range(repeats):
+        started = time.perf_counter()
+        image = generator.generate_roadmap_image(roadmap)
+        times.append(time.perf_counter() - started)
+
+    width, height = Image.open(io.BytesIO(image)).size
+    return {
+        "wall_s": {"min": round(min(times), 4), "median": round(statistics.median(times), 4)},
+        "peak_rss_mb": _peak_rss_mb(),
+        "rss_growth_mb": round(_peak_rss_mb() - rss_before, 1),
+        "output_bytes": len(image),
+        "pixels": width * height,
+        "size": [width, height],
+    }
+
+
+def _run_wrap(case: dict, repeats: int) -> dict:
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from app.api.roadmap.roadmap_generator import RoadmapVisualGenerator
+
+    generator = RoadmapVisualGenerator()
+    fig = plt.figure(figsize=(6, 3), dpi=100)
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    renderer = canvas.get_renderer()
+
+    rng = random.Random(case["name"])
+    texts = [_phrase(rng, _TEXT_WORDS[case["text"]][1]) for _ in range(50)]
+    generator._wrap_text_by_pixel(texts[0], case["width_px"], generator.card_desc_pt, renderer, dpi=100)
+
+    times = []
+    lines = 0
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for text in texts:
+            wrapped, _ = generator._wrap_text_by_pixel(text, case["width_px"], generator.card_desc_pt, renderer, dpi=100)
+        times.append((time.perf_counter() - started) / len(texts))
+        lines = wrapped.count("\n") + 1
+    plt.close(fig)
+    return {
+        "wall_s": {"min": round(min(times), 6), "median": round(statistics.median(times), 6)},
+        "peak_rss_mb": _peak_rss_mb(),
+        "last_lines": lines,
+    }
+
+
+def _child(case: dict, repeats: int, queue) -> None:
+    try:
+        runner = _run_render if case["kind"] == "render" else _run_wrap
+        queue.put(runner(case, repeats))
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_case(case: dict, repeats: int, timeout: float) -> dict:
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(case, repeats, queue))
+    proc.start()
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            result = queue.get(timeout=0.5)
+            break
+        except Empty:
+            pass
+        if not proc.is_alive():
+            # morreu sem responder (OOM, segfault); o resultado pode ter chegado junto com a saída
+            try:
+                result = queue.get(timeout=1)
+            except Empty:
+                result = {"error": f"processo terminou sem resultado (exitcode {proc.exitcode})"}
+            break
+        if time.monotonic() > deadline:
+            proc.terminate()
+            result = {"error": f"tempo esgotado ({timeout:g}s)"}
+            break
+    proc.join()
+    return result
+
+
+def check(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    """Cases whose median wall time grew more than `max_regression` percent, or whose output changed."""
+    problems = []
+    for name, new in results.items():
+        old = baseline.get("cases", {}).get(name)
+        if old is None or "error" in old:
+            continue
+        if "error" in new:
+            problems.append(f"{name}: {new['error']}")
+            continue
+        before, after = old["wall_s"]["median"], new["wall_s"]["median"]
+        if before and (after - before) / before * 100 > max_regression:
+            problems.append(f"{name}: mediana {before * 1000:.1f}ms -> {after * 1000:.1f}ms ({(after - before) / before * 100:+.0f}%)")
+        if "pixels" in old and old["pixels"] != new.get("pixels"):
+            problems.append(f"{name}: imagem mudou de tamanho {old['size']} -> {new.get('size')}")
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmark do RoadmapVisualGenerator")
+    parser.add_argument("--cases", default="*", help="padrao glob dos casos (ex.: 'render-s30-*', 'wrap-*')")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", help="grava o resultado completo em JSON")
+    parser.add_argument("--save-baseline", action="store_true", help=f"grava o resultado como baseline ({BASELINE_PATH})")
+    parser.add_argument("--check", action="store_true", help="compara com a baseline e falha se houver regressao")
+    parser.add_argument("--max-regression", type=float, default=20.0, help="tolerancia da mediana em %% (padrao 20)")
+    parser.add_argument("--timeout", type=float, default=300.0, help="limite em segundos por caso (padrao 300)")
+    args = parser.parse_args()
+
+    cases = [c for c in _render_cases() + _wrap_cases() if fnmatch.fnmatch(c["name"], args.cases)]
+    if not cases:
+        raise SystemExit(f"[roadmap_render] nenhum caso corresponde a {args.cases!r}")
+
+    from . import runtime
+
+    results = {}
+    print(f"{'caso':<26}{'mediana ms':>12}{'min ms':>10}{'pico RSS MB':>13}{'bytes':>11}{'pixels':>12}")
+    for case in cases:
+        r = run_case(case, args.repeats, args.timeout)
+        results[case["name"]] = r
+        if "error" in r:
+            print(f"{case['name']:<26}  erro: {r['error']}")
+            continue
+        print(f"{case['name']:<26}{r['wall_s']['median'] * 1000:>12.2f}{r['wall_s']['min'] * 1000:>10.2f}"
+              f"{r['peak_rss_mb']:>13.1f}{r.get('output_bytes', '-'):>11}{r.get('pixels', '-'):>12}")
+
+    report = {
+        "meta": {**runtime.run_metadata(), "started_at": datetime.now().isoformat(timespec="seconds"), "repeats": args.repeats},
+        "cases": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.check:
+        if not os.path.exists(BASELINE_PATH):
+            raise SystemExit("[roadmap_render] baseline inexistente: rode com --save-baseline na maquina de referencia")
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = check(results, baseline, args.max_regression)
+        if problems:
+            print(f"\n[roadmap_render] regressoes em relacao a baseline ({(baseline['meta'].get('commit') or '')[:8]}):")
+            for p in problems:
+                print(f"  - {p}")
+            sys.exit(1)
+        print(f"\n[roadmap_render] sem regressoes acima de {args.max_regression:.0f}%")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        if os.path.exists(BASELINE_PATH) and args.cases != "*":
+            # baseline parcial: atualiza só os casos medidos
+            with open(BASELINE_PATH, encoding="utf-8") as f:
+                previous = json.load(f)
+            report["cases"] = {**previous.get("cases", {}), **results}
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[roadmap_render] baseline gravada em {BASELINE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
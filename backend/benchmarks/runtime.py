@@ -0,0 +1,127 @@
+"""Process setup shared by the benchmark scripts.
+
+Importing this module points the app at the benchmark database and the fake
+LLM provider, so it must be imported before anything from `app`. Both are
+forced, whatever `.env` or the shell say (a benchmark must never seed or load
+the development database, nor call the real API); choose others with
+`BENCH_POSTGRES_DB` and `BENCH_LLM_PROVIDER`.
+"""
+import contextvars
+import os
+import platform
+import subprocess
+from dataclasses import dataclass
+
+from dotenv import load_dotenv
+
+# .env primeiro (credenciais do Postgres); banco e provedor de LLM são sempre os do benchmark
+load_dotenv()
+os.environ["POSTGRES_DB"] = os.getenv("BENCH_POSTGRES_DB", "idea_hub_bench")
+os.environ["LLM_PROVIDER"] = os.getenv("BENCH_LLM_PROVIDER", "fake")
+os.environ.setdefault("JWT_SECRET", "bench-secret")
+# logs da aplicação por requisição distorcem a medição
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import psycopg2  # noqa: E402
+import psycopg2.extensions  # noqa: E402
+
+BENCH_EMAIL_DOMAIN = "bench.local"
+BENCH_PASSWORD = "bench-password"
+
+
+@dataclass
+class DbStats:
+    connections: int = 0
+    queries: int = 0
+
+
+# Contador da requisição atual; tarefas/threads criadas durante a requisição herdam o contexto
+_current_stats: contextvars.ContextVar = contextvars.ContextVar("bench_db_stats", default=None)
+
+
+class _CountingMixin:
+    def execute(self, query, vars=None):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.queries += 1
+        return super().execute(query, vars)
+
+    def executemany(self, query, vars_list):
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.queries += 1
+        return super().executemany(query, vars_list)
+
+
+_counting_types: dict[type, type] = {}
+
+
+def _counting_cursor(base: type) -> type:
+    # mantém o cursor da aplicação (métricas) e só acrescenta a contagem
+    cls = _counting_types.get(base)
+    if cls is None:
+        cls = _counting_types[base] = type(f"Counting{base.__name__}", (_CountingMixin, base), {})
+    return cls
+
+
+_real_connect = psycopg2.connect
+
+
+def _counting_connect(*args, **kwargs):
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.connections += 1
+    kwargs["cursor_factory"] = _counting_cursor(kwargs.get("cursor_factory") or psycopg2.extensions.cursor)
+    return _real_connect(*args, **kwargs)
+
+
+def install_db_counter() -> None:
+    """Count connections and statements per request (in-process runs only).
+
+    Every query helper opens its connection through `psycopg2.connect`, so
+    replacing it is enough to see all database round-trips of a request.
+    """
+    psycopg2.connect = _counting_connect
+
+
+def track_db() -> DbStats:
+    """Start counting for the current task; returns the live counters."""
+    stats = DbStats()
+    _current_stats.set(stats)
+    return stats
+
+
+def db_params() -> dict:
+    from app.database.utils import connect_db
+    return {
+        "dbname": connect_db.db_name,
+        "user": connect_db.user,
+        "password": connect_db.password,
+        "host": connect_db.host,
+        "port": connect_db.port,
+    }
+
+
+def connect():
+    conn = _real_connect(**db_params())
+    conn.autocommit = True
+    return conn
+
+
+def run_metadata() -> dict:
+    def git(*args: str) -> str:
+        try:
+            return subprocess.check_output(["git", *args], cwd=os.path.dirname(__file__), text=True, stderr=subprocess.DEVNULL).strip()
+        except Exception:
+            return ""
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "branch": git("rev-parse", "--abbrev-ref", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--", "..")),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "llm_provider": os.getenv("LLM_PROVIDER"),
+        "llm_fake_latency": os.getenv("LLM_FAKE_LATENCY"),
+    }
@@ -0,0 +1,210 @@
+"""Seed the benchmark database with realistic data volumes.
+
+Usage (from backend/):
+
+    python -m benchmarks.seed --scale medium --reset
+
+Benchmark users are `bench-<n>@bench.local`; `--reset` removes them (and,
+through the foreign keys, everything they own) before seeding.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from . import runtime
+
+from psycopg2.extras import execute_values
+
+from app.database.create_db import ensure_database_and_tables
+from app.database.utils.connect_db import pwd_context
+
+SCALES = {
+    # users, ideas/usuário, chats/usuário, mensagens/chat, roadmaps/usuário
+    "small": {"users": 10, "ideas": 20, "chats": 3, "messages": 200, "roadmaps": 2},
+    "medium": {"users": 50, "ideas": 60, "chats": 5, "messages": 2000, "roadmaps": 4},
+    "large": {"users": 200, "ideas": 150, "chats": 8, "messages": 5000, "roadmaps": 6},
+}
+
+TAGS = [
+    "saude", "educacao", "financas", "games", "ia", "mobile", "web", "sustentabilidade", "turismo", "varejo",
+    "logistica", "agro", "social", "musica", "esportes", "pets", "imoveis", "marketing", "seguranca", "iot",
+]
+STATUSES = ["DRAFT", "ACTIVE", "ACTIVE", "ACTIVE", "ARCHIVED"]
+CLASSIFICATIONS = ["SaaS B2B", "Marketplace", "Aplicativo mobile", "Plataforma educacional", "Ferramenta interna", "unclassified"]
+WORDS = (
+    "usuario plataforma aplicativo cliente mercado receita assinatura painel integracao dados relatorio "
+    "notificacao agenda pagamento comunidade conteudo recomendacao busca perfil equipe projeto tarefa prazo "
+    "custo escala servidor api banco modelo automacao onboarding retencao feedback lancamento parceria"
+).split()
+QUESTIONS = [
+    "Como posso validar essa ideia com poucos usuarios?",
+    "Qual stack voce recomenda para o backend do projeto?",
+    "Quais funcionalidades devo priorizar no MVP?",
+    "Como monetizar o aplicativo sem afastar os usuarios?",
+    "Crie novas funcionalidades para o projeto",
+    "Quem sao os concorrentes desse mercado?",
+]
+TOOLS = ["Figma", "FastAPI", "PostgreSQL", "React", "Docker", "Stripe", "Notion", "GitHub Actions", "Sentry", "Redis"]
+
+
+def _sentence(rng: random.Random, lo: int, hi: int) -> str:
+    words = rng.choices(WORDS, k=rng.randint(lo, hi))
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraphs(rng: random.Random, n: int) -> str:
+    return "\n\n".join(" ".join(_sentence(rng, 8, 20) for _ in range(rng.randint(2, 5))) for _ in range(n))
+
+
+def reset(cur) -> int:
+    cur.execute("DELETE FROM users WHERE email LIKE %s", (f"bench-%@{runtime.BENCH_EMAIL_DOMAIN}",))
+    return cur.rowcount
+
+
+def _ensure_tags(cur) -> list[str]:
+    cur.execute("SELECT id, name FROM tags WHERE name = ANY(%s)", (TAGS,))
+    existing = {name: str(tag_id) for tag_id, name in cur.fetchall()}
+    missing = [name for name in TAGS if name not in existing]
+    if missing:
+        rows = execute_values(cur, "INSERT INTO tags (name) VALUES %s RETURNING id, name", [(n,) for n in missing], fetch=True)
+        existing.update({name: str(tag_id) for tag_id, name in rows})
+    return [existing[name] for name in TAGS]
+
+
+def seed(scale: dict, seed_value: int = 42) -> dict:
+    rng = random.Random(seed_value)
+    now = datetime.now(timezone.utc)
+    counts = {"users": 0, "ideas": 0, "idea_tags": 0, "chats": 0, "messages": 0, "roadmaps": 0, "steps": 0, "tasks": 0}
+    # bcrypt é lento de propósito: um hash só para todos os usuários
+    password_hash = pwd_context.hash(runtime.BENCH_PASSWORD)
+
+    conn = runtime.connect()
+    cur = conn.cursor()
+    try:
+        tag_ids = _ensure_tags(cur)
+        cur.execute("SELECT count(*) FROM users WHERE email LIKE %s", (f"bench-%@{runtime.BENCH_EMAIL_DOMAIN}",))
+        offset = cur.fetchone()[0]
+
+        for u in range(offset, offset + scale["users"]):
+            cur.execute(
+                "INSERT INTO users (name, email, password, first_login) VALUES (%s, %s, %s, FALSE) RETURNING id",
+                (f"Bench User {u}", f"bench-{u}@{runtime.BENCH_EMAIL_DOMAIN}", password_hash),
+            )
+            user_id = cur.fetchone()[0]
+            counts["users"] += 1
+
+            idea_rows = []
+            for i in range(scale["ideas"]):
+                created = now - timedelta(days=rng.uniform(0, 365))
+                idea_rows.append((
+                    user_id,
+                    f"{_sentence(rng, 2, 6)[:-1]} #{i}",
+                    rng.choice(STATUSES),
+                    _paragraphs(rng, rng.randint(1, 4)),
+                    rng.choice(CLASSIFICATIONS),
+                    created,
+                    created + timedelta(hours=rng.uniform(0, 200)),
+                ))
+            ideas = execute_values(
+                cur,
+                "INSERT INTO ideas (user_id, title, status, raw_content, ai_classification, created_at, updated_at) "
+                "VALUES %s RETURNING id",
+                idea_rows,
+                fetch=True,
+            )
+            idea_ids = [row[0] for row in ideas]
+            counts["ideas"] += len(idea_ids)
+
+            tag_rows = [(idea_id, tag_id) for idea_id in idea_ids for tag_id in rng.sample(tag_ids, rng.randint(1, 4))]
+            execute_values(cur, "INSERT INTO idea_tags (idea_id, tag_id) VALUES %s", tag_rows, page_size=1000)
+            counts["idea_tags"] += len(tag_rows)
+
+            for _ in range(scale["chats"]):
+                started = now - timedelta(days=rng.uniform(1, 90))
+                cur.execute(
+                    "INSERT INTO ai_chats (user_id, idea_id, started_at) VALUES (%s, %s, %s) RETURNING id",
+                    (user_id, rng.choice(idea_ids), started),
+                )
+                chat_id = cur.fetchone()[0]
+                counts["chats"] += 1
+                message_rows = []
+                for m in range(scale["messages"]):
+                    if m % 2 == 0:
+                        row = (chat_id, "USER", rng.choice(QUESTIONS), started + timedelta(seconds=30 * m))
+                    else:
+                        row = (chat_id, "AI", _paragraphs(rng, rng.randint(1, 3)), started + timedelta(seconds=30 * m + 5))
+                    message_rows.append(row)
+                # seq (BIGSERIAL) segue a ordem de inserção
+                execute_values(
+                    cur, "INSERT INTO ai_messages (chat_id, sender, message, created_at) VALUES %s", message_rows, page_size=1000
+                )
+                counts["messages"] += len(message_rows)
+
+            for _ in range(scale["roadmaps"]):
+                cur.execute(
+                    "INSERT INTO roadmaps (idea_id, exported_to, generated_at) VALUES (%s, %s, %s) RETURNING id",
+                    (rng.choice(idea_ids), rng.choice(["notion", "trello", "pdf"]), now - timedelta(days=rng.uniform(0, 60))),
+                )
+                roadmap_id = cur.fetchone()[0]
+                counts["roadmaps"] += 1
+                step_rows = [
+                    (roadmap_id, order, _sentence(rng, 3, 6)[:-1], _paragraphs(rng, 1))
+                    for order in range(1, rng.randint(5, 8) + 1)
+                ]
+                steps = execute_values(
+                    cur,
+                    "INSERT INTO roadmap_steps (roadmap_id, step_order, title, description) VALUES %s RETURNING id",
+                    step_rows,
+                    fetch=True,
+                )
+                counts["steps"] += len(steps)
+                task_rows = [
+                    (step_id, order, _sentence(rng, 6, 14), json.dumps(rng.sample(TOOLS, rng.randint(1, 3))))
+                    for (step_id,) in steps
+                    for order in range(1, rng.randint(3, 5) + 1)
+                ]
+                execute_values(
+                    cur, "INSERT INTO roadmap_tasks (step_id, task_order, description, suggested_tools) VALUES %s", task_rows
+                )
+                counts["tasks"] += len(task_rows)
+
+        cur.execute("ANALYZE")
+    finally:
+        cur.close()
+        conn.close()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Popula o banco de benchmark")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--users", type=int, help="sobrescreve o número de usuários da escala")
+    parser.add_argument("--messages", type=int, help="sobrescreve o número de mensagens por chat")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="remove os usuários de benchmark antes de popular")
+    args = parser.parse_args()
+
+    scale = dict(SCALES[args.scale])
+    if args.users is not None:
+        scale["users"] = args.users
+    if args.messages is not None:
+        scale["messages"] = args.messages
+
+    ensure_database_and_tables()
+    if args.reset:
+        conn = runtime.connect()
+        try:
+            removed = reset(conn.cursor())
+        finally:
+            conn.close()
+        print(f"[seed] {removed} usuarios de benchmark removidos")
+
+    started = time.perf_counter()
+    counts = seed(scale, args.seed)
+    print(f"[seed] {json.dumps(counts)} em {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
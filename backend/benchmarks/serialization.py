@@ -0,0 +1,175 @@
+"""Micro-benchmark for API response serialization.
+
+Usage (from backend/):
+
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --scale 200 --repeats 30 --cases roadmap_list,chat_list
+
+Compares, for synthetic payloads shaped like the query layer's output:
+
+* `default`: what FastAPI does for a route returning dicts with a
+  `response_model` - pydantic validation, dump to JSON-compatible Python and
+  `JSONResponse` (`json.dumps`);
+* `orjson`: `app.api.responses.rows_response` - projection onto the model's
+  fields and `ORJSONResponse`.
+
+Both produce the same document (the script checks it), so the difference is
+serialization cost only.
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from . import runtime
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.api.agent import ChatMessagesResponse, ChatResponseItem
+from app.api.idea import IdeaResponse
+from app.api.responses import rows_response
+from app.api.roadmap_routes import RoadmapResponse
+
+_WORDS = (
+    "validar proposta valor clientes entrevistas mercado concorrência prototipo usuários plataforma integração "
+    "pagamentos assinatura métricas retenção lançamento campanha parceria infraestrutura segurança automação"
+).split()
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(_WORDS, k=words)).capitalize()
+
+
+def _id(rng: random.Random) -> str:
+    return "%08x-%04x-%04x-%04x-%012x" % tuple(rng.getrandbits(b) for b in (32, 16, 16, 16, 48))
+
+
+def _ts(rng: random.Random) -> str:
+    return (datetime(2025, 1, 1) + timedelta(seconds=rng.randint(0, 3 * 10 ** 7))).isoformat()
+
+
+def idea_list(rng: random.Random, scale: int) -> list[dict]:
+    return [
+        {
+            "id": _id(rng), "user_id": _id(rng), "title": _text(rng, 6), "ai_classification": _text(rng, 80),
+            "raw_content": _text(rng, 300), "tags": [_text(rng, 1) for _ in range(4)], "status": "em_andamento",
+            "created_at": _ts(rng), "enrichment_status": "done",
+        }
+        for _ in range(scale)
+    ]
+
+
+def roadmap_list(rng: random.Random, scale: int) -> list[dict]:
+    return [
+        {
+            "id": _id(rng), "idea_id": _id(rng), "exported_to": "png", "generated_at": _ts(rng),
+            "steps": [
+                {
+                    "id": _id(rng), "step_order": s + 1, "title": _text(rng, 5), "description": _text(rng, 40),
+                    "tasks": [
+                        {"id": _id(rng), "task_order": t + 1, "description": _text(rng, 20), "suggested_tools": ["FastAPI", "Figma"]}
+                        for t in range(5)
+                    ],
+                }
+                for s in range(10)
+            ],
+        }
+        for _ in range(max(1, scale // 5))
+    ]
+
+
+def _messages(rng: random.Random, count: int, with_dates: bool) -> list[dict]:
+    messages = []
+    for i in range(count):
+        m = {"message_id": _id(rng), "message": _text(rng, 60), "sender": "USER" if i % 2 == 0 else "AI"}
+        if with_dates:
+            m["created_at"] = _ts(rng)
+        messages.append(m)
+    return messages
+
+
+def chat_list(rng: random.Random, scale: int) -> list[dict]:
+    return [{"chat_id": _id(rng), "idea_id": _id(rng), "messages": _messages(rng, 40, True)} for _ in range(max(1, scale // 5))]
+
+
+def chat_messages(rng: random.Random, scale: int) -> dict:
+    return {"chat_id": _id(rng), "idea_id": _id(rng), "messages": _messages(rng, min(200, scale), True), "next_before": None}
+
+
+# nome -> (gerador, modelo, resposta é lista)
+CASES = {
+    "idea_list": (idea_list, IdeaResponse, True),
+    "roadmap_list": (roadmap_list, RoadmapResponse, True),
+    "chat_list": (chat_list, ChatResponseItem, True),
+    "chat_messages": (chat_messages, ChatMessagesResponse, False),
+}
+
+
+def _timed(fn, repeats: int) -> list[float]:
+    fn()  # aquecimento (caches do pydantic e do plano de projeção)
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def run_case(name: str, scale: int, repeats: int) -> dict:
+    generate, model, many = CASES[name]
+    rows = generate(random.Random(name), scale)
+    adapter = TypeAdapter(list[model] if many else model)
+
+    def default_path() -> bytes:
+        return JSONResponse(adapter.dump_python(adapter.validate_python(rows), mode="json")).body
+
+    def orjson_path() -> bytes:
+        return rows_response(rows, model).body
+
+    default_body, orjson_body = default_path(), orjson_path()
+    if json.loads(default_body) != json.loads(orjson_body):
+        raise SystemExit(f"[serialization] {name}: os dois caminhos geram documentos diferentes")
+
+    default_s, orjson_s = _timed(default_path, repeats), _timed(orjson_path, repeats)
+    return {
+        "bytes": len(orjson_body),
+        "default_ms": round(statistics.median(default_s) * 1000, 3),
+        "orjson_ms": round(statistics.median(orjson_s) * 1000, 3),
+        "speedup": round(statistics.median(default_s) / statistics.median(orjson_s), 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara a serialização padrão do FastAPI com rows_response (orjson)")
+    parser.add_argument("--cases", default=",".join(CASES), help="casos separados por vírgula")
+    parser.add_argument("--scale", type=int, default=100, help="linhas por resposta (ideias; roadmaps e chats usam scale/5)")
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--output", help="grava o resultado completo em JSON")
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.cases.split(",") if n.strip()]
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        raise SystemExit(f"[serialization] casos desconhecidos: {', '.join(unknown)}")
+
+    results = {}
+    print(f"{'caso':<16}{'KB':>10}{'padrão ms':>12}{'orjson ms':>12}{'ganho':>8}")
+    for name in names:
+        r = results[name] = run_case(name, args.scale, args.repeats)
+        print(f"{name:<16}{r['bytes'] / 1024:>10.1f}{r['default_ms']:>12.3f}{r['orjson_ms']:>12.3f}{r['speedup']:>7.1f}x")
+
+    if args.output:
+        report = {
+            "meta": {**runtime.run_metadata(), "started_at": datetime.now().isoformat(timespec="seconds"),
+                     "scale": args.scale, "repeats": args.repeats},
+            "cases": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()